@@ -3,13 +3,14 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_wtf import CSRFProtect
-from flask_migrate import Migrate
 from config import Config
+from .compression import Compress
+from .sharding import ShardRoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': ShardRoutingSession}) # Routes queries to a shard when sharding is on
 login_manager = LoginManager()
 csrf = CSRFProtect()
-migrate = Migrate()
+compress = Compress()
 
 login_manager.login_view = 'auth.login' # Route name for the login view
 login_manager.login_message_category = 'info' # Bootstrap category for the flash message
@@ -17,7 +18,9 @@ login_manager.login_message_category = 'info' # Bootstrap category for the flash
 @login_manager.user_loader
 def load_user(user_id):
     from .models import User # Import here to avoid circular dependency
+    from .sharding import select_user_shard
     try:
+        select_user_shard(int(user_id)) # The rest of the request reads and writes this user's shard
         # CORRECTED: Use the newer db.session.get()
         return db.session.get(User, int(user_id))
     except (ValueError, TypeError):
@@ -28,17 +31,66 @@ def create_app(config_class=Config): # Default to base Config
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from . import json_provider
+    json_provider.init_app(app)
+
+    from . import sharding
+    sharding.configure(app) # Adds the shard binds before db creates its engines
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
-    # Initialize Migrate here, passing app and db
-    migrate.init_app(app, db) 
+    if app.config.get('MIGRATE_ENABLED', True):
+        # Flask-Migrate pulls in Alembic, the largest import at startup, and only
+        # `flask db` needs it. Web workers skip it (see ProductionConfig).
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     from .auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
 
     from .routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
+
+    from .export import export as export_blueprint
+    app.register_blueprint(export_blueprint, url_prefix='/api/export')
+
+    from .log_images import URL_PREFIX, log_images as log_images_blueprint # Also removes unused image files
+    app.register_blueprint(log_images_blueprint, url_prefix=URL_PREFIX.rstrip('/'))
+
+    from .sync import sync as sync_blueprint # Also registers the sync_version session listeners
+    app.register_blueprint(sync_blueprint, url_prefix='/api/sync')
+
+    from .notifications import events as events_blueprint
+    app.register_blueprint(events_blueprint, url_prefix='/api/events')
+
+    from . import jobs
+    jobs.init_app(app)
+
+    sharding.init_app(app)
+
+    from . import transactions, write_queue
+    transactions.init_app(app)
+    write_queue.init_app(app)
+
+    compress.init_app(app)
+    from . import assets
+    assets.init_app(app)
+
+    from . import counters, fragment_cache, ingredients, recipe_content, versioning # noqa: F401 these register session listeners
+    fragment_cache.init_app(app)
+    counters.init_app(app)
+    from . import backfill, maintenance
+    backfill.init_app(app)
+    maintenance.init_app(app)
+    from . import notifications, sync
+    sync.init_app(app)
+    notifications.init_app(app)
+
+    from . import templating
+    templating.init_app(app) # After fragment_cache, which adds the {% cache %} extension
+
+    from . import perf
+    perf.init_app(app)
     
     # Removed the db.create_all() block as migrations handle this.
     # Ensure models are imported so Flask-Migrate can see them.
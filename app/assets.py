@@ -0,0 +1,222 @@
+# app/assets.py
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+import click
+from flask import current_app, request, url_for
+from flask.cli import AppGroup
+from jinja2.utils import htmlsafe_json_dumps
+from .compression import brotli
+
+# Text assets worth precompressing; images and fonts are already compressed.
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.json', '.svg', '.html', '.txt', '.map')
+FINGERPRINT_EXTENSIONS = ('.js', '.css')
+DIST_DIR = 'dist' # Fingerprinted copies live in static/dist/
+MANIFEST_NAME = 'manifest.json'
+MODULE_SPECIFIER_PREFIX = '@app/' # import '@app/recipes' -> static/js/recipes.js
+SKIP_DIRS = ('uploads',) # User content is not a build artifact
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _iter_static_files(static_folder, extensions, skip_dirs=SKIP_DIRS):
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if d not in skip_dirs]
+        for name in sorted(files):
+            if name.endswith(extensions):
+                yield os.path.join(root, name)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+# --- Fingerprinting ---
+def build_manifest(static_folder):
+    """Copies every JS/CSS source to static/dist/ under a content-hashed name
+    and writes static/dist/manifest.json mapping source names to those copies."""
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist_folder, exist_ok=True)
+    manifest = {}
+    for path in _iter_static_files(static_folder, FINGERPRINT_EXTENSIONS, SKIP_DIRS + (DIST_DIR,)):
+        logical_name = os.path.relpath(path, static_folder).replace(os.sep, '/')
+        stem, extension = os.path.splitext(logical_name)
+        hashed_name = f"{DIST_DIR}/{stem}.{_file_hash(path)}{extension}"
+        target = os.path.join(static_folder, *hashed_name.split('/'))
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(path, target)
+        manifest[logical_name] = hashed_name
+
+    manifest_path = os.path.join(dist_folder, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+class AssetManifest:
+    """Resolves logical asset names (e.g. 'style.css') to cache-busting URLs.
+
+    With a built manifest, URLs point at the fingerprinted copies in dist/.
+    Without one (plain development checkout), the source file is served with
+    its content hash as a ?v= query parameter instead.
+    """
+
+    def __init__(self):
+        self._manifest = None
+        self._manifest_mtime = None
+        self._hashes = {} # logical name -> (mtime, hash) for the fallback
+        self._modules = {} # folder -> sorted module file names
+
+    @property
+    def static_folder(self):
+        return current_app.static_folder
+
+    def _load_manifest(self):
+        path = os.path.join(self.static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._manifest, self._manifest_mtime = {}, None
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            with open(path) as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    @property
+    def manifest(self):
+        if self._manifest is None or current_app.debug:
+            self._load_manifest()
+        return self._manifest
+
+    def source_hash(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._hashes.get(filename)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, _file_hash(path))
+            self._hashes[filename] = cached
+        return cached[1]
+
+    def url(self, filename):
+        hashed_name = self.manifest.get(filename)
+        if hashed_name:
+            return url_for('static', filename=hashed_name)
+        version = self.source_hash(filename)
+        if version is None:
+            return url_for('static', filename=filename)
+        return url_for('static', filename=filename, v=version)
+
+    def module_names(self, folder):
+        if folder not in self._modules or current_app.debug:
+            try:
+                names = os.listdir(os.path.join(self.static_folder, folder))
+            except OSError:
+                names = []
+            self._modules[folder] = sorted(n for n in names if n.endswith('.js'))
+        return self._modules[folder]
+
+    def importmap(self, folder='js'):
+        """Returns the JSON body of a <script type="importmap"> for the ES modules in `folder`.
+
+        Modules import each other by bare specifier ('@app/common'), so a
+        fingerprinted module never embeds another module's hashed URL and a
+        change to one file does not cascade into new hashes for its importers.
+        """
+        imports = {MODULE_SPECIFIER_PREFIX + name[:-len('.js')]: self.url(f'{folder}/{name}')
+                   for name in self.module_names(folder)}
+        return htmlsafe_json_dumps({'imports': imports})
+
+    def is_fingerprinted_request(self, filename):
+        if filename.startswith(DIST_DIR + '/') and filename in self.manifest.values():
+            return True
+        version = request.args.get('v')
+        return version is not None and version == self.source_hash(filename)
+
+
+def init_app(app):
+    assets = AssetManifest()
+    app.extensions['assets'] = assets
+    app.jinja_env.globals['asset_url'] = assets.url
+    app.jinja_env.globals['asset_importmap'] = assets.importmap
+
+    @app.after_request
+    def _cache_fingerprinted_assets(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        filename = (request.view_args or {}).get('filename', '')
+        if assets.is_fingerprinted_request(filename):
+            # The URL changes whenever the content does, so browsers never need to revalidate.
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+            response.expires = None
+        return response
+
+    app.cli.add_command(assets_cli)
+
+
+def _write_if_stale(path, target, compress_fn):
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+        return False
+    with open(path, 'rb') as source:
+        data = compress_fn(source.read())
+    tmp_target = target + '.tmp'
+    with open(tmp_target, 'wb') as out:
+        out.write(data)
+    os.replace(tmp_target, target)
+    return True
+
+
+def precompress_static(static_folder, min_size=0):
+    """Writes .gz (and .br, if brotli is installed) siblings for text assets.
+
+    Returns the list of files written. Siblings that are newer than their
+    source are left alone, so this is cheap to run on every build.
+    """
+    written = []
+    for path in _iter_static_files(static_folder, PRECOMPRESS_EXTENSIONS):
+        if os.path.getsize(path) < min_size:
+            continue
+        if _write_if_stale(path, path + '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)):
+            written.append(path + '.gz')
+        if brotli is not None and _write_if_stale(path, path + '.br', lambda data: brotli.compress(data, quality=11)):
+            written.append(path + '.br')
+    return written
+
+
+# --- CLI: flask assets ... ---
+assets_cli = AppGroup('assets', help='Build static assets.')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Fingerprint JS/CSS into static/dist/ and precompress the results."""
+    static_folder = current_app.static_folder
+    manifest = build_manifest(static_folder)
+    for logical_name, hashed_name in sorted(manifest.items()):
+        click.echo(f"  {logical_name} -> {hashed_name}")
+    written = precompress_static(static_folder, current_app.config.get('COMPRESS_MIN_SIZE', 500))
+    click.echo(f"{len(manifest)} asset(s) fingerprinted, {len(written)} compressed file(s) written.")
+
+
+@assets_cli.command('compress')
+def compress_command():
+    """Precompress static text assets into .gz/.br siblings."""
+    static_folder = current_app.static_folder
+    written = precompress_static(static_folder, current_app.config.get('COMPRESS_MIN_SIZE', 500))
+    for path in written:
+        click.echo(f"  wrote {os.path.relpath(path, static_folder)}")
+    if brotli is None:
+        click.echo("brotli is not installed; only .gz files were generated.")
+    click.echo(f"{len(written)} file(s) written.")
@@ -3,6 +3,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from .models import User, db 
 from .forms import SignupForm, LoginForm
+from . import sharding
 
 auth = Blueprint('auth', __name__)
 
@@ -18,12 +19,14 @@ def signup():
         user.set_password(form.password.data)
         
         try:
+            sharding.register_user(user) # With sharding, reserves the username and email across shards
             db.session.add(user)
             db.session.commit()
             flash('Your account has been created! You can now log in.', 'success')
             return redirect(url_for('auth.login'))
         except Exception as e: # More specific exception handling could be better
             db.session.rollback()
+            sharding.unregister_user(user)
             # Log the error e for debugging
             print(f"Error during signup: {e}") 
             flash('An error occurred during registration. Please check your input or try a different username/email.', 'danger')
@@ -38,8 +41,7 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter((User.username == form.identifier.data) | 
-                                 (User.email == form.identifier.data)).first()
+        user = sharding.find_user(form.identifier.data) # By username or email
         if user and user.check_password(form.password.data):
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
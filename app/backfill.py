@@ -0,0 +1,287 @@
+# app/backfill.py
+"""Resumable, throttled backfills for data changes too big for one migration.
+
+An Alembic revision runs as one transaction, holding SQLite's write lock
+until it finishes. That is fine for adding a column, but rewriting every row
+of a large table that way blocks the app for minutes. A backfill instead
+visits a table's rows in id order, one chunk per transaction:
+
+- Each chunk commits together with its BackfillCheckpoint row, which records
+  the last id done. An interrupted run resumes after that id, and no chunk
+  is applied twice.
+- Between chunks the runner sleeps, so writing takes only
+  BACKFILL_DUTY_CYCLE of the wall time and live requests get the lock in
+  between. A chunk that hits "database is locked" is rolled back and
+  retried with backoff.
+- `flask backfill run NAME` prints progress, rate and ETA after each chunk,
+  and `flask backfill status` shows every backfill's checkpoint.
+
+Register a backfill with @backfill(name, Model, where=...). Its function gets
+one chunk's ids, changes those rows through db.session and doesn't commit.
+Anything it does outside the database must be safe to repeat, since a
+retried chunk runs it again. `where` limits the visited rows, e.g. to rows
+still in the old format. Running a finished backfill again continues from
+its checkpoint, which picks up rows added since. With sharding, each shard
+keeps its own checkpoints and the commands visit the shards in turn.
+"""
+import json
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+from . import db, sharding
+from .counters import recount
+from .log_images import save_data_uri
+from .models import BackfillCheckpoint, CookingLog, Recipe
+from .transactions import backoff_delay, is_busy_error
+
+Backfill = namedtuple('Backfill', 'name model func where description')
+_backfills = {} # name -> Backfill
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+# --- Registering backfills ---
+def backfill(name, model, where=None):
+    """Registers `func(ids)` as the backfill called `name` over `model`'s rows.
+
+    The first line of the function's docstring is shown by `flask backfill status`.
+    """
+    def decorator(func):
+        description = (func.__doc__ or '').strip().splitlines()[0] if func.__doc__ else ''
+        _backfills[name] = Backfill(name, model, func, where, description)
+        return func
+    return decorator
+
+
+def get_checkpoint(name):
+    return db.session.get(BackfillCheckpoint, name)
+
+
+def _ids_after(spec, last_id):
+    id_column = spec.model.__mapper__.primary_key[0]
+    query = select(id_column).where(id_column > last_id).order_by(id_column)
+    if spec.where is not None:
+        query = query.where(spec.where)
+    return query
+
+
+def remaining_rows(spec, last_id):
+    """How many rows the backfill still has to visit after `last_id`."""
+    return db.session.scalar(select(func.count()).select_from(_ids_after(spec, last_id).order_by(None).subquery()))
+
+
+# --- Running a backfill ---
+def _in_transaction(work):
+    """Runs `work()` and commits, retrying with backoff while the database is locked."""
+    retries = current_app.config.get('BACKFILL_RETRIES', 5)
+    base = current_app.config.get('BACKFILL_RETRY_BASE_MS', 50) / 1000
+    for attempt in range(retries + 1):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except Exception as e:
+            db.session.rollback()
+            if not is_busy_error(e) or attempt == retries:
+                raise
+            time.sleep(backoff_delay(attempt, base))
+
+
+def _set_status(name, status, error=None):
+    def update():
+        checkpoint = get_checkpoint(name)
+        checkpoint.status = status
+        checkpoint.last_error = error
+        checkpoint.updated_at = _utcnow()
+    _in_transaction(update)
+
+
+def run_backfill(name, chunk_size=None, duty_cycle=None, max_seconds=None, restart=False, progress=None):
+    """Runs the backfill `name` from its checkpoint until no rows are left or `max_seconds` have passed.
+
+    After each chunk, `progress(checkpoint, rows_per_second, eta_seconds)` is
+    called if given. Returns the checkpoint: 'done', or 'paused' when time ran
+    out. An error marks it 'failed' and is raised.
+    """
+    spec = _backfills[name]
+    chunk_size = chunk_size or current_app.config.get('BACKFILL_CHUNK_SIZE', 500)
+    duty_cycle = duty_cycle or current_app.config.get('BACKFILL_DUTY_CYCLE', 0.5)
+
+    def start():
+        checkpoint = get_checkpoint(name)
+        if checkpoint is None:
+            checkpoint = BackfillCheckpoint(name=name, last_id=0, rows_done=0)
+            db.session.add(checkpoint)
+        if restart:
+            checkpoint.last_id, checkpoint.rows_done = 0, 0
+        checkpoint.status = 'running'
+        checkpoint.total = checkpoint.rows_done + remaining_rows(spec, checkpoint.last_id)
+        checkpoint.last_error = None
+        checkpoint.started_at = checkpoint.updated_at = _utcnow()
+        checkpoint.finished_at = None
+
+    def next_chunk():
+        checkpoint = get_checkpoint(name)
+        ids = db.session.scalars(_ids_after(spec, checkpoint.last_id).limit(chunk_size)).all()
+        if ids:
+            spec.func(ids)
+            checkpoint.last_id = ids[-1]
+            checkpoint.rows_done += len(ids)
+        else:
+            checkpoint.status = 'done'
+            checkpoint.finished_at = _utcnow()
+        checkpoint.updated_at = _utcnow()
+        return len(ids)
+
+    _in_transaction(start)
+    started = time.monotonic()
+    processed = 0
+    try:
+        while True:
+            chunk_started = time.monotonic()
+            count = _in_transaction(next_chunk)
+            if not count:
+                break
+            processed += count
+            elapsed = time.monotonic() - started
+            if progress is not None:
+                checkpoint = get_checkpoint(name)
+                rate = processed / elapsed if elapsed else None
+                left = max(0, checkpoint.total - checkpoint.rows_done)
+                progress(checkpoint, rate, left / rate if rate else None)
+            if max_seconds is not None and elapsed >= max_seconds:
+                _set_status(name, 'paused')
+                break
+            # Sleep in proportion to the chunk's write time, leaving the rest to live traffic
+            time.sleep((time.monotonic() - chunk_started) * (1 - duty_cycle) / duty_cycle)
+    except KeyboardInterrupt:
+        db.session.rollback()
+        _set_status(name, 'paused')
+        raise
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in backfill {name}: {e}")
+        _set_status(name, 'failed', repr(e))
+        raise
+    return get_checkpoint(name)
+
+
+def init_app(app):
+    app.cli.add_command(backfill_cli)
+
+
+# --- Backfills ---
+@backfill('recipe-counters', Recipe)
+def recount_recipe_counters(ids):
+    """Recompute recipe cooking counters from their logs."""
+    recount(db.session.connection(), ids)
+
+
+def normalize_whitelist(whitelist):
+    """A whitelist as a list of distinct integer user ids, in their original order."""
+    if isinstance(whitelist, str): # Stored as a JSON string by old code
+        try:
+            whitelist = json.loads(whitelist)
+        except ValueError:
+            return []
+    if not isinstance(whitelist, list):
+        return []
+    user_ids = []
+    for user_id in whitelist:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            continue
+        if user_id not in user_ids:
+            user_ids.append(user_id)
+    return user_ids
+
+
+@backfill('recipe-whitelists', Recipe)
+def normalize_recipe_whitelists(ids):
+    """Rewrite recipe whitelists as lists of distinct integer user ids."""
+    recipes = Recipe.query.options(load_only(Recipe.id, Recipe.user_id, Recipe.whitelist))\
+                          .filter(Recipe.id.in_(ids))
+    for recipe in recipes:
+        whitelist = normalize_whitelist(recipe.whitelist)
+        if whitelist != recipe.whitelist:
+            recipe.whitelist = whitelist
+
+
+@backfill('log-images', CookingLog, where=CookingLog.image_url.like('data:%'))
+def move_log_images_to_files(ids):
+    """Move base64 cooking log images out of the database into files (see app/log_images.py)."""
+    for log_entry in CookingLog.query.filter(CookingLog.id.in_(ids)):
+        image_url = save_data_uri(log_entry, log_entry.image_url)
+        if image_url is None:
+            print(f"Error in backfill log-images: log {log_entry.id} has an unreadable image, left as is")
+            continue
+        log_entry.image_url = image_url
+
+
+# --- CLI: flask backfill ... ---
+backfill_cli = AppGroup('backfill', help='Run and inspect chunked data backfills.')
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return 'unknown'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
+
+
+@backfill_cli.command('run')
+@click.argument('name')
+@click.option('--chunk-size', type=click.IntRange(min=1), help='Rows per transaction (default BACKFILL_CHUNK_SIZE).')
+@click.option('--duty-cycle', type=click.FloatRange(0, 1, min_open=True),
+              help='Share of the time spent writing (default BACKFILL_DUTY_CYCLE).')
+@click.option('--max-minutes', type=float, help='Pause after this long (per shard); run again to resume.')
+@click.option('--restart', is_flag=True, help='Start over from the first row instead of the checkpoint.')
+def run_command(name, chunk_size, duty_cycle, max_minutes, restart):
+    """Run the backfill NAME, resuming from its checkpoint."""
+    if name not in _backfills:
+        raise click.ClickException(f"Unknown backfill '{name}'. Available: {', '.join(sorted(_backfills))}")
+    for shard in sharding.each_shard():
+        label = name if shard is None else f"{name} (shard {shard})"
+
+        def report(checkpoint, rate, eta):
+            percent = 100 * checkpoint.rows_done // checkpoint.total if checkpoint.total else 100
+            click.echo(f"{label}: {checkpoint.rows_done}/{checkpoint.total} rows ({percent}%), "
+                       f"{rate or 0:.0f} rows/s, ETA {_format_duration(eta)}")
+
+        try:
+            checkpoint = run_backfill(name, chunk_size=chunk_size, duty_cycle=duty_cycle, restart=restart,
+                                      max_seconds=max_minutes * 60 if max_minutes is not None else None,
+                                      progress=report)
+        except Exception as e:
+            raise click.ClickException(f"{label} failed: {e}. Fix the cause and run it again to resume.")
+        if checkpoint.status == 'done':
+            click.echo(f"{label}: done, {checkpoint.rows_done} rows.")
+        else:
+            click.echo(f"{label}: paused at id {checkpoint.last_id}; run it again to resume.")
+
+
+@backfill_cli.command('status')
+def status_command():
+    """Show each backfill's checkpoint."""
+    for shard in sharding.each_shard():
+        if shard is not None:
+            click.echo(f"Shard {shard}:")
+        for name, spec in sorted(_backfills.items()):
+            checkpoint = get_checkpoint(name)
+            if checkpoint is None:
+                click.echo(f"{name:>18}: not started - {spec.description}")
+                continue
+            line = f"{name:>18}: {checkpoint.status}, {checkpoint.rows_done}/{checkpoint.total} rows, up to id {checkpoint.last_id}"
+            if checkpoint.last_error:
+                line += f" ({checkpoint.last_error})"
+            click.echo(line)
@@ -0,0 +1,166 @@
+# app/compression.py
+import gzip
+import mimetypes
+import os
+import zlib
+
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+try: # Brotli is optional; without it only gzip is offered
+    import brotli
+except ImportError:
+    brotli = None
+
+SIBLING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits=31 writes a gzip header/trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        # Z_SYNC_FLUSH pushes every chunk out immediately so streamed
+        # responses still reach the client as they are produced.
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding():
+    """Picks the best content coding the client accepts, or None."""
+    return request.accept_encodings.best_match(available_encodings())
+
+
+class Compress:
+    """Negotiated gzip/brotli compression for dynamic responses, plus
+    serving of precompressed .br/.gz siblings for static files
+    (generated at build time with `flask assets compress`)."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        static_view = app.view_functions.get('static')
+        if static_view is not None:
+            app.view_functions['static'] = self._wrap_static_view(static_view)
+
+    # --- Dynamic responses ---
+    def _compressor(self, encoding):
+        config = current_app.config
+        if encoding == 'br':
+            return _BrotliStream(config.get('COMPRESS_BR_LEVEL', 4))
+        return _GzipStream(config.get('COMPRESS_LEVEL', 6))
+
+    def _compress_bytes(self, data, encoding):
+        config = current_app.config
+        if encoding == 'br':
+            return brotli.compress(data, quality=config.get('COMPRESS_BR_LEVEL', 4))
+        return gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+    def _compress_stream(self, body, chunks, encoding):
+        compressor = self._compressor(encoding)
+        try:
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            # Close the original body so stream_with_context can tear down its context
+            if hasattr(body, 'close'):
+                body.close()
+
+    def compress_response(self, response):
+        config = current_app.config
+        if not config.get('COMPRESS_ENABLED', True):
+            return response
+        if response.mimetype not in config.get('COMPRESS_MIMETYPES', ()):
+            return response
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            # No size check possible; compress chunk by chunk as the body is generated.
+            response.response = self._compress_stream(response.response, response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < config.get('COMPRESS_MIN_SIZE', 500):
+                return response
+            response.set_data(self._compress_bytes(data, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The compressed bytes differ from the identity ones, so a strong
+            # validator would be wrong here; weak comparison still matches.
+            response.set_etag(etag, weak=True)
+        return response
+
+    # --- Static files ---
+    def _wrap_static_view(self, static_view):
+        def static(filename):
+            encoding = negotiate_encoding()
+            if encoding is not None and current_app.config.get('COMPRESS_STATIC_PRECOMPRESSED', True):
+                response = self._send_precompressed(filename, encoding)
+                if response is not None:
+                    return response
+            response = static_view(filename=filename)
+            if self._has_precompressed_sibling(filename):
+                response.vary.add('Accept-Encoding')
+            return response
+        return static
+
+    def _fresh_sibling(self, filename, suffix):
+        static_folder = current_app.static_folder
+        original = safe_join(static_folder, filename)
+        sibling = safe_join(static_folder, filename + suffix)
+        if not original or not sibling or not os.path.isfile(original) or not os.path.isfile(sibling):
+            return None
+        if os.path.getmtime(sibling) < os.path.getmtime(original):
+            return None # Stale: the source changed after the last build
+        return filename + suffix
+
+    def _has_precompressed_sibling(self, filename):
+        return any(self._fresh_sibling(filename, suffix) for suffix in SIBLING_SUFFIXES.values())
+
+    def _send_precompressed(self, filename, encoding):
+        sibling = self._fresh_sibling(filename, SIBLING_SUFFIXES[encoding])
+        if sibling is None and encoding == 'br':
+            # Client may still accept gzip if only .gz was built
+            if 'gzip' in request.accept_encodings:
+                encoding, sibling = 'gzip', self._fresh_sibling(filename, SIBLING_SUFFIXES['gzip'])
+        if sibling is None:
+            return None
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(current_app.static_folder, sibling, mimetype=mimetype,
+                                       max_age=current_app.get_send_file_max_age(filename))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
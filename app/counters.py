@@ -0,0 +1,115 @@
+# app/counters.py
+"""Per-recipe cooking counters (Recipe.cook_count, rating_sum, ...).
+
+Any flush that adds, edits or deletes cooking logs recounts the recipes
+those logs belong to (before and after the change, if a log moved) with a
+single UPDATE, in the same transaction. Recounting from the logs rather
+than applying +1/-1 deltas means an edit or delete can never leave a
+counter off by one, and last_cooked is right after deleting the latest log.
+Bulk query updates/deletes skip the ORM events, so `flask counters
+reconcile` repairs any drift they leave behind.
+"""
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.orm import attributes
+from . import db, sharding
+from .models import CookingLog, Recipe
+
+COUNTER_COLUMNS = ('cook_count', 'rating_sum', 'rating_count', 'duration_sum', 'last_cooked')
+
+
+def counter_expressions(recipe_id):
+    """Correlated subqueries computing each counter for the recipe whose id is `recipe_id`."""
+    def aggregate(expression):
+        return select(expression).where(CookingLog.recipe_id == recipe_id).scalar_subquery()
+    return {
+        'cook_count': aggregate(func.count(CookingLog.id)),
+        'rating_sum': aggregate(func.coalesce(func.sum(CookingLog.rating), 0)),
+        'rating_count': aggregate(func.count(CookingLog.rating)),
+        'duration_sum': aggregate(func.coalesce(func.sum(CookingLog.duration_seconds), 0)),
+        'last_cooked': aggregate(func.max(CookingLog.date_cooked)),
+    }
+
+
+def recount(connection, recipe_ids=None):
+    """Recomputes the counters of `recipe_ids` (all recipes if None). Returns the rows updated."""
+    recipes = Recipe.__table__
+    statement = update(recipes).values(counter_expressions(recipes.c.id))
+    if recipe_ids is not None:
+        statement = statement.where(recipes.c.id.in_(recipe_ids))
+    return connection.execute(statement).rowcount
+
+
+def drifted_recipe_ids():
+    """Ids of recipes whose stored counters don't match their logs."""
+    expressions = counter_expressions(Recipe.id)
+    drifted = or_(*(getattr(Recipe, column).is_distinct_from(expressions[column])
+                    for column in COUNTER_COLUMNS))
+    return db.session.scalars(select(Recipe.id).where(drifted).order_by(Recipe.id)).all()
+
+
+# --- Keeping counters current ---
+@event.listens_for(CookingLog.recipe_id, 'set', active_history=True)
+def _track_moved_logs(target, value, oldvalue, initiator):
+    # Nothing to do here; active_history makes SQLAlchemy load the old
+    # recipe_id of an expired log before it is replaced, so the history
+    # read in _recount_touched_recipes still names the recipe it left.
+    pass
+
+
+@event.listens_for(db.session, 'after_flush')
+def _recount_touched_recipes(session, flush_context):
+    recipe_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, CookingLog):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        recipe_ids.add(obj.recipe_id)
+        recipe_ids.update(attributes.get_history(obj, 'recipe_id').deleted) # Moved to another recipe
+    recipe_ids.discard(None)
+    if recipe_ids:
+        recount(session.connection(), recipe_ids)
+        session.info.setdefault('recounted_recipes', set()).update(recipe_ids)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_recounted(session, flush_context):
+    # The UPDATE bypassed the ORM, so reload the counters of loaded recipes on next access
+    mapper = inspect(Recipe)
+    for recipe_id in session.info.pop('recounted_recipes', ()):
+        recipe = session.identity_map.get(mapper.identity_key_from_primary_key((recipe_id,)))
+        if recipe is not None:
+            session.expire(recipe, COUNTER_COLUMNS)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('recounted_recipes', None)
+
+
+def init_app(app):
+    app.cli.add_command(counters_cli)
+
+
+# --- CLI: flask counters ... ---
+counters_cli = AppGroup('counters', help='Check and repair per-recipe cooking counters.')
+
+
+@counters_cli.command('reconcile')
+@click.option('--dry-run', is_flag=True, help='Only report recipes whose counters have drifted.')
+def reconcile_command(dry_run):
+    """Recount every recipe whose counters don't match its cooking logs."""
+    for _ in sharding.each_shard():
+        drifted = drifted_recipe_ids()
+        if not drifted:
+            click.echo("All recipe counters match their cooking logs.")
+            continue
+        preview = ', '.join(str(recipe_id) for recipe_id in drifted[:20])
+        click.echo(f"{len(drifted)} recipe(s) with drifted counters: {preview}{' ...' if len(drifted) > 20 else ''}")
+        if dry_run:
+            continue
+        recount(db.session.connection(), drifted)
+        db.session.commit()
+        click.echo(f"Recounted {len(drifted)} recipe(s).")
@@ -0,0 +1,239 @@
+# app/export.py
+import csv
+import io
+import json
+import mimetypes
+import zipfile
+from datetime import date, datetime
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from flask_login import login_required, current_user
+from sqlalchemy import case, func
+from sqlalchemy.orm import defer, selectinload
+from .log_images import file_name, read_image
+from .models import Recipe, RecipeContent, CookingLog, db
+
+export = Blueprint('export', __name__)
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+FORMATS = ('ndjson', 'csv')
+
+RECIPE_FIELDS = ['id', 'name', 'category', 'time', 'ingredients', 'instructions', 'date']
+LOG_FIELDS = ['id', 'recipe_id', 'recipe_name', 'date_cooked', 'duration_seconds',
+              'rating', 'notes', 'created_at']
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+
+# --- Row sources ---
+# Both sources use yield_per so SQLAlchemy streams results off a server-side
+# cursor in batches instead of materialising the whole result list. With
+# image_heads, a data: URI image is cut to its header, which is all the
+# archive's NDJSON pass needs (the images follow in their own pass).
+
+def _image_column(image, image_heads):
+    if not image_heads:
+        return image.label('image')
+    return case((image.like('data:%'), func.substr(image, 1, 100)), else_=image).label('image')
+
+
+def _iter_recipes(user_id, image_heads=False):
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 200)
+    query = (Recipe.query
+             .options(defer(Recipe._image), selectinload(Recipe.content).defer(RecipeContent.image))
+             .add_columns(_image_column(Recipe.image, image_heads))
+             .filter(Recipe.user_id == user_id)
+             .order_by(Recipe.id))
+    for recipe, image in query.yield_per(batch_size):
+        yield {
+            'id': recipe.id,
+            'name': recipe.name,
+            'category': recipe.category,
+            'time': recipe.time,
+            'ingredients': recipe.ingredients,
+            'instructions': recipe.instructions,
+            'date': recipe.date,
+            'image': image,
+        }
+
+
+def _iter_logs(user_id, image_heads=False):
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 200)
+    query = (db.session.query(CookingLog, Recipe.name, _image_column(CookingLog.image_url, image_heads))
+             .options(defer(CookingLog.image_url))
+             .outerjoin(Recipe, Recipe.id == CookingLog.recipe_id)
+             .filter(CookingLog.user_id == user_id)
+             .order_by(CookingLog.id))
+    for log, recipe_name, image in query.yield_per(batch_size):
+        yield {
+            'id': log.id,
+            'recipe_id': log.recipe_id,
+            'recipe_name': recipe_name,
+            'date_cooked': log.date_cooked,
+            'duration_seconds': log.duration_seconds,
+            'rating': log.rating,
+            'notes': log.notes,
+            'created_at': log.created_at,
+            'image': image,
+        }
+
+
+SOURCES = {
+    'recipes': (_iter_recipes, RECIPE_FIELDS),
+    'logs': (_iter_logs, LOG_FIELDS),
+}
+
+
+# --- Serializers ---
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _ndjson_line(row):
+    return json.dumps(row, default=_json_default) + '\n'
+
+
+def _generate_ndjson(rows):
+    for row in rows:
+        yield _ndjson_line(row)
+
+
+def _generate_csv(rows, fields):
+    # Each row is written into a small reusable buffer and flushed straight out.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        values = []
+        for field in fields:
+            value = row.get(field)
+            if isinstance(value, list):
+                value = ', '.join(value)
+            elif isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        writer.writerow(values)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _image_extension(image):
+    """Returns the file extension for a base64 image data URL or an image file, or None if it is neither."""
+    filename = file_name(image)
+    if filename: # Moved out of the database by the log-images backfill
+        return IMAGE_EXTENSIONS.get(mimetypes.guess_type(filename)[0], 'bin')
+    if not isinstance(image, str) or not image.startswith('data:') or ',' not in image:
+        return None
+    header = image[:image.index(',')]
+    if not header.endswith(';base64'):
+        return None
+    return IMAGE_EXTENSIONS.get(header[len('data:'):-len(';base64')], 'bin')
+
+
+def _iter_images(kind, user_id):
+    """Yields (row id, data URL) pairs, loading only the image column."""
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 200)
+    if kind == 'recipes':
+        query = db.session.query(Recipe.id, Recipe.image).filter(Recipe.user_id == user_id, Recipe.image.isnot(None))
+        query = query.order_by(Recipe.id)
+    else:
+        query = db.session.query(CookingLog.id, CookingLog.image_url).filter(CookingLog.user_id == user_id,
+                                                                            CookingLog.image_url.isnot(None))
+        query = query.order_by(CookingLog.id)
+    yield from query.yield_per(batch_size)
+
+
+class _ZipStream:
+    """Write-only file object that hands zipfile output back to the generator in chunks."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _generate_zip(user_id):
+    # Each kind is exported in two passes: the NDJSON member first (image bodies
+    # replaced by their path in the archive, and never loaded), then the images
+    # one at a time. zipfile only allows one open member, and this keeps memory
+    # at one row/image.
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for kind, prefix in (('recipes', 'recipe'), ('logs', 'log')):
+            iter_rows, _ = SOURCES[kind]
+            with archive.open(f'{kind}.ndjson', mode='w', force_zip64=True) as member:
+                for row in iter_rows(user_id, image_heads=True):
+                    image = row.pop('image', None)
+                    extension = _image_extension(image)
+                    if extension:
+                        row['image_file'] = f"images/{prefix}_{row['id']}.{extension}"
+                    else:
+                        row['image'] = image
+                    member.write(_ndjson_line(row).encode('utf-8'))
+                    chunk = stream.drain()
+                    if chunk:
+                        yield chunk
+
+            for row_id, image in _iter_images(kind, user_id):
+                extension = _image_extension(image)
+                decoded = read_image(image) if extension else None
+                if decoded is None:
+                    continue
+                info = zipfile.ZipInfo(f"images/{prefix}_{row_id}.{extension}")
+                info.compress_type = zipfile.ZIP_STORED # Images are already compressed
+                archive.writestr(info, decoded[0])
+                yield stream.drain()
+    yield stream.drain()
+
+
+def _attachment(generator, mimetype, filename):
+    response = Response(stream_with_context(generator), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no' # Let proxies pass chunks through as they come
+    return response
+
+
+# --- Export Routes ---
+@export.route('/<kind>', methods=['GET'])
+@login_required
+def export_rows(kind):
+    if kind not in SOURCES:
+        abort(404)
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in FORMATS:
+        return jsonify({"error": f"Unsupported format '{export_format}'. Use one of: {', '.join(FORMATS)}"}), 400
+
+    iter_rows, fields = SOURCES[kind]
+    rows = iter_rows(current_user.id)
+    filename = f"kitchenlog-{current_user.username}-{kind}.{export_format}"
+    if export_format == 'csv':
+        return _attachment(_generate_csv(rows, fields), 'text/csv', filename)
+    return _attachment(_generate_ndjson(rows), NDJSON_MIMETYPE, filename)
+
+
+@export.route('/archive.zip', methods=['GET'])
+@login_required
+def export_archive():
+    filename = f"kitchenlog-{current_user.username}-export.zip"
+    return _attachment(_generate_zip(current_user.id), 'application/zip', filename)
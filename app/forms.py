@@ -3,7 +3,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, SubmitField, TextAreaField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError, Optional
-from .models import User
+from .sharding import user_id_for
 
 class SignupForm(FlaskForm):
     username = StringField('Username', validators=[
@@ -25,13 +25,11 @@ class SignupForm(FlaskForm):
     submit = SubmitField('Sign Up')
 
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
+        if user_id_for(email=email.data) is not None:
             raise ValidationError('Email is already registered.')
 
     def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
+        if user_id_for(username=username.data) is not None:
             raise ValidationError('Username is already taken.')
 
 
@@ -59,12 +57,10 @@ class UpdateProfileForm(FlaskForm):
 
     def validate_username(self, username):
         if username.data != self.original_username:
-            user = User.query.filter_by(username=username.data).first()
-            if user:
+            if user_id_for(username=username.data) is not None:
                 raise ValidationError('That username is already taken. Please choose a different one.')
 
     def validate_email(self, email):
         if email.data != self.original_email:
-            user = User.query.filter_by(email=email.data).first()
-            if user:
+            if user_id_for(email=email.data) is not None:
                 raise ValidationError('That email is already registered. Please choose a different one.') 
\ No newline at end of file
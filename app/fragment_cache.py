@@ -0,0 +1,113 @@
+# app/fragment_cache.py
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """A bounded, thread-safe LRU of rendered template fragments.
+
+    Entries are evicted least-recently-used first once either the entry count
+    or the total size of the cached HTML exceeds its limit. Hit, miss and
+    eviction counts are kept so the hit rate can be checked in production.
+    """
+
+    def __init__(self, max_entries=2000, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> rendered fragment
+        self._size = 0 # Total length of the cached fragments, in characters
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return # Never worth evicting the whole cache for one fragment
+        with self._lock:
+            old_value = self._entries.pop(key, None)
+            if old_value is not None:
+                self._size -= len(old_value)
+            self._entries[key] = value
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'size': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class FragmentCacheExtension(Extension):
+    """Adds a `{% cache 'name', key_part, ... %}...{% endcache %}` tag.
+
+    The body is rendered once per distinct key and then served from the
+    app's FragmentCache. Keys should include everything the fragment depends
+    on (user id, data version, ...); stale entries are never invalidated
+    explicitly, they just stop being requested and age out of the LRU.
+    """
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_cached', [nodes.List(key_parts)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key_parts, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = '/'.join(str(part) for part in key_parts)
+        cached = cache.get(key)
+        if cached is not None:
+            return Markup(cached)
+        rendered = caller()
+        cache.set(key, str(rendered))
+        return rendered
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        cache = FragmentCache(max_entries=app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 2000),
+                              max_bytes=app.config.get('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+        app.jinja_env.fragment_cache = cache
+        app.extensions['fragment_cache'] = cache
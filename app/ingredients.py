@@ -0,0 +1,110 @@
+# app/ingredients.py
+"""Normalized ingredient index and the searches built on it.
+
+Recipe.ingredients_json stays the source of truth. Every flush that adds a
+recipe or changes its ingredients (through the `ingredients` setter or by
+assigning ingredients_json directly) rebuilds that recipe's RecipeIngredient
+rows in the same transaction, so searches never see a stale index.
+"""
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import attributes
+from . import db
+from .models import Recipe, RecipeIngredient
+
+MAX_NAME_LENGTH = 150 # RecipeIngredient.name column size
+MAX_SEARCH_TERMS = 50
+
+
+def normalize_ingredient(name):
+    """Case-folds and collapses whitespace, so 'Brown  Sugar' matches 'brown sugar'."""
+    return ' '.join(str(name).casefold().split())[:MAX_NAME_LENGTH]
+
+
+def normalize_terms(names):
+    """Normalizes a list of search terms, dropping blanks and duplicates (order kept)."""
+    terms = []
+    for name in names:
+        term = normalize_ingredient(name)
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def index_rows(recipe):
+    """Builds the RecipeIngredient rows for a recipe's current ingredient list."""
+    return [RecipeIngredient(name=name, position=position)
+            for position, name in enumerate(normalize_terms(recipe.ingredients))]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _reindex_changed_recipes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Recipe) or obj in session.deleted:
+            continue
+        # _ingredients_json is the mapped column behind the ingredients_json hybrid
+        if obj in session.new or attributes.get_history(obj, '_ingredients_json').has_changes():
+            obj.ingredient_index = index_rows(obj)
+
+
+@event.listens_for(RecipeIngredient, 'before_insert')
+def _copy_owner(mapper, connection, target):
+    # The recipe row is inserted first, so its user_id is known by now even
+    # when the recipe was created through the `author` relationship.
+    if target.user_id is None:
+        target.user_id = target.recipe.user_id
+
+
+# --- Searches ---
+def _load_ranked(ranked):
+    """Loads the recipes for (recipe_id, ...) rows, keeping the rows' order."""
+    recipes = {recipe.id: recipe for recipe in
+               Recipe.query.filter(Recipe.id.in_([row[0] for row in ranked])).all()}
+    return [(recipes[row[0]], row) for row in ranked if row[0] in recipes]
+
+
+def recipes_with_ingredients(user_id, names, match_all=False, limit=20):
+    """Returns [(recipe, matched_count)] for the user's recipes that use any of `names`.
+
+    Ranked by how many of the names each recipe uses. With `match_all`, only
+    recipes using every one of them are returned.
+    """
+    terms = normalize_terms(names)
+    if not terms:
+        return []
+    matched = func.count().label('matched')
+    query = (select(RecipeIngredient.recipe_id, matched)
+             .where(RecipeIngredient.user_id == user_id, RecipeIngredient.name.in_(terms))
+             .group_by(RecipeIngredient.recipe_id)
+             .order_by(matched.desc(), RecipeIngredient.recipe_id.desc())
+             .limit(limit))
+    if match_all:
+        query = query.having(func.count() == len(terms))
+    ranked = db.session.execute(query).all()
+    return [(recipe, row.matched) for recipe, row in _load_ranked(ranked)]
+
+
+def cookable_recipes(user_id, pantry, max_missing=None, limit=20):
+    """Returns [(recipe, matched_count, missing_ingredients)] for what can be cooked from `pantry`.
+
+    Recipes missing the fewest ingredients come first, then those using the
+    most pantry items. Recipes using none of the pantry are left out.
+    """
+    terms = normalize_terms(pantry)
+    if not terms:
+        return []
+    matched = func.sum(case((RecipeIngredient.name.in_(terms), 1), else_=0))
+    missing = func.count() - matched
+    query = (select(RecipeIngredient.recipe_id, matched.label('matched'), missing.label('missing'))
+             .where(RecipeIngredient.user_id == user_id)
+             .group_by(RecipeIngredient.recipe_id)
+             .having(matched > 0)
+             .order_by(missing, matched.desc(), RecipeIngredient.recipe_id.desc())
+             .limit(limit))
+    if max_missing is not None:
+        query = query.having(missing <= max_missing)
+    ranked = db.session.execute(query).all()
+
+    pantry_terms = set(terms)
+    return [(recipe, row.matched,
+             [name for name in recipe.ingredients if normalize_ingredient(name) not in pantry_terms])
+            for recipe, row in _load_ranked(ranked)]
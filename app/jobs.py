@@ -0,0 +1,289 @@
+# app/jobs.py
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app, g, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import event, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from .models import Job, db
+from . import sharding
+
+_handlers = {} # job name -> (function, max_attempts)
+_wakeup = threading.Event() # Set after a commit that enqueued jobs
+_local_workers_lock = threading.Lock()
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+# --- Registering and enqueueing jobs ---
+def job(name, max_attempts=5):
+    """Registers a function as the handler for jobs called `name`.
+
+    Handlers get the job payload as keyword arguments and must not commit;
+    the runner commits their changes together with the job's status. That
+    includes writes through sessions on other shards (sharding.user_session),
+    which are committed first, so a job is only marked done once they are.
+    """
+    def decorator(func):
+        _handlers[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, key=None, delay_seconds=0, **payload):
+    """Adds a job to the current transaction.
+
+    The job row commits (or rolls back) with the caller's own writes, and
+    workers are woken once that commit happens. If `key` is given and a job
+    with the same key is still queued, that job is returned instead of
+    adding a duplicate. A unique index on the keys of queued jobs makes
+    this hold for concurrent requests too.
+    """
+    if name not in _handlers:
+        raise ValueError(f"Unknown job '{name}'")
+    values = dict(name=name, key=key, payload=payload, max_attempts=_handlers[name][1],
+                  run_after=_utcnow() + timedelta(seconds=delay_seconds))
+    if key is not None:
+        existing = Job.query.filter_by(key=key, status='queued').first()
+        if existing:
+            return existing
+        # Another request may have queued the same key since; the insert then does nothing
+        db.session.execute(sqlite_insert(Job).values(status='queued', **values)
+                           .on_conflict_do_nothing(index_elements=['key'], index_where=Job.status == 'queued'))
+        db.session.info['jobs_enqueued'] = True
+        return Job.query.filter_by(key=key, status='queued').first()
+
+    new_job = Job(**values)
+    db.session.add(new_job)
+    db.session.info['jobs_enqueued'] = True
+    return new_job
+
+
+@event.listens_for(db.session, 'after_commit')
+def _after_commit(session):
+    if not session.info.pop('jobs_enqueued', False):
+        return
+    _wakeup.set()
+    if has_app_context():
+        g.jobs_enqueued = True
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('jobs_enqueued', None)
+
+
+# --- Claiming and running jobs ---
+def _retry_delay(attempts):
+    base = current_app.config.get('JOBS_RETRY_BASE_SECONDS', 5)
+    cap = current_app.config.get('JOBS_RETRY_MAX_SECONDS', 600)
+    delay = min(cap, base * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.5, 1.0) # Jitter so failed jobs don't retry in lockstep
+
+
+def _release(job_id, error=None):
+    """Puts a claimed job back in the queue and commits.
+
+    After a failure (`error` given), the job is retried after a backoff or
+    marked failed once out of attempts. A job whose key has been queued again
+    meanwhile is marked failed too, as that queued job will do the same work
+    (queued keys are unique). A release that collides with such a job is
+    retried, and then finds it, so it always ends up committed.
+    """
+    while True:
+        claimed_job = db.session.get(Job, job_id)
+        claimed_job.locked_by = None
+        claimed_job.locked_at = None
+        superseded = claimed_job.key is not None and \
+            Job.query.filter(Job.key == claimed_job.key, Job.status == 'queued', Job.id != job_id).first()
+        if error is not None:
+            claimed_job.last_error = error
+        if superseded or (error is not None and claimed_job.attempts >= claimed_job.max_attempts):
+            claimed_job.status = 'failed'
+            claimed_job.finished_at = _utcnow()
+        else:
+            claimed_job.status = 'queued'
+            if error is not None:
+                claimed_job.run_after = _utcnow() + timedelta(seconds=_retry_delay(claimed_job.attempts))
+        try:
+            db.session.commit()
+            return claimed_job.status
+        except IntegrityError:
+            db.session.rollback() # The key was queued again meanwhile; the next pass sees it
+
+
+def _requeue_stale_jobs():
+    """Puts 'running' jobs whose worker disappeared back in the queue."""
+    timeout = current_app.config.get('JOBS_LOCK_TIMEOUT_SECONDS', 300)
+    cutoff = _utcnow() - timedelta(seconds=timeout)
+    stale_ids = db.session.scalars(db.select(Job.id).where(Job.status == 'running', Job.locked_at < cutoff)).all()
+    return sum(_release(job_id) == 'queued' for job_id in stale_ids)
+
+
+def claim_job(worker_id):
+    """Atomically marks the next due job as running for this worker and returns it."""
+    while True:
+        now = _utcnow()
+        job_id = db.session.query(Job.id)\
+                           .filter(Job.status == 'queued', Job.run_after <= now)\
+                           .order_by(Job.run_after, Job.id).limit(1).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = Job.query.filter(Job.id == job_id, Job.status == 'queued')\
+                           .update({'status': 'running', 'locked_by': worker_id, 'locked_at': now,
+                                    'attempts': Job.attempts + 1},
+                                   synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+        # Another worker got there first; try the next one.
+
+
+def run_job(claimed_job):
+    handler = _handlers.get(claimed_job.name)
+    job_id = claimed_job.id
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{claimed_job.name}'")
+        handler[0](**(claimed_job.payload or {}))
+        sharding.commit_shard_sessions()
+        claimed_job.status = 'done'
+        claimed_job.finished_at = _utcnow()
+        claimed_job.last_error = None
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        sharding.rollback_shard_sessions()
+        print(f"Job {job_id} ({claimed_job.name}) failed: {e}")
+        _release(job_id, error=repr(e))
+        return False
+
+
+def run_pending(worker_id=None, limit=None):
+    """Runs due jobs until the queue is empty (or `limit` is reached). Returns the number run."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    processed = 0
+    while limit is None or processed < limit:
+        claimed_job = claim_job(worker_id)
+        if claimed_job is None:
+            break
+        run_job(claimed_job)
+        processed += 1
+    return processed
+
+
+def _worker_loop(app, stop_event, poll_interval, once=False):
+    with app.app_context():
+        stale_check_interval = app.config.get('JOBS_LOCK_TIMEOUT_SECONDS', 300)
+        next_stale_check = 0
+        while not stop_event.is_set():
+            if time.monotonic() >= next_stale_check: # Jobs left 'running' by workers that died meanwhile
+                next_stale_check = time.monotonic() + stale_check_interval
+                for _ in sharding.each_shard():
+                    try:
+                        _requeue_stale_jobs()
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Job worker error requeueing stale jobs: {e}")
+                    finally:
+                        db.session.remove()
+            processed = 0
+            for _ in sharding.each_shard(): # Jobs are stored on the shard of the request that enqueued them
+                try:
+                    processed += run_pending()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Job worker error: {e}")
+                finally:
+                    db.session.remove()
+            if once and not processed:
+                return
+            if not processed:
+                _wakeup.wait(poll_interval)
+                _wakeup.clear()
+
+
+def start_local_workers(app):
+    """Starts the in-process worker threads configured by JOBS_WORKER_THREADS (once per process)."""
+    threads = app.config.get('JOBS_WORKER_THREADS', 0)
+    if not threads:
+        return
+    with _local_workers_lock:
+        if app.extensions.get('jobs_workers'):
+            return
+        stop_event = threading.Event()
+        workers = []
+        for i in range(threads):
+            worker = threading.Thread(target=_worker_loop, name=f'jobs-worker-{i}', daemon=True,
+                                      args=(app, stop_event, app.config.get('JOBS_POLL_INTERVAL', 1.0)))
+            worker.start()
+            workers.append(worker)
+        app.extensions['jobs_workers'] = (stop_event, workers)
+
+
+def init_app(app):
+    @app.after_request
+    def _dispatch_enqueued_jobs(response):
+        if not g.pop('jobs_enqueued', False):
+            return response
+        if app.config.get('JOBS_EAGER'):
+            run_pending()
+        else:
+            # Workers are started lazily so CLI commands like `flask db upgrade`
+            # don't spin up threads against a database that may not be migrated.
+            start_local_workers(app)
+        return response
+
+    app.cli.add_command(jobs_cli)
+
+
+# --- CLI: flask jobs ... ---
+jobs_cli = AppGroup('jobs', help='Run and inspect background jobs.')
+
+
+@jobs_cli.command('run')
+@click.option('--threads', default=1, show_default=True, help='Number of worker threads.')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to wait when the queue is empty.')
+@click.option('--once', is_flag=True, help='Exit once the queue is drained.')
+def run_command(threads, poll_interval, once):
+    """Claim and run queued jobs."""
+    app = current_app._get_current_object()
+    stop_event = threading.Event()
+    workers = [threading.Thread(target=_worker_loop, args=(app, stop_event, poll_interval, once),
+                                name=f'jobs-worker-{i}', daemon=True) for i in range(threads)]
+    click.echo(f"Starting {threads} job worker thread(s)...")
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        click.echo("Stopping job workers...")
+        stop_event.set()
+        _wakeup.set()
+        for worker in workers:
+            worker.join()
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Show job counts by status."""
+    counts = {}
+    for _ in sharding.each_shard():
+        for status, count in db.session.query(Job.status, func.count(Job.id)).group_by(Job.status):
+            counts[status] = counts.get(status, 0) + count
+    if not counts:
+        click.echo("No jobs.")
+    for status, count in counts.items():
+        click.echo(f"{status:>8}: {count}")
@@ -0,0 +1,106 @@
+# app/json_provider.py
+from datetime import date
+
+from flask import stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try: # orjson is optional; without it the stdlib json module is used
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    # Dates and datetimes as ISO 8601, the same as orjson writes them natively
+    # (Flask's default is an HTTP date string).
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson when it is installed.
+
+    Output matches the stdlib path: keys are sorted when `sort_keys` is set,
+    and dates are written as ISO 8601 strings. Anything orjson refuses
+    (e.g. integers beyond 64 bits) falls back to the stdlib encoder.
+    """
+    default = staticmethod(_default)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('JSON_USE_ORJSON', True)
+
+    def _orjson_options(self, indent=None):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def _dumps_bytes(self, obj, indent=None):
+        """Returns `obj` as UTF-8 JSON bytes, or None if orjson can't (or shouldn't) encode it."""
+        if not self.use_orjson:
+            return None
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        # Flask passes `indent` or `separators`; orjson output is always compact
+        # unless indented, so those two are the only arguments it can honour.
+        if self.use_orjson and set(kwargs) <= {'indent', 'separators'}:
+            encoded = self._dumps_bytes(obj, kwargs.get('indent'))
+            if encoded is not None:
+                return encoded.decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass # Let the stdlib raise its usual error (and accept what it accepts)
+        return super().loads(s, **kwargs)
+
+    def _pretty(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        encoded = self._dumps_bytes(obj, indent=2 if self._pretty() else None)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+
+    def iter_array(self, items, chunk_size=100):
+        """Yields the JSON encoding of the iterable `items` as a list, `chunk_size` items at a time."""
+        dump_args = {'indent': 2} if self._pretty() else {'separators': (',', ':')}
+        yield '['
+        chunk = []
+        first = True
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                # Encode the chunk as one list and drop its brackets; far fewer
+                # encoder calls than dumping item by item.
+                yield ('' if first else ',') + self.dumps(chunk, **dump_args)[1:-1]
+                chunk, first = [], False
+        if chunk:
+            yield ('' if first else ',') + self.dumps(chunk, **dump_args)[1:-1]
+        yield ']\n'
+
+    def array_response(self, items, chunk_size=100):
+        """Streams a JSON array without building the whole document in memory.
+
+        `items` is consumed lazily, inside the request context, so it can be
+        a generator over a query (ideally with yield_per).
+        """
+        return self._app.response_class(stream_with_context(self.iter_array(items, chunk_size)),
+                                        mimetype=self.mimetype)
+
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
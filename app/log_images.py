@@ -0,0 +1,135 @@
+# app/log_images.py
+"""Cooking log images kept as files instead of base64 in the database.
+
+The log-images backfill (app/backfill.py) writes a log's data: URI to
+UPLOAD_FOLDER_LOG_IMAGES, which is outside /static, and points the log's
+image_url at /logs/images/<file>. Each file belongs to one log (its name
+starts with the log's user and id), so:
+
+- it is only served to the user who owns the log;
+- it is deleted after the commit that deletes the log or replaces its
+  image, and kept if that transaction rolls back.
+
+Exports read file-backed images like data: URIs (see read_image).
+"""
+import base64
+import binascii
+import hashlib
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, has_app_context, send_from_directory
+from flask_login import current_user, login_required
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+from . import db
+from .models import CookingLog
+
+log_images = Blueprint('log_images', __name__)
+
+URL_PREFIX = '/logs/images/'
+
+
+def file_name(image_url):
+    """The file behind a file-backed image_url, or None for data: URIs and empty values."""
+    if isinstance(image_url, str) and image_url.startswith(URL_PREFIX):
+        return os.path.basename(image_url[len(URL_PREFIX):]) or None
+    return None
+
+
+def _decode_data_uri(data_uri):
+    """(bytes, mimetype) of a base64 data: URI, or None if it isn't one."""
+    header, _, data = data_uri.partition(',')
+    if not header.startswith('data:') or not header.endswith(';base64'):
+        return None
+    try:
+        return base64.b64decode(data, validate=True), header[len('data:'):-len(';base64')]
+    except (binascii.Error, ValueError):
+        return None
+
+
+def save_data_uri(log_entry, data_uri):
+    """Writes the log's data: URI image to a file. Returns its image_url, or None if the URI is unreadable."""
+    decoded = _decode_data_uri(data_uri)
+    if decoded is None:
+        return None
+    content, mimetype = decoded
+    folder = current_app.config['UPLOAD_FOLDER_LOG_IMAGES']
+    os.makedirs(folder, exist_ok=True)
+    filename = f"{log_entry.user_id}-{log_entry.id}-{hashlib.sha256(content).hexdigest()[:16]}" \
+               f"{mimetypes.guess_extension(mimetype) or '.img'}"
+    path = os.path.join(folder, filename)
+    if not os.path.exists(path): # Same log and bytes, same name: a retried chunk finds the file already there
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+    return URL_PREFIX + filename
+
+
+def read_image(image_url):
+    """(bytes, mimetype) of a log or recipe image, stored inline or as a file. None if there is none."""
+    if not isinstance(image_url, str):
+        return None
+    filename = file_name(image_url)
+    if filename is None:
+        return _decode_data_uri(image_url)
+    try:
+        with open(os.path.join(current_app.config['UPLOAD_FOLDER_LOG_IMAGES'], filename), 'rb') as f:
+            return f.read(), mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    except OSError as e:
+        print(f"Error reading log image {filename}: {e}")
+        return None
+
+
+# --- Serving ---
+@log_images.route('/<filename>', methods=['GET'])
+@login_required
+def log_image(filename):
+    owned = db.session.query(CookingLog.id).filter(CookingLog.user_id == current_user.id,
+                                                   CookingLog.image_url == URL_PREFIX + filename).first()
+    if owned is None:
+        abort(404)
+    # The name changes with the content, so the browser may keep it, but only for this user
+    response = send_from_directory(current_app.config['UPLOAD_FOLDER_LOG_IMAGES'], filename, max_age=31536000)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
+# --- Removing files their log no longer uses ---
+@event.listens_for(CookingLog.image_url, 'set', active_history=True)
+def _load_replaced_image_url(target, value, oldvalue, initiator):
+    pass # Loads the old value before it is replaced, so the flush knows which file it pointed to
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_unused_files(session, flush_context, instances):
+    if not has_app_context():
+        return
+    unused = []
+    for obj in session.deleted:
+        if isinstance(obj, CookingLog):
+            unused.append(file_name(obj.image_url)) # Still loadable: the row is deleted by this flush
+    for obj in session.dirty:
+        if isinstance(obj, CookingLog):
+            unused.extend(map(file_name, attributes.get_history(obj, 'image_url').deleted or ()))
+    unused = [name for name in unused if name]
+    if unused:
+        folder = current_app.config['UPLOAD_FOLDER_LOG_IMAGES']
+        session.info.setdefault('unused_log_images', []).extend(os.path.join(folder, name) for name in unused)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _remove_unused_files(session):
+    for path in session.info.pop('unused_log_images', ()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing unused log image {path}: {e}")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('unused_log_images', None)
@@ -0,0 +1,214 @@
+# app/maintenance.py
+"""SQLite housekeeping: planner statistics, free space, the WAL and integrity.
+
+Deleting recipes and replacing log images leave free pages that SQLite keeps
+for reuse, so the file only ever grows, and the query planner works from
+statistics gathered when the tables were small, if ever. One maintenance
+step does the following:
+
+- Refreshes the planner's statistics with ANALYZE under PRAGMA
+  analysis_limit. That samples a bounded number of rows per index, so it
+  stays quick on big tables.
+- Gives free pages back to the filesystem with PRAGMA incremental_vacuum.
+  It frees DB_MAINTENANCE_VACUUM_PAGES pages per short write transaction,
+  until none are left or DB_MAINTENANCE_MAX_SECONDS is up. This needs
+  auto_vacuum=INCREMENTAL, which the 8f3b6d21c4a7 migration turns on.
+- Checkpoints and truncates the WAL file, if the database uses WAL.
+- Optionally runs PRAGMA quick_check. It reads the whole file, so the
+  schedule only runs it every DB_MAINTENANCE_INTEGRITY_CHECK_HOURS.
+
+Each statement runs in its own transaction. If another connection holds
+the lock, the step skips that part rather than waiting.
+
+`flask db-maintain` runs one step on every database and reports the space
+it reclaimed. `flask db-maintain --schedule` queues a background job that
+runs a step every DB_MAINTENANCE_INTERVAL_SECONDS. Job workers only visit
+the shards, so with sharding the directory's job is stored on shard 0.
+"""
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from . import db, sharding
+from .jobs import enqueue, job
+from .transactions import is_busy_error
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def _pragma(conn, name):
+    return conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+def _run_unless_busy(conn, sql):
+    """Runs `sql` and returns its rows, or None if another connection holds the lock."""
+    try:
+        result = conn.exec_driver_sql(sql)
+        return result.fetchall() if result.returns_rows else []
+    except Exception as e:
+        if not is_busy_error(e):
+            raise
+        return None
+
+
+def incremental_vacuum(conn, pages):
+    """Frees up to `pages` free pages in one transaction. Returns False if another connection holds the lock."""
+    # pysqlite steps a statement once, and each step frees a single page;
+    # executescript runs the pragma to completion.
+    try:
+        conn.connection.driver_connection.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+        return True
+    except Exception as e:
+        if not is_busy_error(e):
+            raise
+        return False
+
+
+def file_size(engine):
+    """Size in bytes of the database file plus its WAL, or None for an in-memory database."""
+    path = engine.url.database
+    if not path or path == ':memory:':
+        return None
+    return sum(os.path.getsize(p) for p in (path, path + '-wal') if os.path.exists(p))
+
+
+def enable_incremental_vacuum(engine):
+    """Sets auto_vacuum=INCREMENTAL. Takes effect on a new, empty database; others need a VACUUM."""
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+
+
+def run_maintenance(engine, max_seconds=None, integrity_check=False):
+    """Runs one maintenance step on `engine`'s SQLite database. Returns a report dict."""
+    config = current_app.config
+    if max_seconds is None:
+        max_seconds = config.get('DB_MAINTENANCE_MAX_SECONDS', 2.0)
+    deadline = time.monotonic() + max_seconds
+    report = {'database': engine.url.database, 'size_before': file_size(engine), 'busy': []}
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        page_size = _pragma(conn, 'page_size')
+        report['auto_vacuum'] = AUTO_VACUUM_MODES.get(_pragma(conn, 'auto_vacuum'), 'unknown')
+        report['free_pages_before'] = _pragma(conn, 'freelist_count')
+
+        conn.exec_driver_sql(f"PRAGMA analysis_limit = {int(config.get('DB_MAINTENANCE_ANALYSIS_LIMIT', 1000))}")
+        if _run_unless_busy(conn, 'ANALYZE') is None:
+            report['busy'].append('analyze')
+
+        if report['auto_vacuum'] == 'incremental':
+            pages = int(config.get('DB_MAINTENANCE_VACUUM_PAGES', 256))
+            while _pragma(conn, 'freelist_count') and time.monotonic() < deadline:
+                if not incremental_vacuum(conn, pages):
+                    report['busy'].append('vacuum')
+                    break
+        report['free_pages_after'] = _pragma(conn, 'freelist_count')
+        # Other writers may free or reuse pages meanwhile, so this is an estimate
+        report['reclaimed_bytes'] = max(0, report['free_pages_before'] - report['free_pages_after']) * page_size
+
+        if _pragma(conn, 'journal_mode') == 'wal':
+            rows = _run_unless_busy(conn, 'PRAGMA wal_checkpoint(TRUNCATE)')
+            report['wal_checkpoint'] = 'done' if rows and not rows[0][0] else 'busy'
+
+        if integrity_check:
+            problems = [row[0] for row in conn.exec_driver_sql('PRAGMA quick_check').fetchall()]
+            report['integrity'] = 'ok' if problems == ['ok'] else problems
+
+    report['size_after'] = file_size(engine)
+    return report
+
+
+def format_report(report):
+    def size(num_bytes):
+        return f"{num_bytes / (1024 * 1024):.1f} MB" if num_bytes >= 1024 * 1024 else f"{num_bytes / 1024:.1f} KB"
+
+    parts = [f"reclaimed {size(report['reclaimed_bytes'])} "
+             f"({report['free_pages_before']} -> {report['free_pages_after']} free pages)"]
+    if report['size_before'] is not None:
+        parts.append(f"file {size(report['size_before'])} -> {size(report['size_after'])}")
+    if report['auto_vacuum'] != 'incremental':
+        parts.append(f"auto_vacuum is {report['auto_vacuum']}, run `flask db upgrade` to reclaim space")
+    if 'wal_checkpoint' in report:
+        parts.append(f"WAL checkpoint {report['wal_checkpoint']}")
+    if report['busy']:
+        parts.append(f"skipped while locked: {', '.join(report['busy'])}")
+    if 'integrity' in report:
+        integrity = report['integrity']
+        parts.append('integrity ok' if integrity == 'ok' else f"INTEGRITY PROBLEMS: {'; '.join(integrity[:5])}")
+    return '; '.join(parts)
+
+
+def databases():
+    """[(label, engine)]: the default database and, when sharded, each shard."""
+    if not sharding.enabled():
+        return [('database', db.engine)]
+    return [('directory', db.engine)] + [(f'shard {shard}', sharding.shard_engine(shard))
+                                         for shard in range(sharding.shard_count())]
+
+
+# --- Scheduled maintenance ---
+def schedule(delay_seconds=0, last_integrity_check=None, directory=False):
+    """Queues the maintenance job on the selected shard, unless one is already queued.
+
+    The job maintains the database it is stored in, or with `directory`
+    the sharded setup's directory database.
+    """
+    return enqueue('db_maintenance', key='db_maintenance:directory' if directory else 'db_maintenance',
+                   delay_seconds=delay_seconds, last_integrity_check=last_integrity_check, directory=directory)
+
+
+@job('db_maintenance')
+def scheduled_maintenance(last_integrity_check=None, directory=False):
+    """Runs a maintenance step on the job's database and queues the next one."""
+    now = _utcnow()
+    hours = current_app.config.get('DB_MAINTENANCE_INTEGRITY_CHECK_HOURS', 24)
+    check = last_integrity_check is None or \
+        now - datetime.fromisoformat(last_integrity_check) >= timedelta(hours=hours)
+    report = run_maintenance(db.engine if directory else db.session.get_bind(), integrity_check=check)
+    if report.get('integrity', 'ok') != 'ok':
+        current_app.logger.error("Database integrity check failed for %s: %s", report['database'], report['integrity'])
+    current_app.logger.info("Database maintenance (%s): %s", report['database'], format_report(report))
+    schedule(delay_seconds=current_app.config.get('DB_MAINTENANCE_INTERVAL_SECONDS', 3600),
+             last_integrity_check=now.isoformat() if check else last_integrity_check, directory=directory)
+
+
+def init_app(app):
+    app.cli.add_command(db_maintain_command)
+
+
+# --- CLI: flask db-maintain ---
+@click.command('db-maintain')
+@click.option('--max-seconds', type=click.FloatRange(min=0),
+              help='Time box for reclaiming free pages, per database (default DB_MAINTENANCE_MAX_SECONDS).')
+@click.option('--integrity-check', is_flag=True, help='Also run PRAGMA quick_check (reads the whole file).')
+@click.option('--schedule', 'schedule_jobs', is_flag=True,
+              help='Instead of running now, queue a background job that runs every DB_MAINTENANCE_INTERVAL_SECONDS.')
+@with_appcontext
+def db_maintain_command(max_seconds, integrity_check, schedule_jobs):
+    """Refresh planner statistics, reclaim free pages and checkpoint the WAL."""
+    if schedule_jobs:
+        for shard in sharding.each_shard(): # The job maintains the database it is stored in
+            schedule()
+            if shard == 0: # Workers don't visit the directory, so its job lives here
+                schedule(directory=True)
+            db.session.commit()
+        click.echo("Scheduled database maintenance; `flask jobs run` workers will run it.")
+        return
+
+    problems = False
+    for label, engine in databases():
+        if engine.dialect.name != 'sqlite':
+            click.echo(f"{label}: skipped, not SQLite")
+            continue
+        report = run_maintenance(engine, max_seconds=max_seconds, integrity_check=integrity_check)
+        click.echo(f"{label}: {format_report(report)}")
+        problems = problems or report.get('integrity', 'ok') != 'ok'
+    if problems:
+        raise click.ClickException("Integrity check found problems; restore from a backup or run VACUUM INTO a new file.")
@@ -4,41 +4,158 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
 from flask_login import UserMixin
 from datetime import date, datetime, timedelta, timezone # Added timezone
+from sqlalchemy import case, select
+from sqlalchemy.ext.hybrid import hybrid_property
+
+def parse_ingredients_json(ingredients_json):
+    """Returns the cleaned ingredient list stored in Recipe.ingredients_json."""
+    if not ingredients_json: # Handle case where ingredients_json might be None or empty
+        return []
+    try:
+        # Ensure that what's loaded is a list, filter if not.
+        loaded_list = json.loads(ingredients_json)
+        if isinstance(loaded_list, list):
+            # Filter out empty strings or strings with only whitespace AFTER loading
+            # This ensures the property always returns clean data
+            return [item for item in loaded_list if isinstance(item, str) and item.strip()]
+        else: # If it's not a list (e.g. was a single string incorrectly stored as JSON)
+            return [loaded_list] if isinstance(loaded_list, str) and loaded_list.strip() else []
+    except (json.JSONDecodeError, TypeError):
+        # Fallback for when ingredients_json is not valid JSON but a simple comma-separated string
+        if isinstance(ingredients_json, str):
+             return [i.strip() for i in ingredients_json.split(',') if i.strip()]
+        return []
+
+class RecipeContent(db.Model):
+    """Ingredients, instructions and image shared by a recipe and its clones.
+
+    Cloning points the clone at this row instead of copying the (often large)
+    text and base64 image. The first write to any of the three fields copies
+    them back onto that recipe (copy-on-write); see Recipe.share_content and
+    app/recipe_content.py, which deletes rows no recipe points at any more.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    ingredients_json = db.Column(db.Text, nullable=False)
+    instructions = db.Column(db.Text, nullable=False)
+    image = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<RecipeContent {self.id}>"
 
 class Recipe(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     time = db.Column(db.Integer, nullable=False)
-    ingredients_json = db.Column(db.Text, nullable=False)
-    instructions = db.Column(db.Text, nullable=False)
+    # The recipe's own content. Read and write it through the ingredients_json,
+    # instructions and image attributes below, which resolve shared content.
+    _ingredients_json = db.Column('ingredients_json', db.Text, nullable=True)
+    _instructions = db.Column('instructions', db.Text, nullable=True)
     date = db.Column(db.String(30), nullable=False) # Original creation/added date
-    image = db.Column(db.Text, nullable=True)
+    _image = db.Column('image', db.Text, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Set on clones (and on recipes that have been cloned): the content lives in RecipeContent
+    content_id = db.Column(db.Integer, db.ForeignKey('recipe_content.id'), nullable=True, index=True)
+    content = db.relationship('RecipeContent', lazy='selectin')
 
     cooking_logs = db.relationship('CookingLog', backref='recipe_logged', lazy=True)
+    # Normalized copy of the ingredient list, rebuilt on flush by app/ingredients.py
+    ingredient_index = db.relationship('RecipeIngredient', backref='recipe', lazy=True,
+                                       cascade='all, delete-orphan', order_by='RecipeIngredient.position')
     
     # whitelist should default to an empty list
     whitelist = db.Column(db.JSON, default=lambda: [])
 
+    # Aggregates over this recipe's cooking logs, kept current by app/counters.py
+    cook_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    rating_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    duration_sum = db.Column(db.Integer, default=0, server_default='0', nullable=False) # Seconds
+    last_cooked = db.Column(db.Date, nullable=True)
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False) # See app/sync.py
+
+    __table_args__ = (db.Index('ix_recipe_user_sync', 'user_id', 'sync_version'),
+                      db.CheckConstraint('content_id IS NOT NULL OR '
+                                         '(ingredients_json IS NOT NULL AND instructions IS NOT NULL)',
+                                         name='ck_recipe_has_content'))
+
+    # --- Content (own or shared with clones) ---
+    def share_content(self):
+        """Returns the RecipeContent a clone of this recipe can point at.
+
+        The first time, this recipe's own content moves into a new
+        RecipeContent (it isn't copied), so every later clone is free.
+        """
+        if self.content is None:
+            self.content = RecipeContent(ingredients_json=self._ingredients_json,
+                                         instructions=self._instructions, image=self._image)
+            self._ingredients_json = self._instructions = self._image = None
+        return self.content
+
+    def _own_content(self):
+        # Copy-on-write: take a private copy of shared content before changing any of it
+        if self.content is not None:
+            shared = self.content
+            self._ingredients_json, self._instructions, self._image = \
+                shared.ingredients_json, shared.instructions, shared.image
+            self.content = None
+
+    @classmethod
+    def _content_expression(cls, own_column, shared_column):
+        return case((cls.content_id.is_(None), own_column),
+                    else_=select(shared_column).where(RecipeContent.id == cls.content_id).scalar_subquery())
+
+    @hybrid_property
+    def ingredients_json(self):
+        return self.content.ingredients_json if self.content is not None else self._ingredients_json
+
+    @ingredients_json.setter
+    def ingredients_json(self, value):
+        self._own_content()
+        self._ingredients_json = value
+
+    @ingredients_json.expression
+    def ingredients_json(cls):
+        return cls._content_expression(cls._ingredients_json, RecipeContent.ingredients_json)
+
+    @hybrid_property
+    def instructions(self):
+        return self.content.instructions if self.content is not None else self._instructions
+
+    @instructions.setter
+    def instructions(self, value):
+        self._own_content()
+        self._instructions = value
+
+    @instructions.expression
+    def instructions(cls):
+        return cls._content_expression(cls._instructions, RecipeContent.instructions)
+
+    @hybrid_property
+    def image(self):
+        return self.content.image if self.content is not None else self._image
+
+    @image.setter
+    def image(self, value):
+        self._own_content()
+        self._image = value
+
+    @image.expression
+    def image(cls):
+        return cls._content_expression(cls._image, RecipeContent.image)
+
     @property
     def ingredients(self):
-        if not self.ingredients_json: # Handle case where ingredients_json might be None or empty
-            return []
-        try:
-            # Ensure that what's loaded is a list, filter if not.
-            loaded_list = json.loads(self.ingredients_json)
-            if isinstance(loaded_list, list):
-                # Filter out empty strings or strings with only whitespace AFTER loading
-                # This ensures the property always returns clean data
-                return [item for item in loaded_list if isinstance(item, str) and item.strip()]
-            else: # If it's not a list (e.g. was a single string incorrectly stored as JSON)
-                return [loaded_list] if isinstance(loaded_list, str) and loaded_list.strip() else []
-        except (json.JSONDecodeError, TypeError):
-            # Fallback for when ingredients_json is not valid JSON but a simple comma-separated string
-            if isinstance(self.ingredients_json, str):
-                 return [i.strip() for i in self.ingredients_json.split(',') if i.strip()]
-            return []
+        # Parsed once per value of ingredients_json: the cache is keyed on the
+        # string object itself, so the setter, a direct assignment or a refresh
+        # from the database (all of which store a new string) invalidate it.
+        raw = self.ingredients_json
+        cached = self.__dict__.get('_ingredients_cache')
+        if cached is None or cached[0] is not raw:
+            cached = (raw, parse_ingredients_json(raw))
+            self.__dict__['_ingredients_cache'] = cached
+        return list(cached[1]) # A copy, so callers can't change the cached list
 
     @ingredients.setter
     def ingredients(self, value):
@@ -55,6 +172,10 @@ class Recipe(db.Model):
         else:
             self.ingredients_json = json.dumps([])
 
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -66,7 +187,10 @@ class Recipe(db.Model):
             'date': self.date,
             'image': self.image,
             'author': self.author.username if self.author else 'Unknown',
-            'user_id': self.user_id
+            'user_id': self.user_id,
+            'times_cooked': self.cook_count or 0,
+            'average_rating': self.average_rating,
+            'last_cooked': self.last_cooked,
         }
 
     def __repr__(self):
@@ -86,6 +210,13 @@ class User(UserMixin, db.Model):
     cooking_logs = db.relationship('CookingLog', backref='cook', lazy=True)
     last_cooked_date = db.Column(db.Date, nullable=True)
     current_streak = db.Column(db.Integer, default=0, nullable=False)
+    # Bumped whenever this user's logs/recipes change (see app/versioning.py); used in cache keys
+    logs_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    recipes_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Delta sync (app/sync.py): bumped once per flush that changes anything this
+    # user syncs; tombstones at or below sync_floor have been pruned.
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    sync_floor = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     def set_password(self, password):
         """Hashes the password using Werkzeug and stores it."""
@@ -103,25 +234,89 @@ class User(UserMixin, db.Model):
 class CookingLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False, index=True)
     date_cooked = db.Column(db.Date, nullable=False, default=date.today)
     duration_seconds = db.Column(db.Integer, nullable=True) 
     rating = db.Column(db.Integer, nullable=True) 
     notes = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     image_url = db.Column(db.Text, nullable=True) # Stores base64 encoded image or path
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False) # See app/sync.py
+
+    # Stats, recent activity and the logs page all filter by user and date
+    __table_args__ = (db.Index('ix_cooking_log_user_date', 'user_id', 'date_cooked'),
+                      db.Index('ix_cooking_log_user_sync', 'user_id', 'sync_version'))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'recipe_id': self.recipe_id,
+            'date_cooked': self.date_cooked,
+            'duration_seconds': self.duration_seconds,
+            'rating': self.rating,
+            'notes': self.notes,
+            'created_at': self.created_at,
+            'has_image': bool(self.image_url), # The image itself is fetched with the log page
+        }
 
     def __repr__(self):
         recipe_name = self.recipe_logged.name if self.recipe_logged else 'Unknown Recipe'
         has_image_str = " (has image)" if self.image_url else ""
         return f"<CookingLog {self.id} for '{recipe_name}' by User {self.user_id} on {self.date_cooked}{has_image_str}>"
 
+class RecipeIngredient(db.Model):
+    """One ingredient of a recipe, normalized so recipes can be looked up by ingredient."""
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Copied from the recipe
+    name = db.Column(db.String(150), nullable=False) # See app.ingredients.normalize_ingredient
+    position = db.Column(db.Integer, nullable=False)
+
+    # Ingredient searches are always within one user's recipes
+    __table_args__ = (db.Index('ix_recipe_ingredient_user_name', 'user_id', 'name', 'recipe_id'),)
+
+    def __repr__(self):
+        return f"<RecipeIngredient {self.recipe_id}:{self.position} {self.name}>"
+
+class RecipeRevision(db.Model):
+    """One saved edit of a recipe: a full snapshot or a field-level delta (see app/revisions.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
+    number = db.Column(db.Integer, nullable=False) # 1, 2, ... per recipe
+    kind = db.Column(db.String(10), nullable=False) # 'snapshot' or 'delta'
+    data = db.Column(db.JSON, nullable=False)
+    changed = db.Column(db.String(100), nullable=False) # Comma-separated field names, for listing without `data`
+    editor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.UniqueConstraint('recipe_id', 'number', name='uq_recipe_revision_number'),)
+
+    def __repr__(self):
+        return f"<RecipeRevision {self.number} of Recipe {self.recipe_id} ({self.kind})>"
+
+class SyncTombstone(db.Model):
+    """Records a deleted recipe, log or share so delta sync can tell clients to drop it."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False) # 'recipes', 'logs' or 'shares'
+    object_id = db.Column(db.Integer, nullable=False)
+    sync_version = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (db.Index('ix_sync_tombstone_user_sync', 'user_id', 'sync_version'),)
+
+    def __repr__(self):
+        return f"<SyncTombstone {self.kind}:{self.object_id} for User {self.user_id} at {self.sync_version}>"
+
 class SharedRecipe(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     sharer_name = db.Column(db.String(80), nullable=False)
     recipe_id = db.Column(db.Integer, db.ForeignKey('recipe.id'), nullable=False)
     date_shared = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sync_version = db.Column(db.Integer, default=0, server_default='0', nullable=False) # See app/sync.py
+
+    __table_args__ = (db.Index('ix_shared_recipe_receiver_sync', 'receiver_id', 'sync_version'),)
 
     def to_dict(self):
         recipe = Recipe.query.get(self.recipe_id) 
@@ -132,4 +327,49 @@ class SharedRecipe(db.Model):
             'sharer_name': self.sharer_name,
             'date_shared': self.date_shared.isoformat(),
             'recipe_name': recipe.name if recipe else 'Unknown'
-        }
\ No newline at end of file
+        }
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by app.jobs workers."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.JSON, default=lambda: {})
+    key = db.Column(db.String(200), nullable=True, index=True) # Idempotency key, see app.jobs.enqueue
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),
+                      # At most one queued job per key, see app.jobs.enqueue
+                      db.Index('ix_job_queued_key', 'key', unique=True, sqlite_where=db.text("status = 'queued'")))
+
+    def __repr__(self):
+        return f"<Job {self.id}: {self.name} ({self.status})>"
+
+
+class BackfillCheckpoint(db.Model):
+    """How far a named backfill (app.backfill) has got, so an interrupted run resumes there."""
+    name = db.Column(db.String(80), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='pending') # pending, running, paused, done, failed
+    last_id = db.Column(db.Integer, nullable=False, default=0) # Rows with ids up to this one are done
+    rows_done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True) # rows_done plus what was left when the last run started
+    last_error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<BackfillCheckpoint {self.name}: {self.status} at id {self.last_id}>"
+
+
+class IdSequence(db.Model):
+    """The last id handed out for a table, where ids are allocated by the app (see app.sharding)."""
+    name = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
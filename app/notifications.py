@@ -0,0 +1,258 @@
+# app/notifications.py
+"""New shares for the receiver, as Server-Sent Events or short polls.
+
+The shared_recipe table doubles as the notification log. Shares carry the
+receiver's sync_version (see app/sync.py), which only grows and commits in
+order per user, so an event's id is that version and a reconnecting
+EventSource resumes from its Last-Event-ID with one indexed query. (Share
+ids can't be used: SQLite hands a deleted share's id out again.) Shares
+added in one flush share a version, so only the last event of a version
+carries an id.
+
+Waiting connections block on a ShareHub, not on the database. Shares
+committed by this process wake their receivers immediately (after_commit).
+Shares committed elsewhere (other web workers, `flask jobs run`) are found
+by one poller thread per process, which runs a single grouped query per
+SSE_POLL_INTERVAL for all listening users, however many connections are
+open.
+
+An open stream occupies whatever serves it, so streams are only offered
+where waiting is cheap: under gevent (gunicorn.conf.py), where it is a
+greenlet, or where SSE_ENABLED says so. Under sync workers, where every open
+page would hold a whole worker, the page polls /api/events/shares/poll every
+SHARE_POLL_SECONDS instead, which answers at once.
+"""
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, has_app_context, jsonify, request
+from flask_login import current_user, login_required
+from sqlalchemy import event, func, select
+from . import db, sharding
+from .models import SharedRecipe
+from .sync import share_dicts
+
+try: # gevent is optional; without it share events are polled rather than streamed
+    from gevent import monkey
+except ImportError:
+    monkey = None
+
+events = Blueprint('events', __name__)
+
+
+class ShareHub:
+    """Tracks the newest share version per listening receiver and wakes streams waiting on them."""
+
+    def __init__(self, app):
+        self.app = app
+        self.condition = threading.Condition()
+        self.latest = {} # receiver_id -> newest share version seen
+        self.listeners = {} # receiver_id -> open stream count
+        self.poller = None
+
+    def publish(self, receiver_id, version):
+        with self.condition:
+            if receiver_id in self.listeners and version > self.latest.get(receiver_id, 0):
+                self.latest[receiver_id] = version
+                self.condition.notify_all()
+
+    def subscribe(self, receiver_id):
+        with self.condition:
+            self.listeners[receiver_id] = self.listeners.get(receiver_id, 0) + 1
+        self._start_poller()
+
+    def unsubscribe(self, receiver_id):
+        with self.condition:
+            self.listeners[receiver_id] -= 1
+            if not self.listeners[receiver_id]:
+                del self.listeners[receiver_id]
+                self.latest.pop(receiver_id, None)
+
+    def wait(self, receiver_id, after_version, timeout):
+        """Blocks until a share newer than `after_version` is known or `timeout` passes. Returns the newest version."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.latest.get(receiver_id, 0) > after_version, timeout)
+            return self.latest.get(receiver_id, 0)
+
+    def poll_once(self):
+        """Picks up shares committed by other processes for everyone listening here."""
+        with self.condition:
+            receiver_ids = list(self.listeners)
+        if not receiver_ids:
+            return
+        newest = []
+        with self.app.app_context():
+            for _ in sharding.each_shard(): # One grouped query per shard
+                newest.extend(db.session.query(SharedRecipe.receiver_id, func.max(SharedRecipe.sync_version))
+                              .filter(SharedRecipe.receiver_id.in_(receiver_ids))
+                              .group_by(SharedRecipe.receiver_id)
+                              .all())
+        for receiver_id, version in newest:
+            self.publish(receiver_id, version)
+
+    def _poll_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error polling for new shares: {e}")
+
+    def _start_poller(self):
+        interval = self.app.config.get('SSE_POLL_INTERVAL', 2.0)
+        if not interval or self.poller is not None:
+            return
+        with self.condition:
+            if self.poller is None:
+                self.poller = threading.Thread(target=self._poll_loop, args=(interval,),
+                                               name='share-events-poller', daemon=True)
+                self.poller.start()
+
+
+# --- Publishing shares committed by this process ---
+@event.listens_for(db.session, 'after_flush')
+def _collect_new_shares(session, flush_context):
+    share_ids = [obj.id for obj in session.new if isinstance(obj, SharedRecipe)]
+    if share_ids:
+        session.info.setdefault('new_share_ids', []).extend(share_ids)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _read_share_versions(session, flush_context):
+    # After every after_flush listener, so app/sync.py has stamped the shares' versions
+    share_ids = session.info.pop('new_share_ids', None)
+    if share_ids:
+        versions = session.connection().execute(select(SharedRecipe.receiver_id, SharedRecipe.sync_version)
+                                                .where(SharedRecipe.id.in_(share_ids))).all()
+        session.info.setdefault('new_shares', []).extend(versions)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_new_shares(session):
+    shares = session.info.pop('new_shares', None)
+    if not shares:
+        return
+    hub = current_app.extensions.get('share_events') if has_app_context() else None
+    if hub is None:
+        return
+    for receiver_id, version in shares:
+        hub.publish(receiver_id, version)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('new_share_ids', None)
+    session.info.pop('new_shares', None)
+
+
+# --- The event stream ---
+def streams_supported(app):
+    """Whether to offer the event stream: SSE_ENABLED if set, else whether gevent has patched this process."""
+    enabled = app.config.get('SSE_ENABLED')
+    if enabled is not None:
+        return enabled
+    return monkey is not None and monkey.is_module_patched('socket')
+
+
+def _latest_version(receiver_id):
+    return db.session.query(func.coalesce(func.max(SharedRecipe.sync_version), 0))\
+                     .filter(SharedRecipe.receiver_id == receiver_id).scalar()
+
+
+def _new_shares(receiver_id, after_version):
+    """Returns [(version, share dict)] for the receiver's shares newer than `after_version`, oldest first."""
+    versions = dict(db.session.query(SharedRecipe.id, SharedRecipe.sync_version)
+                    .filter(SharedRecipe.receiver_id == receiver_id, SharedRecipe.sync_version > after_version)
+                    .all())
+    if not versions:
+        return []
+    shares = share_dicts(SharedRecipe.query.filter(SharedRecipe.id.in_(versions)))
+    return sorted(((versions[share['id']], share) for share in shares), key=lambda pair: (pair[0], pair[1]['id']))
+
+
+def _new_share_events(app, receiver_id, after_version):
+    """Returns [(version, event text)] for the receiver's shares newer than `after_version`."""
+    # A short-lived context per batch, so no connection is held while the stream waits
+    with app.app_context():
+        sharding.select_user_shard(receiver_id)
+        shares = _new_shares(receiver_id, after_version)
+    messages = []
+    for i, (version, share) in enumerate(shares):
+        # Only the last event of a version moves Last-Event-ID past it
+        last_of_version = i + 1 == len(shares) or shares[i + 1][0] != version
+        event_id = f"id: {version}\n" if last_of_version else ''
+        messages.append((version, f"{event_id}event: share\ndata: {app.json.dumps(share)}\n\n"))
+    return messages
+
+
+def _parse_version(value, receiver_id):
+    """A client's last seen version, or the current one when it has none (the page has just loaded the list)."""
+    if value is None:
+        return _latest_version(receiver_id)
+    return int(value)
+
+
+@events.route('/shares', methods=['GET'])
+@login_required
+def share_events():
+    app = current_app._get_current_object()
+    if not streams_supported(app):
+        # EventSource gives up on an error status instead of reconnecting
+        return jsonify({"error": "Share events are polled on this server; use /api/events/shares/poll"}), 503
+    receiver_id = current_user.id
+    try:
+        last_event_id = _parse_version(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'),
+                                       receiver_id)
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    hub = app.extensions['share_events']
+    stream_seconds = app.config.get('SSE_STREAM_SECONDS', 30)
+    keepalive_seconds = app.config.get('SSE_KEEPALIVE_SECONDS', 15)
+
+    def generate():
+        last_version = last_event_id
+        hub.subscribe(receiver_id)
+        try:
+            yield f"retry: {app.config.get('SSE_RETRY_MS', 1000)}\n\n"
+            deadline = time.monotonic() + stream_seconds
+            newest = None # Check once on connect: shares made while disconnected were never published
+            while True:
+                if newest is None or newest > last_version:
+                    for version, message in _new_share_events(app, receiver_id, last_version):
+                        yield message
+                        last_version = version
+                    last_version = max(last_version, newest or 0) # Skips shares deleted before they were sent
+                elif newest is not None:
+                    yield ": keepalive\n\n"
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return # The browser reconnects with Last-Event-ID
+                newest = hub.wait(receiver_id, last_version, min(keepalive_seconds, remaining))
+        finally:
+            hub.unsubscribe(receiver_id)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Don't let a proxy buffer the stream
+    return response
+
+
+@events.route('/shares/poll', methods=['GET'])
+@login_required
+def poll_share_events():
+    """The short-polling fallback: shares newer than ?after=<version>, answered without waiting."""
+    receiver_id = current_user.id
+    try:
+        after = _parse_version(request.args.get('after'), receiver_id)
+    except ValueError:
+        return jsonify({"error": "Invalid 'after' version"}), 400
+    shares = _new_shares(receiver_id, after) if 'after' in request.args else []
+    response = jsonify({'shares': [share for _, share in shares],
+                        'last_event_id': max([after] + [version for version, _ in shares])})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def init_app(app):
+    app.extensions['share_events'] = ShareHub(app)
@@ -0,0 +1,123 @@
+# app/perf.py
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# Run in a fresh interpreter under `python -X importtime`, so nothing is
+# already imported. argv: config class name, then 'warm' or 'cold'.
+_STARTUP_PROBE = """\
+import json, sys, time
+start = time.perf_counter()
+import config
+from app import create_app
+app = create_app(getattr(config, sys.argv[1]))
+created = time.perf_counter()
+if sys.argv[2] == 'warm':
+    from app.perf import warm_up
+    warm_up(app)
+print(json.dumps({'create_app': created - start, 'ready': time.perf_counter() - start}))
+"""
+
+
+# --- Warming a preloaded app ---
+def warm_up(app):
+    """Does the work a worker would otherwise do on its first requests.
+
+    Call it on the app built for `gunicorn --preload`: it runs once in the
+    master process, and every forked worker inherits the configured mappers
+    and compiled templates. It never opens a database connection, so no
+    pooled connection is shared across the fork.
+    """
+    from sqlalchemy.orm import configure_mappers
+    from .templating import preload_templates
+
+    configure_mappers()
+    preload_templates(app)
+    with app.test_request_context():
+        app.extensions['assets'].importmap() # Loads the manifest and module list
+
+
+# --- Measuring startup ---
+def parse_importtime(output):
+    """Parses `python -X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # The header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+
+def measure_startup(config_name='DevelopmentConfig', warm=False, project_dir=None):
+    """Builds the app in a fresh interpreter and returns its timings.
+
+    The result has 'create_app' and 'ready' (after warm_up, if `warm`) in
+    seconds, measured from interpreter start of the probe script, and
+    'imports' as returned by parse_importtime.
+    """
+    if project_dir is None:
+        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', _STARTUP_PROBE,
+                             config_name, 'warm' if warm else 'cold'],
+                            cwd=project_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['imports'] = parse_importtime(result.stderr)
+    return timings
+
+
+def top_level_import_times(imports):
+    """Sums cumulative import time (in microseconds) per top-level package.
+
+    Only imports made directly by the probe (depth 1) are counted, so a
+    module is attributed to the package that first pulled it in.
+    """
+    totals = defaultdict(int)
+    for name, _, cumulative, depth in imports:
+        if depth == 1:
+            totals[name.split('.')[0]] += cumulative
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def init_app(app):
+    app.cli.add_command(perf_cli)
+
+
+# --- CLI: flask perf ... ---
+perf_cli = AppGroup('perf', help='Measure application performance.')
+
+
+@perf_cli.command('startup')
+@click.option('--config', 'config_name', default='ProductionConfig', show_default=True,
+              help='Config class from config.py to build the app with.')
+@click.option('--warm', is_flag=True, help='Also run warm_up(), as wsgi.py does.')
+@click.option('--top', default=15, show_default=True, help='Number of packages/modules to list.')
+def startup_command(config_name, warm, top):
+    """Report create_app time and the slowest imports, from a cold interpreter."""
+    project_dir = os.path.dirname(current_app.root_path)
+    timings = measure_startup(config_name, warm=warm, project_dir=project_dir)
+
+    click.echo(f"create_app: {timings['create_app'] * 1000:.1f} ms")
+    if warm:
+        click.echo(f"ready (after warm_up): {timings['ready'] * 1000:.1f} ms")
+
+    click.echo("\nSlowest top-level packages (cumulative):")
+    for name, cumulative in top_level_import_times(timings['imports'])[:top]:
+        click.echo(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    click.echo("\nSlowest modules (self time):")
+    slowest = sorted(timings['imports'], key=lambda entry: entry[1], reverse=True)[:top]
+    for name, self_us, _, _ in slowest:
+        click.echo(f"  {self_us / 1000:8.1f} ms  {name}")
@@ -0,0 +1,29 @@
+# app/recipe_content.py
+"""Garbage collection of RecipeContent rows shared between recipes and their clones.
+
+A RecipeContent is released when a recipe pointing at it is deleted or takes
+a private copy on its first edit (copy-on-write, see Recipe._own_content).
+Every flush that releases one deletes it in the same transaction once no
+recipe points at it any more.
+"""
+from sqlalchemy import delete, event, exists, select
+from sqlalchemy.orm import attributes
+from . import db
+from .models import Recipe, RecipeContent
+
+
+@event.listens_for(db.session, 'after_flush')
+def _delete_released_content(session, flush_context):
+    released = set()
+    for obj in list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Recipe):
+            continue
+        if obj in session.deleted:
+            released.add(obj.content_id)
+        released.update(content.id for content in attributes.get_history(obj, 'content').deleted
+                        if content is not None)
+    released.discard(None)
+    if released:
+        still_used = exists(select(Recipe.id).where(Recipe.content_id == RecipeContent.id))
+        session.connection().execute(delete(RecipeContent.__table__)
+                                     .where(RecipeContent.id.in_(released), ~still_used))
@@ -0,0 +1,142 @@
+# app/revisions.py
+"""Recipe revision history stored as field-level deltas.
+
+Every saved edit adds a RecipeRevision holding only what changed: short
+fields are stored whole, long text (instructions) as a line diff against the
+previous revision, so an edit costs about as much as the lines it touches.
+Revision 1 is a full snapshot of the recipe as it was before its first edit,
+and every REVISION_SNAPSHOT_INTERVAL revisions another full snapshot is
+stored, so rebuilding any revision replays at most that many deltas.
+
+Heavy fields (the base64 image) are never copied into a snapshot or delta.
+Revisions store only a hash of their value, and the bytes themselves are
+kept once, in the `replaced` entry of the revision that changed them. To
+rebuild an image, take it from the next revision that changed it, or from
+the recipe itself if none has since.
+"""
+import hashlib
+from difflib import SequenceMatcher
+
+from flask import current_app
+from sqlalchemy import func
+from . import db
+from .models import Recipe, RecipeRevision
+
+REVISION_FIELDS = ('name', 'category', 'time', 'ingredients', 'instructions', 'image')
+PATCHED_FIELDS = ('instructions',) # Long text worth diffing; the rest are stored whole
+HEAVY_FIELDS = ('image',) # Stored by reference; see the module docstring
+
+
+def revision_fields(recipe):
+    return {field: getattr(recipe, field) for field in REVISION_FIELDS}
+
+
+def _reference(value):
+    return None if value is None else {'sha256': hashlib.sha256(value.encode()).hexdigest()}
+
+
+def _stored(fields):
+    """`fields` with heavy values replaced by references, as kept in a snapshot."""
+    return {field: _reference(value) if field in HEAVY_FIELDS else value for field, value in fields.items()}
+
+
+# --- Line diffs ---
+def diff_text(old, new):
+    """Returns ops that rebuild `new` from `old`: [start, end] copies old lines, a string inserts text."""
+    old_lines, new_lines = (old or '').splitlines(keepends=True), (new or '').splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1: # insert or replace; deletes just skip old lines
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_diff(old, ops):
+    old_lines = (old or '').splitlines(keepends=True)
+    return ''.join(''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+
+def _delta(before, after):
+    data = {'set': {}, 'patch': {}}
+    for field in REVISION_FIELDS:
+        if before[field] == after[field]:
+            continue
+        if field in PATCHED_FIELDS and before[field] and after[field]:
+            ops = diff_text(before[field], after[field])
+            if len(current_app.json.dumps(ops)) < len(after[field]):
+                data['patch'][field] = ops
+                continue
+        data['set'][field] = _reference(after[field]) if field in HEAVY_FIELDS else after[field]
+    return data
+
+
+# --- Recording and rebuilding ---
+def record_revision(recipe, before, editor_id):
+    """Adds a revision for the changes made to `recipe` since `before` (from revision_fields).
+
+    Returns the new RecipeRevision, or None when nothing tracked changed.
+    """
+    after = revision_fields(recipe)
+    if after == before:
+        return None
+    latest = db.session.query(func.max(RecipeRevision.number)).filter_by(recipe_id=recipe.id).scalar() or 0
+    if latest == 0:
+        # The first edit also records what it replaced, so it can be undone
+        db.session.add(RecipeRevision(recipe_id=recipe.id, number=1, kind='snapshot', data=_stored(before),
+                                      changed=','.join(REVISION_FIELDS), editor_id=recipe.user_id))
+        latest = 1
+    number = latest + 1
+    interval = current_app.config.get('REVISION_SNAPSHOT_INTERVAL', 20)
+    changed = ','.join(field for field in REVISION_FIELDS if before[field] != after[field])
+    if (number - 1) % interval == 0:
+        data, kind = _stored(after), 'snapshot'
+    else:
+        data, kind = _delta(before, after), 'delta'
+    replaced = {field: before[field] for field in HEAVY_FIELDS if before[field] != after[field]}
+    if replaced: # The only copy of the old value once the recipe no longer holds it
+        data['replaced'] = replaced
+    revision = RecipeRevision(recipe_id=recipe.id, number=number, kind=kind, data=data,
+                              changed=changed, editor_id=editor_id)
+    db.session.add(revision)
+    return revision
+
+
+def rebuild_revision(recipe_id, number):
+    """Returns the recipe's fields as of revision `number`, or None if there is no such revision."""
+    snapshot = (db.session.query(func.max(RecipeRevision.number))
+                .filter(RecipeRevision.recipe_id == recipe_id, RecipeRevision.kind == 'snapshot',
+                        RecipeRevision.number <= number)
+                .scalar())
+    if snapshot is None:
+        return None
+    revisions = (RecipeRevision.query
+                 .filter(RecipeRevision.recipe_id == recipe_id,
+                         RecipeRevision.number.between(snapshot, number))
+                 .order_by(RecipeRevision.number)
+                 .all())
+    if revisions[-1].number != number:
+        return None
+    fields = {field: revisions[0].data[field] for field in REVISION_FIELDS}
+    for revision in revisions[1:]:
+        fields.update(revision.data['set'])
+        for field, ops in revision.data['patch'].items():
+            fields[field] = apply_diff(fields[field], ops)
+    for field in HEAVY_FIELDS:
+        if isinstance(fields[field], dict): # Revisions stored before references hold the value itself
+            fields[field] = _resolve(recipe_id, number, field)
+    return fields
+
+
+def _resolve(recipe_id, number, field):
+    """The value a heavy field had at revision `number`: whatever the next change to it replaced."""
+    later = (db.session.query(RecipeRevision.number, RecipeRevision.changed)
+             .filter(RecipeRevision.recipe_id == recipe_id, RecipeRevision.number > number)
+             .order_by(RecipeRevision.number))
+    for later_number, changed in later:
+        if field in changed.split(','):
+            return RecipeRevision.query.filter_by(recipe_id=recipe_id, number=later_number)\
+                                       .one().data['replaced'][field]
+    return getattr(db.session.get(Recipe, recipe_id), field)
@@ -1,20 +1,71 @@
 # app/routes.py
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort, current_app
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, abort, current_app, make_response, session
 from flask_login import login_required, current_user
-from .models import Recipe, User, CookingLog, SharedRecipe, db
+from .models import Recipe, RecipeRevision, User, CookingLog, SharedRecipe, db
+from sqlalchemy import func
 from datetime import date, datetime, timedelta, timezone 
 from zoneinfo import ZoneInfo 
-from sqlalchemy import func, desc
 import base64 
+import hashlib
 import os 
+import time
 from werkzeug.utils import secure_filename 
 from .forms import UpdateProfileForm # Import the new form
+from .jobs import job, enqueue
+from . import sharding, write_queue
+from .transactions import transactional
+from .stats import calculate_user_stats, STATS_SECTIONS
+from .ingredients import MAX_SEARCH_TERMS, cookable_recipes, recipes_with_ingredients
+from .notifications import streams_supported
+from .revisions import rebuild_revision, record_revision, revision_fields
+from .sync import share_dict, share_list_version, share_rows
 
 
 PERTH_TZ = ZoneInfo("Australia/Perth")
 
 main = Blueprint('main', __name__)
 
+# --- Conditional GET ---
+# ETags are built from version stamps (User/row sync_version, see app/sync.py)
+# that are already loaded or cheap to read, so a matching If-None-Match is
+# answered with a 304 before the body is queried, serialized or rendered.
+
+def _etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()[:20]
+
+
+def _page_etag(*parts):
+    """ETag for a rendered page, or None when it can't be reused.
+
+    Pending flash messages are rendered into the page (and consumed), so such
+    a page is neither answered with a 304 nor given an ETag. Pages embedding a
+    CSRF token change with the session's token and before the token expires.
+    """
+    if session.get('_flashes'):
+        return None
+    if current_app.config.get('WTF_CSRF_ENABLED', True):
+        time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+        token_epoch = int(time.time() // (time_limit / 2)) if time_limit else 0
+        parts += (session.get('csrf_token', ''), token_epoch)
+    return _etag(*parts)
+
+
+def _not_modified(etag):
+    """Returns a 304 if the client already holds `etag`, else None."""
+    if etag and request.if_none_match.contains_weak(etag):
+        return _with_validator(current_app.response_class(status=304), etag)
+    return None
+
+
+def _with_validator(response, etag):
+    response = make_response(response)
+    if etag:
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True # Always revalidate; a 304 is cheap
+    return response
+
+
 # --- Helper function for image saving (No Pillow) ---
 def save_profile_picture(form_picture_file):
     # form_picture_file is a FileStorage object from Flask/Werkzeug
@@ -82,6 +133,25 @@ def _recalculate_user_streak_and_last_cooked(user_id):
     
     db.session.add(user) 
 
+
+# --- Background jobs (see app/jobs.py) ---
+@job('recalculate_streak')
+def recalculate_streak_job(user_id):
+    _recalculate_user_streak_and_last_cooked(user_id)
+
+
+@job('share_notification')
+def share_notification_job(receiver_id, recipe_id, sharer_name):
+    # Idempotent: re-running the job never creates a second notification
+    receiver_session = sharding.user_session(receiver_id) # db.session unless the receiver is on another shard
+    existing = receiver_session.query(SharedRecipe).filter_by(receiver_id=receiver_id, recipe_id=recipe_id).first()
+    if not existing and db.session.get(Recipe, recipe_id):
+        receiver_session.add(SharedRecipe(receiver_id=receiver_id, recipe_id=recipe_id, sharer_name=sharer_name))
+
+
+def _enqueue_streak_recalculation(user_id):
+    enqueue('recalculate_streak', key=f'streak:{user_id}', user_id=user_id)
+
 # --- HTML Page Routes ---
 @main.route('/')
 @main.route('/index')
@@ -95,35 +165,34 @@ def home():
     user_id = current_user.id
     user = db.session.get(User, user_id) 
 
-    recent_logs = []
-    streak_display_value = user.current_streak if user and user.current_streak is not None else 0
+    today_perth = datetime.now(PERTH_TZ).date()
+    streak_display_value = 0
 
     if user:
-        recent_logs = CookingLog.query.filter_by(user_id=user_id)\
-                                    .options(db.joinedload(CookingLog.recipe_logged))\
-                                    .order_by(CookingLog.date_cooked.desc(), CookingLog.created_at.desc())\
-                                    .limit(5).all()
-        
-        today_perth = datetime.now(PERTH_TZ).date()
         if user.last_cooked_date:
             days_since_last_cook = (today_perth - user.last_cooked_date).days
             if days_since_last_cook <= 1: 
                 streak_display_value = user.current_streak if user.current_streak is not None else 0
-            else: 
-                streak_display_value = 0 
-        else: 
-            streak_display_value = 0
-            
     else:
         flash("Error loading user data.", "warning")
-        streak_display_value = 0 
 
-    stats = calculate_user_stats(user_id)
+    # The template calls this only when its {% cache %} fragment misses, so a
+    # repeat visit with no new data doesn't query the logs at all.
+    def load_recent_logs():
+        return CookingLog.query.filter_by(user_id=user_id)\
+                               .options(db.joinedload(CookingLog.recipe_logged))\
+                               .order_by(CookingLog.date_cooked.desc(), CookingLog.created_at.desc())\
+                               .limit(5).all()
+
+    # Stats are fetched from /api/stats by the page once it has rendered. The
+    # version in the URL changes with the data, so the browser cache can be used freely.
+    stats_url = url_for('main.get_stats', v=_stats_version(current_user))
 
     return render_template('home.html', 
-                         recent_logs=recent_logs, 
+                         recent_logs=load_recent_logs, 
                          streak=streak_display_value, 
-                         log_stats=stats)
+                         stats_url=stats_url,
+                         share_stream=streams_supported(current_app))
 
 @main.route('/profile')
 @login_required
@@ -154,6 +223,8 @@ def edit_profile():
                     current_user.profile_picture_url = picture_file_url
                 # If picture_file_url is None, save_profile_picture flashed an error, current PFP remains.
             
+            if (form.username.data, form.email.data) != (form.original_username, form.original_email):
+                sharding.update_user(current_user.id, form.username.data, form.email.data)
             current_user.username = form.username.data
             current_user.email = form.email.data
             current_user.bio = form.bio.data
@@ -178,6 +249,7 @@ def edit_profile():
             return redirect(url_for('main.profile'))
         except Exception as e:
             db.session.rollback()
+            sharding.update_user(current_user.id, form.original_username, form.original_email)
             flash(f'An error occurred: {str(e)}', 'danger')
             print(f"Error updating profile: {e}")
 
@@ -200,7 +272,7 @@ def edit_profile():
 @login_required
 def view_recipe(recipe_id):
     try:
-        recipe = Recipe.query.get_or_404(recipe_id)
+        recipe = sharding.get_recipe_or_404(recipe_id) # A shared recipe may be on the owner's shard
         
         is_owner = (recipe.user_id == current_user.id)
         
@@ -210,8 +282,13 @@ def view_recipe(recipe_id):
         if not is_owner and not is_whitelisted:
             flash('You do not have permission to view this recipe.', 'warning')
             return redirect(url_for('main.home'))
-            
-        return render_template('view_recipe.html', recipe=recipe, is_owner=is_owner)
+
+        etag = _page_etag('view_recipe', recipe.id, recipe.sync_version, current_user.id,
+                          recipe.author.username if recipe.author else '')
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        return _with_validator(render_template('view_recipe.html', recipe=recipe, is_owner=is_owner), etag)
     except Exception as e:
         print(f"Error fetching recipe page {recipe_id}: {e}")
         flash('Error displaying recipe details.', 'danger')
@@ -222,7 +299,7 @@ def view_recipe(recipe_id):
 @main.route('/start_cooking/<int:recipe_id>')
 @login_required
 def start_cooking_session(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id)
+    recipe = sharding.get_recipe_or_404(recipe_id)
     is_owner = (recipe.user_id == current_user.id)
     current_recipe_whitelist = recipe.whitelist if isinstance(recipe.whitelist, list) else []
     is_whitelisted = (current_user.id in current_recipe_whitelist)
@@ -237,8 +314,9 @@ def start_cooking_session(recipe_id):
 # --- Route to handle the submission of the cooking log ---
 @main.route('/log_cooking/<int:recipe_id>', methods=['POST'])
 @login_required
+@transactional()
 def log_cooking_session(recipe_id):
-    recipe = Recipe.query.get_or_404(recipe_id) 
+    recipe = sharding.get_recipe_or_404(recipe_id) 
     
     is_owner_of_original = (recipe.user_id == current_user.id)
     current_recipe_whitelist = recipe.whitelist if isinstance(recipe.whitelist, list) else []
@@ -284,28 +362,29 @@ def log_cooking_session(recipe_id):
         duration_seconds = int(duration_str) if duration_str and duration_str.isdigit() else None
         rating = int(rating_str) if rating_str and rating_str.isdigit() and 1 <= int(rating_str) <= 5 else None
 
-        new_log = CookingLog(
-            user_id=current_user.id, recipe_id=recipe.id, date_cooked=date_cooked,
-            duration_seconds=duration_seconds, rating=rating, notes=notes,
-            image_url=log_image_url 
-        )
-        db.session.add(new_log)
-        
-        _recalculate_user_streak_and_last_cooked(current_user.id)
-
-        db.session.commit()
+        write_queue.submit(_add_cooking_log, current_user.id, recipe.id, date_cooked=date_cooked,
+                           duration_seconds=duration_seconds, rating=rating, notes=notes,
+                           image_url=log_image_url)
         flash(f'Successfully logged your cooking session for "{recipe.name}"!', 'success')
         return redirect(url_for('main.home'))
 
+    except write_queue.WriteTimeout:
+        raise # A 503: the log may still be written, so the form isn't offered again
     except Exception as e:
         db.session.rollback()
         print(f"ERROR logging cooking session: {e}")
         flash(f'An error occurred while logging the cooking session: {str(e)}', 'danger')
         return redirect(url_for('main.start_cooking_session', recipe_id=recipe.id))
 
+def _add_cooking_log(user_id, recipe_id, **fields):
+    # A write_queue write: may run on the writer thread, so it gets ids rather than objects
+    db.session.add(CookingLog(user_id=user_id, recipe_id=recipe_id, **fields))
+    _enqueue_streak_recalculation(user_id)
+
 # --- Edit Log Route ---
 @main.route('/edit_log/<int:log_id>', methods=['GET', 'POST'])
 @login_required
+@transactional()
 def edit_log(log_id):
     log_entry = CookingLog.query.get_or_404(log_id)
 
@@ -376,10 +455,9 @@ def edit_log(log_id):
             log_entry.duration_seconds = new_duration_seconds
             log_entry.rating = new_rating
             log_entry.notes = notes if notes else None
-            
-            db.session.commit() 
-            _recalculate_user_streak_and_last_cooked(current_user.id)
-            db.session.commit() 
+            _enqueue_streak_recalculation(current_user.id)
+
+            db.session.flush() 
 
             flash('Cooking log updated successfully!', 'success')
             return redirect(url_for('main.view_log_detail', log_id=log_entry.id)) 
@@ -397,15 +475,50 @@ def edit_log(log_id):
 @main.route('/api/recipes', methods=['GET'])
 @login_required
 def get_recipes():
+    sort = request.args.get('sort', 'newest')
+    if sort not in RECIPE_SORTS:
+        return jsonify({"error": f"Unknown sort '{sort}'. Use one of: {', '.join(RECIPE_SORTS)}"}), 400
+    # Every recipe change (counters included) bumps sync_version; the author name is the user's own
+    etag = _etag('recipes', current_user.id, current_user.sync_version, current_user.username, sort)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
     try:
-        recipes = Recipe.query.filter_by(user_id=current_user.id).order_by(Recipe.id.desc()).all()
-        return jsonify([recipe.to_dict() for recipe in recipes]), 200
+        stream_min = current_app.config.get('JSON_STREAM_MIN_ITEMS', 500)
+        # Counts ids only (up to stream_min), so a long list isn't loaded twice
+        long_list = Recipe.query.filter_by(user_id=current_user.id).with_entities(Recipe.id)\
+                                .limit(stream_min).count() >= stream_min
+        if long_list:
+            # Fetch and encode it in batches as the response is sent
+            return _with_validator(current_app.json.array_response(_iter_recipe_dicts(current_user.id, sort)), etag)
+        recipes = _user_recipes_query(current_user.id, sort).all()
     except Exception as e:
         print(f"Error fetching user recipes: {e}")
         return jsonify({"error": "Failed to fetch recipes"}), 500
+    return _with_validator(jsonify([recipe.to_dict() for recipe in recipes]), etag)
+
+
+# ?sort= for /api/recipes; popularity comes from the counter columns, not a GROUP BY over the logs
+RECIPE_SORTS = {
+    'newest': (Recipe.id.desc(),),
+    'popular': (Recipe.cook_count.desc(), Recipe.id.desc()),
+    'top_rated': ((Recipe.rating_sum * 1.0 / func.nullif(Recipe.rating_count, 0)).desc().nulls_last(), Recipe.id.desc()),
+    'last_cooked': (Recipe.last_cooked.desc().nulls_last(), Recipe.id.desc()),
+}
+
+def _user_recipes_query(user_id, sort='newest'):
+    return Recipe.query.filter_by(user_id=user_id).order_by(*RECIPE_SORTS[sort])
+
+
+def _iter_recipe_dicts(user_id, sort):
+    # Runs inside the streamed response, so it queries with its own session
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 200)
+    for recipe in _user_recipes_query(user_id, sort).yield_per(batch_size):
+        yield recipe.to_dict()
 
 @main.route('/api/recipes', methods=['POST'])
 @login_required
+@transactional()
 def add_recipe():
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
@@ -418,26 +531,35 @@ def add_recipe():
         time_val = int(data['time'])
         if time_val <= 0:
              return jsonify({"error": "Time must be a positive number"}), 400
-        new_recipe = Recipe(
+        new_recipe = write_queue.submit(
+            _add_recipe, user_id=current_user.id,
             name=data['name'], category=data['category'], time=time_val,
             ingredients=data['ingredients'], instructions=data['instructions'],
             date=data.get('date', datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')),
-            image=data.get('image'), user_id=current_user.id
+            image=data.get('image')
         )
-        db.session.add(new_recipe)
-        db.session.commit()
-        return jsonify(new_recipe.to_dict()), 201
+        return jsonify(new_recipe), 201
     except (ValueError, TypeError) as e:
         db.session.rollback()
         print(f"Error adding recipe (data issue): {e}")
         return jsonify({"error": "Invalid data format (e.g., time must be a number)"}), 400
+    except write_queue.WriteTimeout as e:
+        return jsonify({"error": e.description}), 503
     except Exception as e:
         db.session.rollback()
         print(f"Error adding recipe (database issue): {e}")
         return jsonify({"error": "Failed to add recipe"}), 500
 
+def _add_recipe(**fields):
+    # A write_queue write: returns the new recipe as a dict, since the session may not be the request's
+    new_recipe = Recipe(**fields)
+    db.session.add(new_recipe)
+    db.session.flush() # Assigns the id
+    return new_recipe.to_dict()
+
 @main.route('/api/recipes/<int:recipe_id>', methods=['DELETE'])
 @login_required
+@transactional()
 def delete_recipe_api(recipe_id):
     try:
         recipe_to_delete = Recipe.query.get_or_404(recipe_id)
@@ -452,22 +574,36 @@ def delete_recipe_api(recipe_id):
         for shared_entry in shared_entries_to_delete:
             db.session.delete(shared_entry)
 
+        # Sharded: whitelisted users on other shards hold shares of the recipe and their own logs of it
+        whitelist = recipe_to_delete.whitelist if isinstance(recipe_to_delete.whitelist, list) else []
+        for receiver_session, receiver_ids in sharding.sessions_for_users(whitelist):
+            if receiver_session is db.session:
+                continue # Already covered by the queries above
+            for row in receiver_session.query(CookingLog).filter(CookingLog.recipe_id == recipe_to_delete.id,
+                                                                 CookingLog.user_id.in_(receiver_ids)):
+                receiver_session.delete(row)
+            for row in receiver_session.query(SharedRecipe).filter(SharedRecipe.recipe_id == recipe_to_delete.id,
+                                                                   SharedRecipe.receiver_id.in_(receiver_ids)):
+                receiver_session.delete(row)
+
+        RecipeRevision.query.filter_by(recipe_id=recipe_to_delete.id).delete() # No need to load the history
+
         db.session.delete(recipe_to_delete)
-        db.session.commit()
-        
         if any(log.user_id == current_user.id for log in logs_to_delete):
-            _recalculate_user_streak_and_last_cooked(current_user.id)
-            db.session.commit()
+            _enqueue_streak_recalculation(current_user.id)
+        db.session.flush()
 
         return jsonify({"message": "Recipe and all associated cooking logs deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
+        sharding.rollback_shard_sessions()
         print(f"Error deleting recipe {recipe_id} and its logs: {e}")
         return jsonify({"error": "Failed to delete recipe and its logs"}), 500
 
 
 @main.route('/api/recipes/<int:recipe_id>', methods=['PUT'])
 @login_required
+@transactional()
 def update_recipe(recipe_id):
     recipe = Recipe.query.get_or_404(recipe_id)
     if recipe.user_id != current_user.id:
@@ -478,6 +614,7 @@ def update_recipe(recipe_id):
     if not data:
         return jsonify({"error": "No data provided"}), 400
     try:
+        before = revision_fields(recipe)
         updated = False
         if 'name' in data and data['name'] and recipe.name != data['name']:
             recipe.name = data['name']; updated = True
@@ -497,15 +634,70 @@ def update_recipe(recipe_id):
         if 'image' in data: # This allows clearing the image if 'image': null is sent
             recipe.image = data['image']; updated = True
         if updated:
-            db.session.commit()
+            record_revision(recipe, before, current_user.id)
+            db.session.flush()
         return jsonify(recipe.to_dict()), 200
     except Exception as e:
         db.session.rollback()
         print(f"ERROR updating recipe {recipe_id}: {e}")
         return jsonify({"error": "Failed to update recipe"}), 500
     
+# --- Recipe revisions ---
+@main.route('/api/recipes/<int:recipe_id>/revisions', methods=['GET'])
+@login_required
+def list_recipe_revisions(recipe_id):
+    recipe = Recipe.query.get_or_404(recipe_id)
+    if recipe.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized to view this recipe's history"}), 403
+    # Only the small columns; the data itself is read when a revision is rebuilt
+    revisions = (db.session.query(RecipeRevision.number, RecipeRevision.created_at, RecipeRevision.changed)
+                 .filter(RecipeRevision.recipe_id == recipe_id)
+                 .order_by(RecipeRevision.number.desc())
+                 .all())
+    return jsonify([{'number': revision.number, 'created_at': revision.created_at,
+                     'changed': revision.changed.split(',')} for revision in revisions]), 200
+
+
+@main.route('/api/recipes/<int:recipe_id>/revisions/<int:number>', methods=['GET'])
+@login_required
+def get_recipe_revision(recipe_id, number):
+    recipe = Recipe.query.get_or_404(recipe_id)
+    if recipe.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized to view this recipe's history"}), 403
+    fields = rebuild_revision(recipe_id, number)
+    if fields is None:
+        return jsonify({"error": "Revision not found"}), 404
+    return jsonify(dict(fields, number=number)), 200
+
+
+@main.route('/api/recipes/<int:recipe_id>/revisions/<int:number>/restore', methods=['POST'])
+@login_required
+@transactional()
+def restore_recipe_revision(recipe_id, number):
+    """Undo: makes an old revision current again, recorded as a new revision."""
+    recipe = Recipe.query.get_or_404(recipe_id)
+    if recipe.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized to edit this recipe"}), 403
+    fields = rebuild_revision(recipe_id, number)
+    if fields is None:
+        return jsonify({"error": "Revision not found"}), 404
+    try:
+        before = revision_fields(recipe)
+        for field, value in fields.items():
+            if before[field] != value: # Unchanged content stays shared with clones
+                setattr(recipe, field, value)
+        record_revision(recipe, before, current_user.id)
+        db.session.flush()
+        return jsonify(recipe.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"ERROR restoring revision {number} of recipe {recipe_id}: {e}")
+        return jsonify({"error": "Failed to restore revision"}), 500
+
+
 @main.route('/api/shared_recipes', methods=['POST'])
 @login_required
+@transactional()
 def create_shared_recipe():
     if not request.is_json: return jsonify({"error": "Request must be JSON"}), 400
     data = request.get_json()
@@ -516,16 +708,16 @@ def create_shared_recipe():
         sharer_name = User.query.get(current_user.id).username
         receiver_name = str(data['receiver_name'])
         recipe_id = int(data['recipe_id'])
-        user = User.query.filter_by(username=receiver_name).first()
-        if not user: return jsonify({"error": "Receiver not found"}), 404
-        receiver_id = user.id
+        receiver_id = sharding.user_id_for(username=receiver_name)
+        if receiver_id is None: return jsonify({"error": "Receiver not found"}), 404
         recipe_to_share = Recipe.query.get(recipe_id)
         if not recipe_to_share: return jsonify({"error": "Recipe not found"}), 404
         
         if recipe_to_share.user_id != current_user.id:
             return jsonify({"error": "You can only share your own recipes."}), 403
 
-        existing_shared = SharedRecipe.query.filter_by(receiver_id=receiver_id, recipe_id=recipe_id).first() 
+        receiver_session = sharding.user_session(receiver_id) # The share lives with its receiver
+        existing_shared = receiver_session.query(SharedRecipe).filter_by(receiver_id=receiver_id, recipe_id=recipe_id).first() 
         if existing_shared: return jsonify({"error": "Recipe already shared with this user"}), 409
         
         new_shared = SharedRecipe(
@@ -533,7 +725,7 @@ def create_shared_recipe():
             recipe_id=recipe_id,
             sharer_name=sharer_name,
             )
-        db.session.add(new_shared); db.session.commit()
+        receiver_session.add(new_shared); receiver_session.flush()
     except ValueError: return jsonify({"error": "Invalid ID format"}), 400
     except Exception as e:
         print(f"Error creating shared recipe: {e}"); db.session.rollback()
@@ -546,40 +738,14 @@ def create_shared_recipe():
 def get_my_shared_recipes():
     try:
         user_id = current_user.id
-
-        # Query to get shared recipes along with recipe name and sharer's info
-        shared_recipes_query = (
-            db.session.query(
-                SharedRecipe.id,
-                SharedRecipe.recipe_id,
-                SharedRecipe.sharer_name,  # Keep for display
-                SharedRecipe.date_shared,
-                Recipe.name.label('recipe_name'),
-                User.profile_picture_url.label('sharer_pfp_url'),  # Get sharer's PFP
-                User.username.label('sharer_username_for_initial')  # Get username for initial if no PFP
-            )
-            .join(Recipe, SharedRecipe.recipe_id == Recipe.id)
-            .join(User, User.username == SharedRecipe.sharer_name)  # Join User table based on sharer_name
-            .filter(SharedRecipe.receiver_id == user_id)
-            .order_by(SharedRecipe.date_shared.desc())
-            .all()
-        )
-        # Note: Joining on username assumes usernames are unique and don't change often.
-        # A sharer_id foreign key in SharedRecipe would be more robust.
-
-        results = []
-        for sr in shared_recipes_query:
-            results.append({
-                "id": sr.id,
-                "recipe_id": sr.recipe_id,
-                "sharer_name": sr.sharer_name, # The name of the user who shared it
-                "date_shared": sr.date_shared.isoformat(), 
-                "recipe_name": sr.recipe_name,
-                "sharer_pfp_url": sr.sharer_pfp_url, # Sharer's profile picture URL
-                "sharer_username_for_initial": sr.sharer_username_for_initial # For creating default initial
-            })
-        
-        return jsonify(results), 200
+        # Renaming a shared recipe or changing a sharer's picture doesn't touch the
+        # receiver's version, so the tag is built from aggregates that cover them
+        etag = _etag('shared_recipes', user_id, *share_list_version(user_id))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        rows = share_rows(SharedRecipe.query.filter(SharedRecipe.receiver_id == user_id))
+        return _with_validator(jsonify([share_dict(row) for row in rows]), etag)
     except Exception as e:
         print(f"Error fetching shared recipes: {e}")
         # Consider logging the full traceback for e
@@ -588,73 +754,219 @@ def get_my_shared_recipes():
         return jsonify({"error": "Failed to fetch shared recipes"}), 500
 
 
+# --- Ingredient search ---
+def _ingredient_search_args(param):
+    """Reads the repeated `param` terms and ?limit= shared by the ingredient searches."""
+    names = [name for name in request.args.getlist(param) if name.strip()]
+    if not names:
+        return None, None, (jsonify({"error": f"At least one '{param}' parameter is required"}), 400)
+    if len(names) > MAX_SEARCH_TERMS:
+        return None, None, (jsonify({"error": f"At most {MAX_SEARCH_TERMS} '{param}' parameters are allowed"}), 400)
+    limit = request.args.get('limit', 20, type=int)
+    if limit is None or not 1 <= limit <= 100:
+        return None, None, (jsonify({"error": "limit must be between 1 and 100"}), 400)
+    return names, limit, None
+
+@main.route('/api/ingredients/recipes', methods=['GET'])
+@login_required
+def recipes_by_ingredient():
+    """Your recipes that use ?ingredient=...&ingredient=..., most matches first (?match=all for every one)."""
+    names, limit, error = _ingredient_search_args('ingredient')
+    if error:
+        return error
+    match_all = request.args.get('match', 'any') == 'all'
+    try:
+        results = recipes_with_ingredients(current_user.id, names, match_all=match_all, limit=limit)
+    except Exception as e:
+        print(f"Error searching recipes by ingredient: {e}")
+        return jsonify({"error": "Failed to search recipes"}), 500
+    return jsonify([dict(recipe.to_dict(), matched=matched) for recipe, matched in results]), 200
+
+@main.route('/api/ingredients/cookable', methods=['GET'])
+@login_required
+def cookable():
+    """What you can cook with ?have=...&have=...: fewest missing ingredients first (?max_missing=N)."""
+    names, limit, error = _ingredient_search_args('have')
+    if error:
+        return error
+    max_missing = request.args.get('max_missing', type=int)
+    try:
+        results = cookable_recipes(current_user.id, names, max_missing=max_missing, limit=limit)
+    except Exception as e:
+        print(f"Error searching cookable recipes: {e}")
+        return jsonify({"error": "Failed to search recipes"}), 500
+    return jsonify([dict(recipe.to_dict(), matched=matched, missing=missing)
+                    for recipe, matched, missing in results]), 200
+
+
+def _stats_version(user):
+    """Changes whenever the user's stats can: new or edited logs/recipes, or a new day (month and week windows)."""
+    return f"{user.logs_version}.{user.recipes_version}.{date.today().isoformat()}"
+
+@main.route('/api/stats', methods=['GET'])
+@login_required
+def get_stats():
+    requested = request.args.get('sections', '')
+    sections = [section.strip() for section in requested.split(',') if section.strip()] or list(STATS_SECTIONS)
+    unknown = [section for section in sections if section not in STATS_SECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown stats section(s): {', '.join(unknown)}"}), 400
+    sections = [section for section in STATS_SECTIONS if section in sections] # Canonical order
+
+    # The ETag is derived from the data versions, so a revalidation is answered without touching the logs.
+    etag = _etag(current_user.id, _stats_version(current_user), ','.join(sections))
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = current_app.extensions.get('fragment_cache')
+        cache_key = f"api-stats/{etag}"
+        body = cache.get(cache_key) if cache else None
+        if body is None:
+            body = current_app.json.dumps(calculate_user_stats(current_user.id, sections))
+            if cache:
+                cache.set(cache_key, body)
+        response = current_app.response_class(body, mimetype='application/json')
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('STATS_MAX_AGE', 0)
+    response.cache_control.stale_while_revalidate = current_app.config.get('STATS_STALE_WHILE_REVALIDATE', 300)
+    return response
+
+
 @main.route('/users/search')
 @login_required 
 def user_search():
     q = request.args.get('q', '').strip()
     if len(q) < 2: return jsonify([])
     
-    raw_matches = (db.session.query(User.username) 
-                   .filter(User.username.ilike(f"%{q}%"))
-                   .filter(User.id != current_user.id) 
-                   .order_by(User.username).limit(5).all()) 
-    
-    usernames = [match[0] for match in raw_matches] 
+    usernames = sharding.search_usernames(q, exclude_id=current_user.id, limit=5) # Every shard's users
     return jsonify(usernames)
 
 @main.route("/recipes/<int:recipe_id>/whitelist", methods=["POST"])
 @login_required
+@transactional()
 def add_to_whitelist(recipe_id):
     data = request.get_json()
     username_to_whitelist = str(data.get("username", "")).strip()
     if not username_to_whitelist: return jsonify({"error": "Username missing"}), 400
     
-    user_to_add = User.query.filter(User.username == username_to_whitelist).first()
-    if not user_to_add: return jsonify({"error": f"User '{username_to_whitelist}' not found"}), 404
+    user_id_to_add = sharding.user_id_for(username=username_to_whitelist)
+    if user_id_to_add is None: return jsonify({"error": f"User '{username_to_whitelist}' not found"}), 404
     
     recipe = Recipe.query.get_or_404(recipe_id)
     if recipe.user_id != current_user.id:
         return jsonify({"error": "Unauthorized to manage whitelist for this recipe"}), 403
-    if user_to_add.id == current_user.id: 
+    if user_id_to_add == current_user.id: 
         return jsonify({"message": "Owner already has full access."}), 200
 
-    current_recipe_whitelist = list(recipe.whitelist) if recipe.whitelist is not None else []
-    if user_to_add.id in current_recipe_whitelist:
-        return jsonify({"message": f"User '{user_to_add.username}' is already in the whitelist for '{recipe.name}'."}), 200 
-    
-    current_recipe_whitelist.append(user_to_add.id)
-    recipe.whitelist = current_recipe_whitelist 
-    
     try:
-        db.session.commit()
-        sharer_name_for_share = current_user.username
-        existing_shared_notification = SharedRecipe.query.filter_by(
-            receiver_id=user_to_add.id, 
-            recipe_id=recipe.id
-        ).first()
-
-        if not existing_shared_notification:
-            new_shared_notification = SharedRecipe(
-                receiver_id=user_to_add.id,
-                recipe_id=recipe.id,
-                sharer_name=sharer_name_for_share
-            )
-            db.session.add(new_shared_notification)
-            db.session.commit() 
-            
-        return jsonify({"message": f"Recipe '{recipe.name}' shared with {user_to_add.username}."}), 200
+        added = write_queue.submit(_add_to_whitelist, recipe.id, user_id_to_add, current_user.username)
+        if not added:
+            return jsonify({"message": f"User '{username_to_whitelist}' is already in the whitelist for '{recipe.name}'."}), 200 
+        return jsonify({"message": f"Recipe '{recipe.name}' shared with {username_to_whitelist}."}), 200
+    except write_queue.WriteTimeout as e:
+        return jsonify({"error": e.description}), 503
     except Exception as e:
         db.session.rollback(); print(f"Error updating whitelist/shared_recipe for recipe {recipe.id}: {e}")
         return jsonify({"error": "Failed to update whitelist due to a server error"}), 500
 
 
+def _add_to_whitelist(recipe_id, user_id, sharer_name):
+    # A write_queue write. The whitelist is read in the writing transaction, so
+    # coalesced adds to the same recipe build on each other instead of overwriting.
+    recipe = db.session.get(Recipe, recipe_id)
+    current_recipe_whitelist = list(recipe.whitelist) if recipe.whitelist is not None else []
+    if user_id in current_recipe_whitelist:
+        return False
+    recipe.whitelist = current_recipe_whitelist + [user_id]
+    enqueue('share_notification', key=f'share:{user_id}:{recipe_id}',
+            receiver_id=user_id, recipe_id=recipe_id, sharer_name=sharer_name)
+    return True
+
+
+# --- Bulk sharing ---
+MAX_BULK_SHARE_USERS = 100
+MAX_BULK_SHARE_RECIPES = 50
+
+@main.route('/api/shared_recipes/bulk', methods=['POST'])
+@login_required
+@transactional()
+def bulk_share():
+    """Whitelists every user in `usernames` on every recipe in `recipe_ids` and sends them the shares.
+
+    Users and existing shares are each looked up with one IN query, and all
+    whitelist changes and share rows are written in one transaction.
+    """
+    if not request.is_json: return jsonify({"error": "Request must be JSON"}), 400
+    data = request.get_json()
+    usernames = data.get('usernames')
+    recipe_ids = data.get('recipe_ids')
+    if not isinstance(usernames, list) or not isinstance(recipe_ids, list) or not usernames or not recipe_ids:
+        return jsonify({"error": "usernames and recipe_ids must be non-empty lists"}), 400
+    usernames = list(dict.fromkeys(str(name).strip() for name in usernames if str(name).strip()))
+    try:
+        recipe_ids = list(dict.fromkeys(int(recipe_id) for recipe_id in recipe_ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid ID format"}), 400
+    if len(usernames) > MAX_BULK_SHARE_USERS or len(recipe_ids) > MAX_BULK_SHARE_RECIPES:
+        return jsonify({"error": f"Share with at most {MAX_BULK_SHARE_USERS} users and "
+                                 f"{MAX_BULK_SHARE_RECIPES} recipes at a time"}), 400
+
+    try:
+        recipes = Recipe.query.filter(Recipe.id.in_(recipe_ids)).all()
+        missing = sorted(set(recipe_ids) - {recipe.id for recipe in recipes})
+        if missing:
+            return jsonify({"error": "Recipe not found", "recipe_ids": missing}), 404
+        if any(recipe.user_id != current_user.id for recipe in recipes):
+            return jsonify({"error": "You can only share your own recipes."}), 403
+
+        found = sharding.user_ids_for_usernames(usernames) # Looked up in the directory when sharded
+        not_found = [name for name in usernames if name not in found]
+        receiver_ids = [user_id for user_id in found.values()
+                        if user_id != current_user.id] # The owner already has full access
+        if not receiver_ids:
+            return jsonify({"error": "No matching users to share with", "not_found": not_found}), 404
+
+        # Shares live with their receivers: one query per shard holding any of them
+        existing = set()
+        for session, user_ids in sharding.sessions_for_users(receiver_ids):
+            existing.update(session.query(SharedRecipe.receiver_id, SharedRecipe.recipe_id)
+                            .filter(SharedRecipe.receiver_id.in_(user_ids),
+                                    SharedRecipe.recipe_id.in_(recipe_ids)).all())
+
+        new_shares = []
+        for recipe in recipes:
+            whitelist = list(recipe.whitelist) if recipe.whitelist is not None else []
+            added = [user_id for user_id in receiver_ids if user_id not in whitelist]
+            if added:
+                recipe.whitelist = whitelist + added
+            new_shares.extend(SharedRecipe(receiver_id=user_id, recipe_id=recipe.id,
+                                           sharer_name=current_user.username)
+                              for user_id in receiver_ids if (user_id, recipe.id) not in existing)
+        for share in new_shares:
+            sharding.user_session(share.receiver_id).add(share)
+        db.session.flush()
+    except Exception as e:
+        db.session.rollback(); print(f"Error bulk sharing recipes {recipe_ids}: {e}")
+        return jsonify({"error": "Failed to share recipes due to a server error"}), 500
+
+    return jsonify({
+        "message": f"Shared {len(recipes)} recipe(s) with {len(receiver_ids)} user(s).",
+        "shared": len(new_shares),
+        "already_shared": len(recipes) * len(receiver_ids) - len(new_shares),
+        "not_found": not_found,
+    }), 200
+
+
 @main.route("/recipes/clonerecipe", methods=["POST"])
 @login_required
+@transactional()
 def clone_recipe():
     data = request.get_json(); recipe_id_to_clone = data.get("recipe_id")
     if not recipe_id_to_clone: return jsonify({"error": "Recipe ID missing"}), 400
     
-    original_recipe = db.session.get(Recipe, recipe_id_to_clone) 
+    original_recipe = sharding.get_recipe(recipe_id_to_clone) 
     if not original_recipe: return jsonify({"error": "Original recipe not found"}), 404
     
     is_owner = (original_recipe.user_id == current_user.id)
@@ -664,18 +976,23 @@ def clone_recipe():
     if not is_owner and not is_whitelisted:
         return jsonify({"error": "Unauthorized to clone this recipe"}), 403
     
-    new_recipe = Recipe(
-        name=f"{original_recipe.author.username}'s {original_recipe.name} (Clone)",
-        category=original_recipe.category, time=original_recipe.time,
-        ingredients=original_recipe.ingredients, 
-        instructions=original_recipe.instructions,
-        date=datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), 
-        image=original_recipe.image, 
-        user_id=current_user.id, 
-        whitelist=[] 
-    )
     try:
-        db.session.add(new_recipe); db.session.commit()
+        if sharding.is_local(original_recipe):
+            # The clone points at the original's content instead of copying it; see RecipeContent
+            content = dict(content=original_recipe.share_content())
+        else:
+            # Content rows can't be shared across shard files, so this clone copies it
+            content = dict(ingredients=original_recipe.ingredients, instructions=original_recipe.instructions,
+                           image=original_recipe.image)
+        new_recipe = Recipe(
+            name=f"{original_recipe.author.username}'s {original_recipe.name} (Clone)",
+            category=original_recipe.category, time=original_recipe.time,
+            **content,
+            date=datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'), 
+            user_id=current_user.id, 
+            whitelist=[] 
+        )
+        db.session.add(new_recipe); db.session.flush()
         return jsonify({"message": f"Recipe '{original_recipe.name}' cloned successfully to your kitchen!",
                         "new_recipe_id": new_recipe.id }), 201 
     except Exception as e:
@@ -699,113 +1016,13 @@ def view_log_detail(log_id):
                                 .filter_by(id=log_id).first_or_404()
     if log_entry.user_id != current_user.id:
         abort(403) 
-    return render_template('view_log_detail.html', log_entry=log_entry, title='Cooking Log Details')
-
-
-def calculate_user_stats(user_id):
-    stats = {
-        'total_sessions': 0,
-        'most_frequent_recipe': {'name': '-', 'count': 0},
-        'total_time_logged_seconds': 0, 
-        'total_time_logged_hours': 0.0,
-        'average_rating': 0.0, 
-        'top_recipes_data': [], 
-        'monthly_frequency_data': [],
-        'top_recipes_this_month_data': [],
-        'weekly_frequency_data': [],
-        'top_rated_data': [],
-        'top_rated_this_month_data': []
-    }
-    try:
-        stats['total_sessions'] = CookingLog.query.filter_by(user_id=user_id).count()
-        total_duration = db.session.query(func.sum(CookingLog.duration_seconds))\
-                                  .filter(CookingLog.user_id == user_id, CookingLog.duration_seconds.isnot(None)).scalar()
-        stats['total_time_logged_seconds'] = int(total_duration) if total_duration else 0
-        stats['total_time_logged_hours'] = round(stats['total_time_logged_seconds'] / 3600, 2)
-        avg_rating_query = db.session.query(func.avg(CookingLog.rating))\
-                              .filter(CookingLog.user_id == user_id, CookingLog.rating.isnot(None)).scalar()
-        stats['average_rating'] = float(avg_rating_query) if avg_rating_query is not None else 0.0
-
-        top_recipes = (db.session.query(Recipe.name, func.count(CookingLog.id).label('log_count'))
-                       .join(CookingLog, Recipe.id == CookingLog.recipe_id).filter(CookingLog.user_id == user_id)
-                       .group_by(Recipe.name).order_by(desc('log_count')).limit(5).all())
-        if top_recipes:
-            stats['most_frequent_recipe'] = {'name': top_recipes[0][0], 'count': int(top_recipes[0][1])}
-            stats['top_recipes_data'] = [{'name': name, 'count': int(count)} for name, count in top_recipes]
-        
-        today = date.today(); month_counts = {}
-        for i in range(12):
-            month_to_calc = today.month - i
-            year_to_calc = today.year
-            if month_to_calc <= 0:
-                month_to_calc += 12
-                year_to_calc -= 1
-            month_counts[f"{year_to_calc:04d}-{month_to_calc:02d}"] = 0
-        
-        first_day_of_period = (today.replace(day=1) - timedelta(days=330)).replace(day=1)
-
-        monthly_logs = (db.session.query(func.strftime('%Y-%m', CookingLog.date_cooked).label('month'),
-                                        func.count(CookingLog.id).label('count'))
-                        .filter(CookingLog.user_id == user_id, 
-                                CookingLog.date_cooked >= first_day_of_period, 
-                                CookingLog.date_cooked <= today) 
-                        .group_by('month').order_by('month').all())
-        
-        for month_db, count in monthly_logs:
-            if month_db in month_counts: 
-                month_counts[month_db] = int(count)
-        
-        first_day_of_month = today.replace(day=1)
-        top_recipes_month = (db.session.query(Recipe.name, func.count(CookingLog.id).label('log_count'))
-                       .join(CookingLog, Recipe.id == CookingLog.recipe_id)
-                       .filter(CookingLog.user_id == user_id,
-                               CookingLog.date_cooked >= first_day_of_month)
-                       .group_by(Recipe.name)
-                       .order_by(desc('log_count'))
-                       .limit(5).all())
-        stats['top_recipes_this_month_data'] = [{'name': name, 'count': int(count)} for name, count in top_recipes_month]
-
-        start_of_week = today - timedelta(days=today.weekday()) 
-        end_of_week = start_of_week + timedelta(days=6)
-        weekly_counts = {day: 0 for day in range(1, 8)}  
-        weekly_logs = (db.session.query(func.strftime('%w', CookingLog.date_cooked).label('day_of_week'),
-                                       func.count(CookingLog.id).label('count'))
-                       .filter(CookingLog.user_id == user_id,
-                               CookingLog.date_cooked >= start_of_week,
-                               CookingLog.date_cooked <= end_of_week)
-                       .group_by('day_of_week')
-                       .all())
-        
-        day_mapping = {0: 7, 1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6}
-        for day_of_week, count in weekly_logs:
-            adjusted_day = day_mapping.get(int(day_of_week), 7)
-            weekly_counts[adjusted_day] = int(count)
-        stats['weekly_frequency_data'] = [{'day': d, 'count': weekly_counts[d]} for d in range(1, 8)]
-
-        top_rated = (db.session.query(Recipe.name, func.avg(CookingLog.rating).label('avg_rating'))
-                    .join(CookingLog, Recipe.id == CookingLog.recipe_id)
-                    .filter(CookingLog.user_id == user_id,
-                            CookingLog.rating.isnot(None))
-                    .group_by(Recipe.name)
-                    .order_by(desc('avg_rating'))
-                    .limit(5).all())
-        stats['top_rated_data'] = [{'name': name, 'rating': float(avg)} for name, avg in top_rated]
-
-        top_rated_month = (db.session.query(Recipe.name, func.avg(CookingLog.rating).label('avg_rating'))
-                         .join(CookingLog, Recipe.id == CookingLog.recipe_id)
-                         .filter(CookingLog.user_id == user_id,
-                                 CookingLog.rating.isnot(None),
-                                 CookingLog.date_cooked >= first_day_of_month)
-                         .group_by(Recipe.name)
-                         .order_by(desc('avg_rating'))
-                         .limit(5).all())
-        stats['top_rated_this_month_data'] = [{'name': name, 'rating': float(avg)} for name, avg in top_rated_month]
-        
-        sorted_months = sorted(month_counts.keys()) 
-        stats['monthly_frequency_data'] = [{'month': m, 'count': month_counts[m]} for m in sorted_months]
+    recipe = log_entry.recipe_logged
+    etag = _page_etag('view_log', log_entry.id, log_entry.sync_version,
+                      recipe.id if recipe else '', recipe.sync_version if recipe else '')
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    return _with_validator(render_template('view_log_detail.html', log_entry=log_entry, title='Cooking Log Details'), etag)
 
-    except Exception as e: 
-        print(f"Error calculating stats for user {user_id}: {e}")
-    return stats
 
 # --- End of File ---
\ No newline at end of file
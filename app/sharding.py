@@ -0,0 +1,441 @@
+# app/sharding.py
+"""Optional partitioning of users across several SQLite files.
+
+With SHARD_DATABASE_URIS set, each user's data lives in one shard file. That
+covers the user row, their recipes, logs, revisions and jobs, and the shares
+they receive. Writers on different shards never wait for each other's lock.
+User N lives on shard N % shard count. Recipe ids are allocated so that a
+recipe's id modulo the shard count is its owner's shard, so the id alone
+says where a recipe is. They come from a per-shard counter that never goes
+back, so a deleted recipe's id isn't reused.
+
+The default database becomes the global directory. Its user_directory table
+of (id, username, email) hands out user ids and keeps usernames and emails
+unique across shards. Signup, login, search and sharing by username look
+there first.
+
+db.session sends every query to the shard selected for the app context
+(g.shard). For a request, load_user selects the logged-in user's shard. A
+few features reach across users: sharing, the mailbox, viewing or cloning
+a shared recipe, and deleting a recipe, which also deletes the shares and
+logs of it held on its whitelisted users' shards. They use user_session() and get_recipe(), which
+open at most one extra session per shard for the app context. A write
+spread over several shards commits one shard after another, not
+atomically: the other shards commit first. Share delivery and deletion
+are idempotent, so doing either again fills in whatever a failed commit
+left out.
+
+Known limits: a log of someone else's recipe is kept on the logger's shard,
+so the recipe's counters only count logs on the owner's shard. The shard
+count is fixed once users exist.
+
+Without SHARD_DATABASE_URIS (the default) the helpers below run the same
+single-database queries as before.
+
+app/__init__ imports this module before `db` exists, so app modules are
+imported inside the functions.
+"""
+import os
+from collections import namedtuple
+
+import click
+import sqlalchemy as sa
+from flask import abort, current_app, g, has_app_context
+from flask.cli import AppGroup
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+
+directory_metadata = sa.MetaData()
+user_directory = sa.Table(
+    'user_directory', directory_metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('username', sa.String(80), nullable=False, unique=True),
+    sa.Column('email', sa.String(120), nullable=False, unique=True),
+)
+
+ShareRow = namedtuple('ShareRow', 'id recipe_id sharer_name date_shared recipe_name recipe_version '
+                                  'profile_picture_url username')
+
+
+# --- Routing ---
+def shard_count():
+    return current_app.extensions.get('shards', 0) if has_app_context() else 0
+
+
+def enabled():
+    return bool(shard_count())
+
+
+def shard_for_user(user_id):
+    return int(user_id) % shard_count()
+
+
+def shard_for_recipe(recipe_id):
+    return int(recipe_id) % shard_count()
+
+
+def _bind_key(shard):
+    return f'shard{shard}'
+
+
+def shard_engine(shard):
+    from . import db
+    return db.engines[_bind_key(shard)]
+
+
+class ShardRoutingSession(Session):
+    """db.session's class. When sharding is on, every query goes to the selected shard."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and shard_count():
+            shard = self.info.get('shard', g.get('shard'))
+            if shard is None:
+                raise RuntimeError("No shard selected: log a user in or use sharding.each_shard()")
+            return self._db.engines[_bind_key(shard)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def select_user_shard(user_id):
+    """Routes db.session to `user_id`'s shard for the rest of the app context."""
+    if shard_count():
+        g.shard = shard_for_user(user_id)
+
+
+def each_shard():
+    """Yields each shard in turn with db.session routed to it, or None once when sharding is off.
+
+    For workers and CLI commands: commit inside the loop, the sessions are
+    replaced between shards.
+    """
+    from . import db
+    count = shard_count()
+    if not count:
+        yield None
+        return
+    previous = g.get('shard')
+    try:
+        for shard in range(count):
+            g.shard = shard
+            yield shard
+            db.session.remove()
+            _close_shard_sessions()
+    finally:
+        g.shard = previous
+
+
+# --- Sessions on other shards ---
+def shard_session(shard):
+    """A session on `shard` for this app context; db.session itself for the selected shard."""
+    from . import db
+    if shard is None or shard == g.get('shard'):
+        return db.session
+    sessions = g.setdefault('shard_sessions', {})
+    if shard not in sessions:
+        sessions[shard] = db.session.session_factory(info={'shard': shard})
+    return sessions[shard]
+
+
+def user_session(user_id):
+    """The session holding `user_id`'s rows."""
+    return shard_session(shard_for_user(user_id) if shard_count() else None)
+
+
+def sessions_for_users(user_ids):
+    """[(session, user ids on that session's shard)], a single db.session entry when unsharded."""
+    groups = {}
+    for user_id in user_ids:
+        groups.setdefault(shard_for_user(user_id) if shard_count() else None, []).append(user_id)
+    return [(shard_session(shard), ids) for shard, ids in groups.items()]
+
+
+def commit_shard_sessions():
+    """Commits the other shards' sessions opened by this app context. The caller commits db.session."""
+    for session in g.get('shard_sessions', {}).values():
+        session.commit()
+
+
+def rollback_shard_sessions():
+    for session in g.get('shard_sessions', {}).values():
+        session.rollback()
+
+
+def _close_shard_sessions(exc=None):
+    for session in g.pop('shard_sessions', {}).values():
+        session.close()
+
+
+def is_local(obj):
+    """True when `obj` was loaded through db.session, i.e. it lives on the selected shard."""
+    from . import db
+    return sa.orm.object_session(obj) is db.session()
+
+
+def get_recipe(recipe_id):
+    """Loads a recipe from whichever shard holds it, or returns None."""
+    from .models import Recipe
+    try:
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        return None
+    shard = shard_for_recipe(recipe_id) if shard_count() else None
+    return shard_session(shard).get(Recipe, recipe_id)
+
+
+def get_recipe_or_404(recipe_id):
+    return get_recipe(recipe_id) or abort(404)
+
+
+def _allocate_recipe_id(mapper, connection, target):
+    # Ids on shard k are k mod the shard count, so get_recipe finds them from the id alone.
+    # They come from the shard's id_sequence row, bumped in the inserting transaction, so
+    # concurrent writers wait on SQLite's write lock instead of picking the same id, and
+    # a deleted recipe's id is never handed out again.
+    from .models import IdSequence
+    count = shard_count()
+    if not count or target.id is not None:
+        return
+    sequences = IdSequence.__table__
+    recipes = mapper.local_table
+    seed = sa.select(sa.literal('recipe'), sa.func.coalesce(sa.func.max(recipes.c.id), 0))
+    connection.execute(sequences.insert().prefix_with('OR IGNORE').from_select(['name', 'value'], seed))
+    connection.execute(sequences.update().where(sequences.c.name == 'recipe')
+                       .values(value=(sequences.c.value // count + 1) * count + shard_for_user(target.user_id)))
+    target.id = connection.execute(sa.select(sequences.c.value).where(sequences.c.name == 'recipe')).scalar()
+
+
+# --- The user directory ---
+def _directory():
+    from . import db
+    return db.engine # The default database
+
+
+def register_user(user):
+    """Reserves `user`'s username and email, gives it an id and selects its shard.
+
+    Raises IntegrityError if either is taken. Does nothing when sharding is off,
+    where the user table's own unique constraints apply.
+    """
+    if not shard_count():
+        return
+    with _directory().begin() as conn:
+        result = conn.execute(user_directory.insert().values(username=user.username, email=user.email))
+    user.id = result.inserted_primary_key[0]
+    select_user_shard(user.id)
+
+
+def unregister_user(user):
+    """Releases the directory entry made by register_user, after the shard write failed."""
+    if shard_count() and user.id is not None:
+        with _directory().begin() as conn:
+            conn.execute(user_directory.delete().where(user_directory.c.id == user.id))
+
+
+def update_user(user_id, username, email):
+    """Records a new username or email in the directory; raises IntegrityError if either is taken."""
+    if shard_count():
+        with _directory().begin() as conn:
+            conn.execute(user_directory.update().where(user_directory.c.id == user_id)
+                         .values(username=username, email=email))
+
+
+def user_id_for(username=None, email=None):
+    """The id of the user with this username (or email), or None."""
+    from . import db
+    from .models import User
+    if shard_count():
+        column = user_directory.c.username if username is not None else user_directory.c.email
+        with _directory().connect() as conn:
+            return conn.execute(sa.select(user_directory.c.id)
+                                .where(column == (username if username is not None else email))).scalar()
+    column = User.username if username is not None else User.email
+    return db.session.query(User.id).filter(column == (username if username is not None else email)).scalar()
+
+
+def user_ids_for_usernames(usernames):
+    """{username: id} for the usernames that exist, in one query."""
+    from . import db
+    from .models import User
+    usernames = list(usernames)
+    if not usernames:
+        return {}
+    if shard_count():
+        with _directory().connect() as conn:
+            rows = conn.execute(sa.select(user_directory.c.username, user_directory.c.id)
+                                .where(user_directory.c.username.in_(usernames))).all()
+    else:
+        rows = db.session.query(User.username, User.id).filter(User.username.in_(usernames)).all()
+    return dict(rows)
+
+
+def find_user(identifier):
+    """The User whose username or email is `identifier`, or None."""
+    from .models import User
+    if not shard_count():
+        return User.query.filter((User.username == identifier) | (User.email == identifier)).first()
+    with _directory().connect() as conn:
+        user_id = conn.execute(sa.select(user_directory.c.id)
+                               .where((user_directory.c.username == identifier) |
+                                      (user_directory.c.email == identifier))).scalar()
+    return user_session(user_id).get(User, user_id) if user_id is not None else None
+
+
+def search_usernames(q, exclude_id, limit=5):
+    from . import db
+    from .models import User
+    if shard_count():
+        table = user_directory
+        with _directory().connect() as conn:
+            return conn.execute(sa.select(table.c.username)
+                                .where(table.c.username.ilike(f"%{q}%"), table.c.id != exclude_id)
+                                .order_by(table.c.username).limit(limit)).scalars().all()
+    return [row[0] for row in (db.session.query(User.username)
+                               .filter(User.username.ilike(f"%{q}%"))
+                               .filter(User.id != exclude_id)
+                               .order_by(User.username).limit(limit).all())]
+
+
+# --- Cross-shard reads ---
+def _group_by_shard(ids, shard_for):
+    groups = {}
+    for object_id in ids:
+        groups.setdefault(shard_for(object_id), set()).add(object_id)
+    return groups
+
+
+def share_rows_across_shards(query):
+    """ShareRows for a SharedRecipe query, reading each recipe and sharer from its own shard.
+
+    One query for the shares, one for the directory, then one per shard that
+    holds any of the recipes and one per shard that holds any of the sharers.
+    """
+    from .models import Recipe, SharedRecipe, User
+    shares = (query.with_entities(SharedRecipe.id, SharedRecipe.recipe_id, SharedRecipe.sharer_name,
+                                  SharedRecipe.date_shared)
+              .order_by(SharedRecipe.date_shared.desc())
+              .all())
+    recipes = {}
+    for shard, ids in _group_by_shard({share.recipe_id for share in shares}, shard_for_recipe).items():
+        rows = (shard_session(shard).query(Recipe.id, Recipe.name, Recipe.sync_version)
+                .filter(Recipe.id.in_(ids)))
+        recipes.update((row.id, row) for row in rows)
+    sharer_ids = user_ids_for_usernames({share.sharer_name for share in shares})
+    pictures = {}
+    for shard, ids in _group_by_shard(sharer_ids.values(), shard_for_user).items():
+        pictures.update(shard_session(shard).query(User.username, User.profile_picture_url)
+                        .filter(User.id.in_(ids)).all())
+    rows = []
+    for share in shares:
+        recipe = recipes.get(share.recipe_id)
+        rows.append(ShareRow(share.id, share.recipe_id, share.sharer_name, share.date_shared,
+                             recipe.name if recipe else None, recipe.sync_version if recipe else None,
+                             pictures.get(share.sharer_name),
+                             share.sharer_name if share.sharer_name in pictures else None))
+    return rows
+
+
+def recipe_names(recipe_ids):
+    """{id: name} for the recipes, one query per shard that holds any of them."""
+    from .models import Recipe
+    names = {}
+    for shard, ids in _group_by_shard(recipe_ids, shard_for_recipe).items():
+        names.update(shard_session(shard).query(Recipe.id, Recipe.name).filter(Recipe.id.in_(ids)).all())
+    return names
+
+
+def share_list_version_across_shards(receiver_id):
+    """sync.share_list_version when sharded: the same aggregates, taken on each shard involved.
+
+    Only the distinct recipe ids and sharer names are read, not the shares.
+    """
+    from . import db
+    from .models import Recipe, SharedRecipe, User
+    shares = db.session.query(SharedRecipe).filter(SharedRecipe.receiver_id == receiver_id)
+    count, newest = shares.with_entities(sa.func.count(SharedRecipe.id), sa.func.max(SharedRecipe.sync_version)).one()
+    recipe_ids = [row.recipe_id for row in shares.with_entities(SharedRecipe.recipe_id).distinct()]
+    sharer_names = [row.sharer_name for row in shares.with_entities(SharedRecipe.sharer_name).distinct()]
+    recipe_versions = 0
+    for shard, ids in _group_by_shard(recipe_ids, shard_for_recipe).items():
+        recipe_versions += shard_session(shard).query(sa.func.coalesce(sa.func.sum(Recipe.sync_version), 0))\
+                                               .filter(Recipe.id.in_(ids)).scalar()
+    pictures = []
+    sharer_ids = user_ids_for_usernames(sharer_names).values()
+    for shard, ids in sorted(_group_by_shard(sharer_ids, shard_for_user).items()):
+        pictures.extend(row.profile_picture_url for row in shard_session(shard).query(User.profile_picture_url)
+                        .filter(User.id.in_(ids)).order_by(User.id))
+    return count, newest, recipe_versions, ','.join(picture or '' for picture in pictures)
+
+
+# --- Setup ---
+def configure(app):
+    """Adds a database bind per shard. Runs before db.init_app, which creates the engines."""
+    uris = list(app.config.get('SHARD_DATABASE_URIS') or [])
+    if uris:
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds.update({_bind_key(shard): uri for shard, uri in enumerate(uris)})
+        app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['shards'] = len(uris)
+
+
+def init_app(app):
+    from sqlalchemy import event
+    from . import db
+    from .models import Recipe
+    for shard in range(app.extensions['shards']):
+        # db.init_app makes an empty MetaData per bind. The shards use db.metadata (see
+        # create_all), and a leftover entry would make db.create_all() in other apps look
+        # for these binds.
+        db.metadatas.pop(_bind_key(shard), None)
+    if not event.contains(Recipe, 'before_insert', _allocate_recipe_id):
+        event.listen(Recipe, 'before_insert', _allocate_recipe_id)
+    app.teardown_appcontext(_close_shard_sessions)
+
+    if app.extensions['shards']:
+        @app.before_request
+        def _select_current_user_shard():
+            # Before any query: loading the user selects their shard, and a user cached
+            # on g by login_user is selected here
+            if current_user.is_authenticated:
+                select_user_shard(current_user.id)
+
+    app.cli.add_command(shards_cli)
+
+
+def create_all():
+    """Creates the directory table and every shard's tables, skipping any that exist."""
+    from . import db
+    from .maintenance import enable_incremental_vacuum
+    directory_metadata.create_all(_directory())
+    for shard in range(shard_count()):
+        enable_incremental_vacuum(shard_engine(shard)) # Only takes effect on a new file
+        db.metadata.create_all(shard_engine(shard))
+
+
+# --- CLI: flask shards ... ---
+shards_cli = AppGroup('shards', help='Set up and inspect sharded databases.')
+
+
+@shards_cli.command('create')
+def create_command():
+    """Create the directory and shard databases, stamped at the latest migration."""
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    if not shard_count():
+        raise click.ClickException("Set SHARD_DATABASE_URIS (or SHARD_COUNT) first.")
+    create_all()
+    # Later migrations are applied per shard: DATABASE_URL=<shard uri> flask db upgrade
+    script = ScriptDirectory(os.path.join(os.path.dirname(current_app.root_path), 'migrations'))
+    for shard in range(shard_count()):
+        with shard_engine(shard).begin() as conn:
+            MigrationContext.configure(conn).stamp(script, 'head')
+    click.echo(f"Created the user directory and {shard_count()} shard(s).")
+
+
+@shards_cli.command('status')
+def status_command():
+    """Show how many users and recipes each shard holds."""
+    from . import db
+    from .models import Recipe, User
+    for shard in each_shard():
+        users = db.session.query(sa.func.count(User.id)).scalar()
+        recipes = db.session.query(sa.func.count(Recipe.id)).scalar()
+        click.echo(f"shard {shard if shard is not None else '-'}: {users} user(s), {recipes} recipe(s)")
@@ -0,0 +1,102 @@
+// static/js/bootstrap.js
+// Entry point for the home page. Wires up tabs and the mailbox; every feature other than the
+// default "My Recipes" tab is imported on demand the first time it is used.
+import { getPageData, onTabOpen, showTab, showTemporaryStatusMessage } from '@app/common';
+import * as recipes from '@app/recipes';
+
+onTabOpen('add', () => import('@app/editor').then(editor => editor.resetForm()));
+onTabOpen('recipe-stats', () => import('@app/stats').then(stats => stats.updateStats()));
+onTabOpen('share', () => import('@app/share'));
+
+function setupTabs() {
+    document.querySelectorAll('.tab').forEach(tab => {
+        tab.addEventListener('click', () => showTab(tab.getAttribute('data-tab')));
+    });
+}
+
+function setupMailbox() {
+    const mailboxIcon = document.querySelector('.mailbox-icon');
+    const mailboxPopup = document.getElementById('mailbox-popup');
+    const closePopup = document.getElementById('close-popup');
+    if (!mailboxIcon || !mailboxPopup || !closePopup) return;
+
+    mailboxIcon.addEventListener('click', function(e) {
+        e.stopPropagation();
+        const isVisible = mailboxPopup.style.display === 'block';
+        mailboxPopup.style.display = isVisible ? 'none' : 'block';
+        if (!isVisible) {
+            mailboxIcon.classList.remove('has-new');
+            import('@app/mailbox').then(mailbox => mailbox.displaySharedRecipes());
+        }
+    });
+
+    closePopup.addEventListener('click', function() {
+        mailboxPopup.style.display = 'none';
+    });
+
+    document.addEventListener('click', function(e) {
+        if (mailboxPopup.style.display === 'block' && // Only act if popup is visible
+            !mailboxPopup.contains(e.target) && 
+            e.target !== mailboxIcon && 
+            !mailboxIcon.contains(e.target)
+        ) {
+            mailboxPopup.style.display = 'none';
+        }
+    });
+}
+
+function announceShare(share) {
+    const mailboxIcon = document.querySelector('.mailbox-icon');
+    const mailboxPopup = document.getElementById('mailbox-popup');
+    if (mailboxPopup && mailboxPopup.style.display === 'block') {
+        import('@app/mailbox').then(mailbox => mailbox.displaySharedRecipes());
+    } else if (mailboxIcon) {
+        mailboxIcon.classList.add('has-new');
+    }
+    showTemporaryStatusMessage(`${share.sharer_name} shared "${share.recipe_name}" with you.`, 'info');
+}
+
+// New shares are pushed over Server-Sent Events where the server can hold streams open cheaply.
+// EventSource reconnects by itself (sending Last-Event-ID) whenever the server ends a stream.
+// Elsewhere (sync workers) the page asks /api/events/shares/poll every share_poll_seconds instead.
+function listenForShares() {
+    const { share_stream: stream, share_poll_seconds: pollSeconds } = getPageData();
+    if (stream && 'EventSource' in window) {
+        const source = new EventSource('/api/events/shares');
+        source.addEventListener('share', event => announceShare(JSON.parse(event.data)));
+        return;
+    }
+    if (!pollSeconds) return;
+    let after = null; // The first poll only fetches the current version
+    const poll = () => {
+        if (document.hidden) return; // Background tabs catch up on their next visible poll
+        const url = after === null ? '/api/events/shares/poll' : `/api/events/shares/poll?after=${after}`;
+        fetch(url)
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data) return;
+                data.shares.forEach(announceShare);
+                after = data.last_event_id;
+            })
+            .catch(() => {});
+    };
+    poll();
+    setInterval(poll, pollSeconds * 1000);
+}
+
+// Fetch the stats once the page is idle so the stats tab opens from the browser cache
+function warmStatsCache() {
+    const statsUrl = getPageData().stats_url;
+    if (statsUrl) fetch(statsUrl).catch(() => {});
+}
+
+// Module scripts are deferred, so the DOM is already parsed here.
+setupTabs();
+setupMailbox();
+recipes.init();
+listenForShares();
+if ('requestIdleCallback' in window) {
+    requestIdleCallback(warmStatsCache, { timeout: 5000 });
+} else {
+    setTimeout(warmStatsCache, 2000);
+}
@@ -0,0 +1,125 @@
+// static/js/common.js
+// Helpers shared by every feature module. Keep this small: it is loaded on every page view.
+
+// Page data rendered by the template (user id, stats, ...)
+let pageData = null;
+export function getPageData() {
+    if (pageData === null) {
+        const el = document.getElementById('page-data');
+        pageData = el ? JSON.parse(el.textContent) : {};
+    }
+    return pageData;
+}
+
+export function getCsrfToken() {
+    const csrfToken = document.querySelector('meta[name="csrf-token"]')?.getAttribute('content');
+    if (!csrfToken) {
+        console.error("CSRF token not found in meta tag!");
+        alert("Action failed: Security token missing. Please refresh the page.");
+    }
+    return csrfToken;
+}
+
+export function showTemporaryStatusMessage(message, type = 'info', duration = 3000) {
+    const statusDiv = document.createElement('div');
+    statusDiv.className = `alert alert-${type}`;
+    statusDiv.textContent = message;
+    
+    // Base styles
+    statusDiv.style.position = 'fixed';
+    statusDiv.style.top = '20px';
+    statusDiv.style.left = '50%';
+    statusDiv.style.transform = 'translateX(-50%)';
+    statusDiv.style.zIndex = '1050';
+    statusDiv.style.padding = '10px 20px'; // Ensure padding
+    statusDiv.style.borderRadius = '5px'; // Ensure border-radius
+    statusDiv.style.boxShadow = '0 2px 10px rgba(0,0,0,0.1)'; // Add some shadow
+    statusDiv.style.opacity = '1';
+    statusDiv.style.transition = 'opacity 0.5s ease-out'; // For fade-out
+
+    // Apply alert-specific styles if not already covered by global .alert classes
+    switch (type) {
+        case 'success':
+            statusDiv.style.backgroundColor = 'var(--success-bg)'; statusDiv.style.color = 'var(--success-text)'; statusDiv.style.borderColor = 'var(--success-border)';
+            break;
+        case 'warning':
+            statusDiv.style.backgroundColor = 'var(--warning-bg)'; statusDiv.style.color = 'var(--warning-text)'; statusDiv.style.borderColor = 'var(--warning-border)';
+            break;
+        case 'danger':
+            statusDiv.style.backgroundColor = 'var(--danger-bg)'; statusDiv.style.color = 'var(--danger-text)'; statusDiv.style.borderColor = 'var(--danger-border)';
+            break;
+        case 'info':
+        default:
+            statusDiv.style.backgroundColor = 'var(--info-bg)'; statusDiv.style.color = 'var(--info-text)'; statusDiv.style.borderColor = 'var(--info-border)';
+            break;
+    }
+    
+    document.body.appendChild(statusDiv);
+
+    setTimeout(() => {
+        statusDiv.style.opacity = '0'; // Start fade-out
+        // Remove from DOM after transition completes
+        setTimeout(() => {
+            if (statusDiv.parentNode) {
+                statusDiv.parentNode.removeChild(statusDiv);
+            }
+        }, 500); // Match transition duration
+    }, duration);
+}
+
+// Loads a classic (non-module) script such as Chart.js once, on first use.
+const loadedScripts = {};
+export function loadScript(src) {
+    if (!loadedScripts[src]) {
+        loadedScripts[src] = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = src;
+            script.async = true;
+            script.onload = resolve;
+            script.onerror = () => {
+                delete loadedScripts[src]; // Allow a retry on the next call
+                reject(new Error(`Failed to load ${src}`));
+            };
+            document.head.appendChild(script);
+        });
+    }
+    return loadedScripts[src];
+}
+
+// --- Tabs ---
+// Feature modules are only imported when their tab is first opened, so the
+// bootstrap registers a handler per tab instead of importing them up front.
+const tabHandlers = {};
+
+export function onTabOpen(tabId, handler) {
+    tabHandlers[tabId] = handler;
+}
+
+// Activates a tab. `silent` skips the tab's open handler (e.g. when the
+// editor switches to the Add tab itself and must not have the form reset).
+export function showTab(tabId, { silent = false } = {}) {
+    const targetTab = document.querySelector(`.tab[data-tab="${tabId}"]`);
+    const activeContent = document.getElementById(tabId);
+    if (!targetTab || targetTab.classList.contains('disabled')) return;
+    if (!activeContent) {
+        console.warn(`Tab content with ID "${tabId}" not found.`);
+        return;
+    }
+
+    document.querySelectorAll('.tab').forEach(t => t.classList.remove('active'));
+    targetTab.classList.add('active');
+    document.querySelectorAll('.tab-content').forEach(content => content.classList.remove('active'));
+    activeContent.classList.add('active');
+
+    if (!silent && tabHandlers[tabId]) {
+        tabHandlers[tabId]();
+    }
+}
+
+// Function to switch tabs programmatically
+export function switchTab(tabId) {
+    const targetTab = document.querySelector(`.tab[data-tab="${tabId}"]`);
+    if (targetTab && !targetTab.classList.contains('active')) {
+        showTab(tabId);
+    }
+}
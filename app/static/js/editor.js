@@ -0,0 +1,387 @@
+// static/js/editor.js
+// "Add Recipe" tab: the add/edit form, ingredient list and image upload. Loaded when the tab is
+// first opened or a recipe is edited.
+import { getCsrfToken, showTab, switchTab, showTemporaryStatusMessage } from '@app/common';
+import { currentRecipes, loadRecipes } from '@app/recipes';
+
+const TAB_BUTTON_IDS = ['my-recipes-button', 'add-recipe-button', 'recipe-stats-button', 'share-recipe-button'];
+
+// --- Ingredient Input ---
+let ingredients = [];
+
+function updateHidden() {
+  const hiddenInput = document.getElementById('ingredients-hidden');
+  hiddenInput.value = ingredients.join(',');
+}
+
+function renderList() {
+  const listEl = document.getElementById('ingredient-list');
+  listEl.innerHTML = '';
+  ingredients.forEach((item, idx) => {
+    const li = document.createElement('li');
+    const span = document.createElement('span');
+    span.textContent = item;
+    li.appendChild(span);
+
+    const delBtn = document.createElement('button');
+    delBtn.type = 'button';
+    delBtn.innerHTML = '<i class="fas fa-trash"></i>';
+    delBtn.addEventListener('click', () => {
+      ingredients.splice(idx, 1);
+      renderList();
+    });
+
+    li.appendChild(delBtn);
+    listEl.appendChild(li);
+  });
+  updateHidden();
+}
+
+// --- API ---
+async function addRecipeToServer(recipeData) {
+    const csrfToken = getCsrfToken();
+    if (!csrfToken) return null;
+
+    try {
+        const response = await fetch('/api/recipes', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken // Include the token in the headers
+            },
+            body: JSON.stringify(recipeData),
+        });
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
+            // Check specifically for 400, often related to CSRF or validation issues
+            if (response.status === 400 && errorData.error && errorData.error.toLowerCase().includes('csrf')) {
+                 alert("Action failed: Security token mismatch. Please refresh the page and try again.");
+                 return null;
+            }
+            throw new Error(`HTTP error! status: ${response.status} - ${errorData.error}`);
+        }
+        const newRecipe = await response.json();
+        currentRecipes.unshift(newRecipe);
+        return newRecipe;
+    } catch (error) {
+        console.error("Error adding recipe:", error);
+        alert(`Failed to save recipe: ${error.message}`);
+        return null;
+    }
+}
+
+// --- Event Handlers ---
+
+// Handle form submission
+async function handleFormSubmit(event) {
+    event.preventDefault();
+
+    const name = document.getElementById('recipe-name').value.trim();
+    const category = document.getElementById('recipe-category').value;
+    const timeInput = document.getElementById('recipe-time').value;
+    const instructions = document.getElementById('recipe-instructions').value.trim();
+    const imageInput = document.getElementById('recipe-image');
+
+    const time = parseInt(timeInput, 10);
+
+    const ingredientsList = Array.from(
+        document.querySelectorAll('#ingredient-list li span')
+    ).map(span => span.textContent.trim());
+
+    const form = document.getElementById('recipe-form');
+    const isEditing = form.dataset.editingId;
+
+    // Base recipe data, DO NOT include image initially
+    const recipeData = {
+        name,
+        category,
+        time,
+        ingredients: ingredientsList,
+        instructions,
+    };
+
+    const submitButton = event.target.querySelector('button[type="submit"]'); 
+    submitButton.disabled = true;
+    submitButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Saving...';
+
+    // Handle image ONLY IF a new file is selected
+    if (imageInput.files.length > 0) {
+        // Create a promise to handle FileReader async operation
+        const imagePromise = new Promise((resolve) => {
+            const reader = new FileReader();
+            reader.onload = function(e) {
+                recipeData.image = e.target.result; // Add image data ONLY if read successfully
+                resolve();
+            };
+            reader.onerror = function() {
+                console.error("Error reading file");
+                resolve(); // Continue without the new image
+            };
+            reader.readAsDataURL(imageInput.files[0]);
+        });
+
+        // Wait for the image processing to complete before saving
+        try {
+            await imagePromise;
+            await saveRecipe(recipeData, isEditing, submitButton);
+        } catch (error) {
+            alert(`Failed to process image: ${error.message}`);
+            postSaveActions(null, submitButton); // Indicate failure
+        }
+
+    } else {
+        // No new file selected, proceed to save without image data
+        await saveRecipe(recipeData, isEditing, submitButton);
+    }
+}
+
+async function saveRecipe(recipeData, isEditing, submitButton) {
+    let savedRecipe;
+    try {
+        if (isEditing) {
+            // Update existing recipe
+            const csrfToken = getCsrfToken();
+            if (!csrfToken) {
+                submitButton.disabled = false;
+                return;
+            }
+        
+            const response = await fetch(`/api/recipes/${isEditing}`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfToken
+                },
+                body: JSON.stringify(recipeData)
+            });
+        
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+        
+            savedRecipe = await response.json();
+            const index = currentRecipes.findIndex(r => r.id == isEditing);
+            if (index !== -1) {
+                currentRecipes[index] = savedRecipe;
+            }
+        } else {
+            // ADD NEW recipe (POST)
+            savedRecipe = await addRecipeToServer(recipeData);
+        }
+
+        postSaveActions(savedRecipe, submitButton);
+    } catch (error) {
+        console.error("Error saving recipe:", error);
+        alert(`Failed to save recipe: ${error.message}`);
+        submitButton.disabled = false;
+        submitButton.innerHTML = isEditing ? 
+            '<i class="fas fa-save"></i> Update Recipe' : 
+            '<i class="fas fa-save"></i> Save Recipe';
+    }
+}
+
+function postSaveActions(savedRecipe, submitButton) {
+    const wasEditing = document.getElementById('recipe-form').dataset.editingId; // Check *before* deleting
+
+    submitButton.disabled = false;
+    // After an add or update, the form resets to "Add Recipe" mode.
+    submitButton.innerHTML = '<i class="fas fa-save"></i> Save Recipe'; 
+    
+    if (savedRecipe) {
+        document.getElementById('recipe-form').reset();
+        // Clear the image file input and its status specifically
+        const imageInput = document.getElementById('recipe-image');
+        if (imageInput) imageInput.value = ''; 
+        const fileUploadStatus = document.getElementById('file-upload-status');
+        if (fileUploadStatus) {
+            fileUploadStatus.textContent = '';
+            fileUploadStatus.className = '';
+        }
+
+        if (wasEditing) { // If it was an edit, clear the editing state
+            delete document.getElementById('recipe-form').dataset.editingId;
+        }
+        
+        // Remove cancel button if it exists
+        const cancelBtn = document.getElementById('cancel-edit-btn');
+        if (cancelBtn) cancelBtn.remove();
+        
+        // Reset form header to "Add New Recipe"
+        document.querySelector('#add h2').innerHTML = '<i class="fas fa-plus-circle"></i> Add New Recipe';
+        
+        loadRecipes(); // Reload recipes to show changes
+        switchTab('my-recipes'); // Switch to the recipes list tab
+        
+        showTemporaryStatusMessage(
+            `Recipe "${savedRecipe.name}" ${wasEditing ? 'updated' : 'saved'} successfully!`, 
+            'success'
+        );
+    }
+}
+
+// Add function to handle editing
+export function editRecipe(id) {
+    const recipe = currentRecipes.find(r => r.id == id);
+    if (!recipe) {
+        alert('Recipe not found for editing.');
+        return;
+    }
+
+    showTab('add', { silent: true }); // Don't let the tab's open handler reset the form
+
+    document.getElementById('recipe-name').value = recipe.name;
+    document.getElementById('recipe-category').value = recipe.category;
+    document.getElementById('recipe-time').value = recipe.time;
+    document.getElementById('recipe-instructions').value = recipe.instructions;
+
+    // Clear existing ingredients and populate new ones
+    ingredients = Array.isArray(recipe.ingredients) ? 
+        [...recipe.ingredients] : 
+        [];
+    renderList();
+
+    document.getElementById('recipe-form').dataset.editingId = id;
+
+    // Update form header and button
+    document.querySelector('#add h2').innerHTML = '<i class="fas fa-edit"></i> Edit Recipe';
+    document.getElementById('add-recipe-button').textContent = 'Edit Recipe';
+    const submitBtn = document.querySelector('#add button[type="submit"]');
+    submitBtn.innerHTML = '<i class="fas fa-save"></i> Update Recipe';
+
+    // Add event listener to cancel when switching tabs
+    TAB_BUTTON_IDS.forEach(buttonId => document.getElementById(buttonId).addEventListener('click', cancelEdit));
+
+    // Add cancel button if missing
+    if (!document.getElementById('cancel-edit-btn')) {
+        const cancelBtn = document.createElement('button');
+        cancelBtn.type = 'button';
+        cancelBtn.id = 'cancel-edit-btn';
+        cancelBtn.className = 'btn btn-secondary';
+        cancelBtn.innerHTML = '<i class="fas fa-times"></i> Cancel';
+        cancelBtn.onclick = cancelEdit;
+        submitBtn.insertAdjacentElement('afterend', cancelBtn);
+    }
+}
+
+// Cancel edit mode
+function cancelEdit() {
+    const form = document.getElementById('recipe-form');
+    delete form.dataset.editingId;
+    form.reset();
+    
+    // Clear ingredients
+    ingredients = [];
+    renderList();
+
+    document.querySelector('#add h2').innerHTML = '<i class="fas fa-plus-circle"></i> Add New Recipe';
+    document.getElementById('add-recipe-button').textContent = 'Add Recipe';
+    document.querySelector('#add button[type="submit"]').innerHTML = '<i class="fas fa-save"></i> Save Recipe';
+
+    // Remove event after being cancelled
+    TAB_BUTTON_IDS.forEach(buttonId => document.getElementById(buttonId).removeEventListener('click', cancelEdit));
+
+    const cancelBtn = document.getElementById('cancel-edit-btn');
+    if (cancelBtn) cancelBtn.remove();
+}
+
+// Called every time the Add tab is opened: start from an empty form
+export function resetForm() {
+    const form = document.getElementById('recipe-form');
+    form.reset();
+    delete form.dataset.editingId;
+
+    ingredients.length = 0;
+    renderList();
+
+    document.querySelector('#add h2').innerHTML = '<i class="fas fa-plus-circle"></i> Add New Recipe';
+    document.querySelector('#add button[type="submit"]').innerHTML = '<i class="fas fa-save"></i> Save Recipe';
+
+    const cancelBtn = document.getElementById('cancel-edit-btn');
+    if (cancelBtn) cancelBtn.remove();
+}
+
+// Handle file input change for immediate feedback
+function handleFileChange(fileInput) {
+    const fileUploadStatus = document.getElementById('file-upload-status');
+    if (!fileUploadStatus) return; // Exit if status element doesn't exist
+
+    if (fileInput.files.length > 0) {
+        const fileName = fileInput.files[0].name;
+        const fileSize = (fileInput.files[0].size / 1024 / 1024).toFixed(2); // Size in MB
+        if (fileSize > 5) { // Limit to 5MB
+            fileUploadStatus.innerHTML = `<i class="fas fa-exclamation-triangle" style="color: var(--danger-color);"></i> File too large: ${fileName} (${fileSize}MB). Max 5MB.`;
+            fileUploadStatus.className = 'danger';
+            fileInput.value = ''; // Clear the input
+            return;
+        }
+        if (!fileInput.files[0].type.startsWith('image/')) {
+             fileUploadStatus.innerHTML = `<i class="fas fa-exclamation-triangle" style="color: var(--danger-color);"></i> Invalid file type: ${fileName}. Please upload an image.`;
+             fileUploadStatus.className = 'danger';
+             fileInput.value = ''; // Clear the input
+             return;
+        }
+
+        fileUploadStatus.innerHTML = `<i class="fas fa-check-circle" style="color: var(--success-color);"></i> File selected: ${fileName} (${fileSize}MB)`;
+        fileUploadStatus.className = 'success';
+    } else {
+        fileUploadStatus.textContent = '';
+        fileUploadStatus.className = '';
+    }
+}
+
+// --- Setup (runs once, when the module is first imported) ---
+function init() {
+    // File upload trigger & feedback
+    const fileUploadArea = document.getElementById('file-upload');
+    const fileInputElement = document.getElementById('recipe-image');
+    if (fileUploadArea && fileInputElement) {
+        fileUploadArea.addEventListener('click', () => fileInputElement.click());
+
+        // Drag and Drop Handling
+        fileUploadArea.addEventListener('dragover', (event) => {
+            event.preventDefault(); // Necessary to allow drop
+            fileUploadArea.classList.add('dragging'); // Add class for styling
+        });
+        fileUploadArea.addEventListener('dragleave', () => {
+             fileUploadArea.classList.remove('dragging'); // Remove class
+        });
+        fileUploadArea.addEventListener('drop', (event) => {
+            event.preventDefault();
+            fileUploadArea.classList.remove('dragging');
+            if (event.dataTransfer.files.length > 0) {
+                fileInputElement.files = event.dataTransfer.files; // Assign dropped files
+                handleFileChange(fileInputElement); // Update UI
+            }
+        });
+        fileInputElement.addEventListener('change', () => handleFileChange(fileInputElement));
+    }
+
+    const recipeForm = document.getElementById('recipe-form');
+    if (recipeForm) {
+        recipeForm.addEventListener('submit', handleFormSubmit);
+    }
+
+    const recipeTimeInput = document.getElementById('recipe-time');
+    if (recipeTimeInput) { 
+        recipeTimeInput.addEventListener('keypress', function(e) {
+            if (!/\d/.test(String.fromCharCode(e.charCode))) {
+                e.preventDefault();
+            }
+        });
+    }
+
+    const ingredientInput = document.getElementById('ingredient-input');
+    const addBtn = document.getElementById('add-ingredient-btn');
+    if (ingredientInput && addBtn) {
+        addBtn.addEventListener('click', () => {
+            const val = ingredientInput.value.trim();
+            if (!val) return;
+            ingredients.push(val);
+            ingredientInput.value = '';
+            ingredientInput.focus();
+            renderList();
+        });
+    }
+}
+
+init();
@@ -0,0 +1,100 @@
+// static/js/mailbox.js
+// Shared-recipes mailbox popup. Loaded the first time the mailbox icon is clicked.
+import { showTemporaryStatusMessage } from '@app/common';
+import { getSynced } from '@app/sync';
+
+async function fetchSharedRecipes() {
+    const synced = await getSynced('shares');
+    if (synced) return synced;
+    try {
+        const response = await fetch('/api/shared_recipes/my', { cache: 'no-cache' }); // Revalidates via ETag
+        if (!response.ok) {
+            // Handle specific errors like 401 for session expiry
+            if (response.status === 401) {
+                showTemporaryStatusMessage("Session expired. Please log in again.", "warning");
+                return []; // Return empty to prevent further processing
+            }
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return await response.json();
+    } catch (error) {
+        console.error("Error fetching shared recipes:", error);
+        showTemporaryStatusMessage("Could not load shared recipes. " + error.message, "danger");
+        return [];
+    }
+}
+
+function renderSharedRecipe(sharedRecipe) {
+    const itemDiv = document.createElement('div');
+    itemDiv.className = 'shared-recipe-item';
+    
+    const dateShared = new Date(sharedRecipe.date_shared);
+    const formattedDate = dateShared.toLocaleDateString(undefined, {
+        year: 'numeric', month: 'short', day: 'numeric'
+    });
+
+    // Determine sharer's initial for default PFP
+    const sharerInitial = sharedRecipe.sharer_username_for_initial 
+                          ? sharedRecipe.sharer_username_for_initial[0].toUpperCase() 
+                          : 'S'; // Fallback initial
+
+    let pfpElementHTML = '';
+    if (sharedRecipe.sharer_pfp_url) {
+        pfpElementHTML = `<img src="${sharedRecipe.sharer_pfp_url}" alt="${sharedRecipe.sharer_name}'s PFP" class="shared-item-pfp-img">`;
+    } else {
+        pfpElementHTML = `<div class="shared-item-pfp-default"><span>${sharerInitial}</span></div>`;
+    }
+
+    itemDiv.innerHTML = `
+        <div class="shared-recipe-icon">
+            ${pfpElementHTML}
+        </div>
+        <div class="shared-recipe-details">
+            <h4 class="shared-recipe-name">${sharedRecipe.recipe_name}</h4>
+            <p class="shared-recipe-meta">
+                Shared by <strong>${sharedRecipe.sharer_name}</strong> on ${formattedDate}
+            </p>
+        </div>
+        <div class="shared-recipe-action">
+            <i class="fas fa-chevron-right"></i>
+        </div>
+    `;
+    
+    itemDiv.addEventListener('click', () => {
+        window.location.href = `/view_recipe/${sharedRecipe.recipe_id}`;
+        const mailboxPopup = document.getElementById('mailbox-popup');
+        if (mailboxPopup) mailboxPopup.style.display = 'none';
+    });
+    return itemDiv;
+}
+
+export function displaySharedRecipes() {
+    const sharedRecipesList = document.getElementById('shared-recipes-list');
+    const noRecipesMessage = document.getElementById('no-recipes-message');
+
+    if (!sharedRecipesList || !noRecipesMessage) {
+        console.warn("Mailbox elements not found in DOM for displaySharedRecipes.");
+        return;
+    }
+
+    // Show loading state
+    sharedRecipesList.innerHTML = '<p class="loading-message" style="text-align: center; padding: 20px; color: var(--grey);"><i class="fas fa-spinner fa-spin"></i> Loading shared recipes...</p>';
+    noRecipesMessage.style.display = 'none'; 
+
+    fetchSharedRecipes().then(sharedRecipes => {
+        sharedRecipesList.innerHTML = ''; // Clear loading message
+
+        if (sharedRecipes.length === 0) {
+            noRecipesMessage.style.display = 'block';
+            noRecipesMessage.textContent = 'No shared recipes yet.'; // Reset message
+        } else {
+            noRecipesMessage.style.display = 'none';
+            sharedRecipes.forEach(sharedRecipe => sharedRecipesList.appendChild(renderSharedRecipe(sharedRecipe)));
+        }
+    }).catch(error => {
+        console.error('Error in displaySharedRecipes after fetch:', error);
+        sharedRecipesList.innerHTML = ''; 
+        noRecipesMessage.textContent = 'Could not load shared recipes.';
+        noRecipesMessage.style.display = 'block';
+    });
+}
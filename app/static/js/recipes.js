@@ -0,0 +1,257 @@
+// static/js/recipes.js
+// "My Recipes" tab: the recipe list, search and delete. Loaded eagerly because it is the default tab.
+import { getCsrfToken, getPageData } from '@app/common';
+import { getSynced } from '@app/sync';
+
+export let currentRecipes = []; // Cache recipes locally for search/share dropdowns
+
+// Other modules (e.g. the share tab) listen for this to refresh anything derived from the list.
+function notifyRecipesChanged() {
+    document.dispatchEvent(new CustomEvent('recipes:changed'));
+}
+
+// --- API Helper Functions ---
+
+async function fetchRecipes() {
+    const synced = await getSynced('recipes'); // Only downloads what changed since the last visit
+    if (synced) {
+        currentRecipes = synced;
+        return synced;
+    }
+    // API endpoint now fetches recipes for the current user (based on session cookie)
+    try {
+        // 'no-cache' revalidates the browser's copy with If-None-Match; unchanged lists come back as a 304
+        const response = await fetch('/api/recipes', { cache: 'no-cache' }); // No user ID needed in URL
+        if (!response.ok) {
+            if (response.status === 401) { // Unauthorized
+                 alert("Your session may have expired. Please log in again.");
+                 window.location.href = '/login'; // Redirect to login
+                 return [];
+            }
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const recipes = await response.json();
+        currentRecipes = recipes;
+        return recipes;
+    } catch (error) {
+        console.error("Error fetching recipes:", error);
+        alert("Failed to load your recipes.");
+        currentRecipes = [];
+        return [];
+    }
+}
+
+async function deleteRecipeFromServer(recipeId) {
+    const csrfToken = getCsrfToken();
+    if (!csrfToken) return false; // Indicate failure
+
+    try {
+        const response = await fetch(`/api/recipes/${recipeId}`, {
+            method: 'DELETE',
+            headers: {
+                'X-CSRFToken': csrfToken // Include the token
+            }
+        });
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({ error: 'Unknown error' }));
+            if (response.status === 400 && errorData.error && errorData.error.toLowerCase().includes('csrf')) {
+                alert("Action failed: Security token mismatch. Please refresh the page and try again.");
+                return false;
+            }
+            throw new Error(`HTTP error! status: ${response.status} - ${errorData.error}`);
+        }
+        currentRecipes = currentRecipes.filter(r => r.id !== recipeId);
+        return true;
+    } catch (error) {
+        console.error(`Error deleting recipe ${recipeId}:`, error);
+        alert(`Failed to delete recipe: ${error.message}`);
+        return false;
+    }
+}
+
+// --- UI Rendering ---
+
+// Function to render a single recipe card
+function renderRecipeCard(recipe) {
+    const currentUserId = getPageData().user_id;
+    const recipeCard = document.createElement('div');
+    recipeCard.className = 'recipe-card';
+    recipeCard.dataset.id = recipe.id;
+
+    const ingredientsPreview = (Array.isArray(recipe.ingredients) ? recipe.ingredients : [])
+        .slice(0, 4).join(', ') + (recipe.ingredients.length > 4 ? '...' : '');
+    
+    const imageStyle = recipe.image
+        ? `background-image: url(${recipe.image});`
+        : 'background-image: linear-gradient(135deg, var(--primary-color), var(--secondary-color));';
+
+    recipeCard.innerHTML = `
+        <div class="recipe-img" style="${imageStyle}"></div>
+        <div class="recipe-info">
+            <h3 class="recipe-title">${recipe.name}</h3>
+            <div class="recipe-meta">
+                <span><i class="fas fa-tag category-icon"></i> ${recipe.category}</span>
+                <span><i class="fas fa-clock time-icon"></i> ${recipe.time} mins</span>
+                ${recipe.times_cooked ? `<span><i class="fas fa-utensils"></i> Cooked ${recipe.times_cooked}×</span>` : ''}
+            </div>
+            <p class="recipe-ingredients-preview">
+                <strong>Ingredients:</strong> ${ingredientsPreview || 'No ingredients listed'}
+            </p>
+            <div class="recipe-actions">
+                <!-- View Button (always visible) -->
+                <a href="/view_recipe/${recipe.id}" class="btn btn-secondary btn-sm">
+                    <i class="fas fa-eye"></i> View
+                </a>
+
+                <!-- Edit Button (only for owner) -->
+                ${recipe.user_id === currentUserId ? `
+                <button class="btn btn-primary btn-sm" data-action="edit" id="edit-recipe-btn">
+                    <i class="fas fa-edit"></i> Edit
+                </button>
+                <a href="/start_cooking/${recipe.id}" class="btn btn-success btn-sm" id="start-cooking-btn">
+                    <i class="fas fa-utensils"></i> Cook
+                </a>
+                <button class="btn btn-danger btn-sm" data-action="delete">
+                    <i class="fas fa-trash"></i> Delete
+                </button>
+                ` : ''}
+            </div>
+        </div>
+    `;
+    return recipeCard;
+}
+
+// Load recipes into the UI and Share dropdown
+export async function loadRecipes() {
+    const recipeList = document.getElementById('recipe-list');
+    const shareRecipeSelect = document.getElementById('share-recipe');
+    const currentUserId = getPageData().user_id;
+
+    // Clear previous content and show loading indicators
+    recipeList.innerHTML = '<p style="grid-column: 1/-1; text-align: center;"><i class="fas fa-spinner fa-spin"></i> Loading your recipes...</p>';
+    if (shareRecipeSelect) {
+        shareRecipeSelect.innerHTML = '<option value="">Loading...</option>';
+        shareRecipeSelect.disabled = true;
+    }
+    const sharePreview = document.getElementById('share-preview');
+    if (sharePreview) {
+        sharePreview.style.display = 'none';
+    }
+
+    const recipes = await fetchRecipes(); // Fetches recipes for the logged-in user
+
+    recipeList.innerHTML = ''; // Clear loading indicator
+    if (shareRecipeSelect) {
+        shareRecipeSelect.innerHTML = '<option value="">Select a recipe to share</option>'; // Reset dropdown
+    }
+
+    if (recipes.length === 0) {
+        recipeList.innerHTML = '<p style="grid-column: 1/-1; text-align: center; color: var(--grey);">You haven\'t added any recipes yet. Use the "Add Recipe" tab!</p>';
+        if (shareRecipeSelect) {
+            shareRecipeSelect.disabled = true; // Keep disabled if no recipes
+        }
+    } else {
+        const fragment = document.createDocumentFragment();
+        recipes.forEach(recipe => {
+            fragment.appendChild(renderRecipeCard(recipe));
+
+            // Add to share dropdown only if the user owns the recipe and the select exists
+            if (shareRecipeSelect && recipe.user_id === currentUserId) {
+                const option = document.createElement('option');
+                option.value = recipe.id;
+                option.textContent = recipe.name;
+                shareRecipeSelect.appendChild(option);
+            }
+        });
+        recipeList.appendChild(fragment);
+        // Enable share dropdown only if options were added and the select exists
+        if (shareRecipeSelect) {
+            shareRecipeSelect.disabled = shareRecipeSelect.options.length <= 1;
+        }
+    }
+
+    notifyRecipesChanged();
+}
+
+// Delete recipe function (called by button)
+async function deleteRecipe(id) {
+    // Find recipe name for confirmation message
+    const recipe = currentRecipes.find(r => r.id === id);
+    const recipeName = recipe ? `"${recipe.name}"` : "this recipe";
+
+    if (confirm(`Are you sure you want to delete ${recipeName}? This cannot be undone.`)) {
+        const success = await deleteRecipeFromServer(id);
+        if (success) {
+            // Reload recipes to update list, stats, and dropdowns
+            loadRecipes();
+        }
+    }
+}
+
+// --- Search ---
+function filterRecipes(searchInput) {
+    const searchTerm = searchInput.value.toLowerCase().trim();
+    const recipeListContainer = document.getElementById('recipe-list');
+    if (!recipeListContainer) return; // Exit if list container not found
+
+    let visibleCount = 0;
+    let noResultMessage = recipeListContainer.querySelector('.no-search-results');
+
+    // Remove existing no-results message before filtering
+    if (noResultMessage) noResultMessage.remove();
+
+    // Ensure currentRecipes is populated before searching
+    if (currentRecipes && currentRecipes.length > 0) {
+        currentRecipes.forEach(recipe => {
+            const card = recipeListContainer.querySelector(`.recipe-card[data-id='${recipe.id}']`);
+            if (!card) return; // Skip if card not rendered yet
+
+            const title = recipe.name ? recipe.name.toLowerCase() : '';
+            const ingredientsText = (Array.isArray(recipe.ingredients) ? recipe.ingredients.join(', ') : '').toLowerCase();
+            const categoryText = recipe.category ? recipe.category.toLowerCase() : '';
+            const isMatch = title.includes(searchTerm) || ingredientsText.includes(searchTerm) || categoryText.includes(searchTerm);
+
+            card.style.display = isMatch ? '' : 'none';
+            if (isMatch) visibleCount++;
+        });
+    }
+
+    // Add "no results" message if needed AFTER filtering
+    if (visibleCount === 0 && currentRecipes && currentRecipes.length > 0 && searchTerm) { // Only show if searching and recipes exist
+        noResultMessage = document.createElement('p');
+        noResultMessage.className = 'no-search-results';
+        noResultMessage.style.cssText = 'grid-column: 1 / -1; text-align: center; color: var(--grey); margin-top: 15px;';
+        noResultMessage.textContent = `No recipes found matching "${searchTerm}".`;
+        recipeListContainer.appendChild(noResultMessage);
+    } else if (visibleCount === 0 && (!currentRecipes || currentRecipes.length === 0) && !searchTerm) {
+        // Avoid adding message if loading message is present
+        if (!recipeListContainer.querySelector('p:not(.no-search-results)')) {
+            recipeListContainer.innerHTML = '<p style="grid-column: 1/-1; text-align: center; color: var(--grey);">You haven\'t added any recipes yet. Use the "Add Recipe" tab!</p>';
+        }
+    }
+}
+
+export function init() {
+    const recipeList = document.getElementById('recipe-list');
+    if (!recipeList) return;
+
+    // One delegated listener instead of inline onclick handlers on every card
+    recipeList.addEventListener('click', event => {
+        const button = event.target.closest('button[data-action]');
+        if (!button) return;
+        const id = parseInt(button.closest('.recipe-card').dataset.id, 10);
+        if (button.dataset.action === 'delete') {
+            deleteRecipe(id);
+        } else if (button.dataset.action === 'edit') {
+            // The editor is only needed once the user actually edits something
+            import('@app/editor').then(editor => editor.editRecipe(id));
+        }
+    });
+
+    const searchInput = document.getElementById('recipe-search');
+    if (searchInput) {
+        searchInput.addEventListener('input', () => filterRecipes(searchInput));
+    }
+
+    loadRecipes(); // This function updates currentRecipes and renders cards
+}
@@ -0,0 +1,194 @@
+// static/js/share.js
+// "Share Recipe" tab: recipe preview, user typeahead and whitelist sharing. Loaded when the tab is first opened.
+import { getCsrfToken } from '@app/common';
+import { currentRecipes } from '@app/recipes';
+
+// Display share preview (uses local cache)
+function displaySharePreview(recipeId) {
+    const sharePreview = document.getElementById('share-preview');
+    if (!sharePreview) return; // Exit if share section isn't on page
+
+    const recipe = currentRecipes.find(r => r.id == recipeId); // Find in local cache
+
+    if (recipe) {
+        sharePreview.style.display = 'block';
+        document.getElementById('share-title').textContent = recipe.name;
+        document.getElementById('share-category').innerHTML = `<i class="fas fa-tag category-icon"></i> ${recipe.category}`;
+        document.getElementById('share-time').innerHTML = `<i class="fas fa-clock time-icon"></i> ${recipe.time} mins`;
+
+        const shareImage = document.getElementById('share-image');
+        if (shareImage) {
+            shareImage.style.backgroundImage = recipe.image
+                ? `url(${recipe.image})`
+                : 'linear-gradient(135deg, var(--primary-color), var(--secondary-color))';
+        }
+    } else {
+        sharePreview.style.display = 'none';
+    }
+}
+
+// Check share dropdown state after the recipe list changes
+export function checkShareDropdown() {
+    const shareRecipeSelect = document.getElementById('share-recipe');
+    if (!shareRecipeSelect) return; // Exit if the dropdown doesn't exist on the page
+
+    const currentShareId = shareRecipeSelect.value;
+    const sharePreview = document.getElementById('share-preview');
+
+    if (currentShareId && !currentRecipes.some(r => r.id == currentShareId)) {
+        if (sharePreview) sharePreview.style.display = 'none';
+        shareRecipeSelect.value = '';
+        shareRecipeSelect.disabled = shareRecipeSelect.options.length <= 1;
+    } else if (currentShareId && sharePreview) {
+        // Refresh preview if still valid
+        displaySharePreview(currentShareId);
+    } else if (sharePreview) {
+        sharePreview.style.display = 'none';
+    }
+}
+
+function clearResponseMessage(responseMessageDiv) {
+    if (responseMessageDiv) {
+        responseMessageDiv.textContent = '';
+        responseMessageDiv.style.color = 'var(--grey)'; // Reset color
+    }
+}
+
+function setupUserSearch(input, suggestions) {
+    let debounce;
+    input.addEventListener("input", () => {
+        const q = input.value.trim();
+        clearTimeout(debounce);
+        if (q.length < 2) {
+            suggestions.innerHTML = "";
+            return;
+        }
+        debounce = setTimeout(() => {
+            fetch(`/users/search?q=${encodeURIComponent(q)}`)
+            .then(res => res.json())
+            .then(usernames => {
+                suggestions.innerHTML = "";
+                usernames.forEach(username => {
+                    const li = document.createElement("li");
+                    li.textContent = username;
+                    li.addEventListener("click", () => {
+                        input.value = username;
+                        suggestions.innerHTML = "";
+                    });
+                    suggestions.appendChild(li);
+                });
+            })
+            .catch(console.error);
+        }, 300);
+    });
+
+    document.addEventListener("click", e => {
+        if (!input.contains(e.target) && !suggestions.contains(e.target)) { 
+            suggestions.innerHTML = "";
+        }
+    });
+}
+
+function shareWithUser(whitelistButton, input, responseMessageDiv) {
+    const csrfToken = getCsrfToken();
+    const recipeSelect = document.getElementById('share-recipe');
+    
+    // Clear previous message before new attempt
+    clearResponseMessage(responseMessageDiv);
+
+    if (!recipeSelect) {
+        console.error("Share recipe select element not found.");
+        responseMessageDiv.textContent = "Error: Recipe selection not found.";
+        responseMessageDiv.style.color = 'var(--danger-text)';
+        return;
+    }
+    const recipeId = recipeSelect.value;
+    const username = input.value.trim();
+
+    if (!recipeId) {
+        responseMessageDiv.textContent = "Please select a recipe to share first.";
+        responseMessageDiv.style.color = 'var(--warning-text)';
+        return;
+    }
+
+    if (!username) {
+        responseMessageDiv.textContent = "Please enter or select a user to share with.";
+        responseMessageDiv.style.color = 'var(--warning-text)';
+        return;
+    }
+    
+    whitelistButton.disabled = true; // Disable button
+    whitelistButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Sharing...';
+
+    // "alice, bob, carol" shares with everyone in one request
+    const usernames = username.split(',').map(name => name.trim()).filter(Boolean);
+    const [url, payload] = usernames.length > 1
+        ? ['/api/shared_recipes/bulk', { usernames: usernames, recipe_ids: [Number(recipeId)] }]
+        : [`/recipes/${recipeId}/whitelist`, { username: username }];
+
+    fetch(url, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            "X-CSRFToken": csrfToken
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(res => {
+        if (!res.ok) {
+            return res.json().then(errData => {
+                let err = new Error(errData.error || `HTTP error! status: ${res.status}`);
+                err.data = errData;
+                throw err;
+            });
+        }
+        return res.json();
+    })
+    .then(data => {
+        responseMessageDiv.textContent = data.not_found && data.not_found.length
+            ? `${data.message} Not found: ${data.not_found.join(', ')}.`
+            : data.message;
+        responseMessageDiv.style.color = 'var(--success-text)';
+        input.value = ""; // Clear user search input on success
+    })
+    .catch(err => {
+        console.error("Error adding to whitelist:", err);
+        responseMessageDiv.textContent = err.message || "Error: Failed to share recipe.";
+        responseMessageDiv.style.color = 'var(--danger-text)';
+    })
+    .finally(() => {
+        whitelistButton.disabled = false; // Re-enable button
+        whitelistButton.innerHTML = 'Add to Whitelist';
+    });
+}
+
+// --- Setup (runs once, when the module is first imported) ---
+function init() {
+    const shareRecipeSelect = document.getElementById('share-recipe');
+    const input = document.getElementById("user-search");
+    const suggestions = document.getElementById("suggestions");
+    const responseMessageDiv = document.getElementById('response-message');
+    const whitelistButton = document.getElementById("add-to-whitelist-btn");
+
+    if (shareRecipeSelect) {
+        shareRecipeSelect.addEventListener('change', function() {
+            displaySharePreview(this.value);
+            clearResponseMessage(responseMessageDiv); // Clear message on recipe change
+        });
+    }
+    if (input) {
+        input.addEventListener('input', () => clearResponseMessage(responseMessageDiv)); // Clear message on user typing
+    }
+    if (input && suggestions) {
+        setupUserSearch(input, suggestions);
+    }
+    if (whitelistButton && input && responseMessageDiv) {
+        whitelistButton.addEventListener("click", () => shareWithUser(whitelistButton, input, responseMessageDiv));
+    }
+
+    // Keep the preview in sync when recipes are added, edited or deleted
+    document.addEventListener('recipes:changed', checkShareDropdown);
+    checkShareDropdown();
+}
+
+init();
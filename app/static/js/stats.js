@@ -0,0 +1,378 @@
+// static/js/stats.js
+// "Recipe Stats" tab: summary cards and charts. Loaded (together with Chart.js) when the tab is first opened.
+import { getPageData, loadScript } from '@app/common';
+
+const CHART_JS_URL = 'https://cdn.jsdelivr.net/npm/chart.js';
+
+// Chart instances and the time range each toggleable chart is showing
+let topRecipesChart = null;
+let frequencyChart = null;
+let topRatedChart = null;
+const chartStates = {
+    'top-recipes': 'all-time',
+    'frequency': 'monthly',
+    'top-rated': 'all-time'
+};
+
+// Stats come from /api/stats; the URL carries the user's data version, so the
+// browser's HTTP cache (ETag + stale-while-revalidate) answers repeat fetches.
+let statsPromise = null;
+function getStats() {
+    if (statsPromise === null) {
+        statsPromise = fetch(getPageData().stats_url)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                return response.json();
+            })
+            .catch(error => {
+                console.error("Error fetching stats:", error);
+                statsPromise = null; // Try again next time the tab is opened
+                return {};
+            });
+    }
+    return statsPromise;
+}
+
+// Toggle a chart between its two time ranges (called by the buttons with data-chart-toggle)
+async function toggleChart(chartType, button) {
+    const stats = await getStats();
+    const state = chartStates[chartType];
+    const newState = state === 'all-time' ? 'this-month' : 'all-time';
+    
+    if (chartType === 'frequency') {
+        if (state === 'weekly') {
+            document.getElementById('frequency-title').textContent = 'Monthly Cooking Frequency';
+        } else {
+            document.getElementById('frequency-title').textContent = 'This Week\'s Cooking Frequency';
+        }
+        
+        chartStates[chartType] = state === 'monthly' ? 'weekly' : 'monthly';    
+    } else {
+        chartStates[chartType] = newState;
+    }
+
+    // Update button text
+    if (button) {
+        const toggleText = chartType === 'frequency' ? 
+            (chartStates[chartType] === 'monthly' ? 'Show This Week' : 'Show Monthly View') :
+            (chartStates[chartType] === 'all-time' ? 'Show This Month' : 'Show All Time');
+        button.innerHTML = `<i class="fas fa-exchange-alt"></i> ${toggleText}`;
+    }
+
+    // Update charts
+    await loadScript(CHART_JS_URL); // Usually already loaded by updateStats()
+    if (chartType === 'top-recipes') {
+        const data = chartStates[chartType] === 'all-time' ? 
+            stats.top_recipes_data : 
+            stats.top_recipes_this_month_data;
+        updateTopRecipesChart(data);
+    } else if (chartType === 'frequency') {
+        if (chartStates[chartType] === 'monthly') {
+            updateMonthlyFrequencyChart(stats.monthly_frequency_data);
+        } else {
+            updateWeeklyFrequencyChart(stats.weekly_frequency_data);
+        }
+    } else if (chartType === 'top-rated') {
+        const data = chartStates[chartType] === 'all-time' ? 
+            stats.top_rated_data : 
+            stats.top_rated_this_month_data;
+        updateTopRatedChart(data);
+    }
+}
+
+function updateSummary(stats) {
+    const totalSessionsEl = document.getElementById('total-sessions');
+    const mostFrequentRecipeEl = document.getElementById('most-frequent-recipe');
+    const mostFrequentCountEl = document.getElementById('most-frequent-count');
+    const totalTimeLoggedEl = document.getElementById('total-time-logged');
+    const averageRatingEl = document.getElementById('average-rating');
+
+    if (totalSessionsEl) totalSessionsEl.textContent = stats.total_sessions || 0;
+
+    if (mostFrequentRecipeEl) {
+        if (stats.most_frequent_recipe && stats.most_frequent_recipe.name && stats.most_frequent_recipe.name !== '-' && stats.most_frequent_recipe.count > 0) {
+            mostFrequentRecipeEl.textContent = stats.most_frequent_recipe.name;
+            if (mostFrequentCountEl) mostFrequentCountEl.textContent = `(${stats.most_frequent_recipe.count} logs)`;
+        } else {
+            mostFrequentRecipeEl.textContent = '-';
+            if (mostFrequentCountEl) mostFrequentCountEl.textContent = '';
+        }
+    }
+
+    if (totalTimeLoggedEl) {
+        const totalSeconds = stats.total_time_logged_seconds || 0;
+        const hours = Math.floor(totalSeconds / 3600);
+        const minutes = Math.floor((totalSeconds % 3600) / 60);
+        totalTimeLoggedEl.textContent = `${hours}h ${minutes}m`;
+    }
+
+    if (averageRatingEl) {
+        if (stats.average_rating && stats.average_rating > 0) {
+            averageRatingEl.textContent = stats.average_rating.toFixed(1) + ' ★';
+        } else {
+            averageRatingEl.textContent = 'N/A';
+        }
+    }
+}
+
+// Entry point used by the bootstrap whenever the stats tab is opened
+export async function updateStats() {
+    const stats = await getStats();
+    updateSummary(stats); // Text first, so it shows even while Chart.js is still downloading
+
+    try {
+        await loadScript(CHART_JS_URL);
+    } catch (error) {
+        console.error("Error loading Chart.js:", error);
+        return;
+    }
+
+    // Redraw every chart in the range it is currently toggled to
+    if (document.getElementById('top-recipes-chart') && stats.top_recipes_data) {
+        updateTopRecipesChart(chartStates['top-recipes'] === 'all-time' ? stats.top_recipes_data : stats.top_recipes_this_month_data);
+    }
+    if (document.getElementById('top-rated-chart') && stats.top_rated_data) {
+        updateTopRatedChart(chartStates['top-rated'] === 'all-time' ? stats.top_rated_data : stats.top_rated_this_month_data);
+    }
+    if (document.getElementById('frequency-chart') && stats.monthly_frequency_data) {
+        if (chartStates['frequency'] === 'monthly') {
+            updateMonthlyFrequencyChart(stats.monthly_frequency_data);
+        } else {
+            updateWeeklyFrequencyChart(stats.weekly_frequency_data);
+        }
+    }
+}
+
+
+// --- Chart Update Functions --- 
+function updateTopRecipesChart(topRecipesData) {
+    const ctx = document.getElementById('top-recipes-chart')?.getContext('2d');
+    if (!ctx) return;
+
+    const labels = topRecipesData.map(item => item.name);
+    const data = topRecipesData.map(item => item.count);
+
+    const backgroundColors = ['#AEDC81', '#92C67F', '#4E944F', '#B7CEB1', '#D4E09B']; // Use first 5 theme colors
+
+    if (topRecipesChart) {
+        topRecipesChart.destroy(); // Destroy previous chart instance
+    }
+
+    topRecipesChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Number of Logs',
+                data: data,
+                backgroundColor: backgroundColors.slice(0, labels.length),
+                borderColor: backgroundColors.map(c => c + 'B3'),
+                borderWidth: 1,
+                borderRadius: 4,
+            }]
+        },
+        options: {
+            indexAxis: 'y', // Make it a horizontal bar chart
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                x: { // Note: x-axis for values in horizontal bar chart
+                    beginAtZero: true,
+                    ticks: { stepSize: 1, color: 'var(--grey)' }, // Ensure integer steps if log counts are low
+                    grid: { color: '#eee' }
+                },
+                y: { // Note: y-axis for labels
+                    ticks: { color: 'var(--grey)' },
+                    grid: { display: false }
+                }
+            },
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return ` Logs: ${context.raw || 0}`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+function updateMonthlyFrequencyChart(frequencyData) {
+    const ctx = document.getElementById('frequency-chart')?.getContext('2d');
+    if (!ctx) return;
+
+    const labels = frequencyData.map(item => item.month); // Should be YYYY-MM sorted
+    const data = frequencyData.map(item => item.count);
+
+    const barColor = '#AEDC81'; // Primary color
+
+    if (frequencyChart) {
+        frequencyChart.destroy(); // Destroy previous instance
+    }
+
+    frequencyChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Sessions Logged',
+                data: data,
+                backgroundColor: barColor,
+                borderColor: barColor + 'B3',
+                borderWidth: 1,
+                borderRadius: 4,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: { stepSize: 1, color: 'var(--grey)' }, // Integer steps
+                    grid: { color: '#eee' }
+                },
+                x: {
+                    ticks: { color: 'var(--grey)' },
+                    grid: { display: false }
+                }
+            },
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                     callbacks: {
+                        title: function(context) {
+                             // Format title e.g., "October 2023"
+                             const [year, month] = context[0].label.split('-');
+                             const date = new Date(year, month - 1); // Month is 0-indexed
+                             return date.toLocaleString('default', { month: 'long', year: 'numeric' });
+                        },
+                        label: function(context) {
+                            return ` Sessions: ${context.raw || 0}`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+function updateWeeklyFrequencyChart(weeklyData) {
+    const ctx = document.getElementById('frequency-chart')?.getContext('2d');
+    if (!ctx) return;
+
+    const labels = weeklyData.map(item => {
+        const days = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'];
+        return days[item.day - 1]; // Adjust for 1-based index from database
+    });
+    const data = weeklyData.map(item => item.count);
+
+    if (frequencyChart) {
+        frequencyChart.destroy();
+    }
+
+    frequencyChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Sessions Logged',
+                data: data,
+                backgroundColor: '#FF7B54',
+                borderColor: '#FF7B54B3',
+                borderWidth: 1,
+                borderRadius: 4,
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: { stepSize: 1, color: 'var(--grey)' },
+                    grid: { color: '#eee' }
+                },
+                x: {
+                    ticks: { color: 'var(--grey)' },
+                    grid: { display: false }
+                }
+            },
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                    callbacks: {
+                        title: function(context) {
+                            const dayIndex = context[0].label;
+                            return ` ${dayIndex}`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+function updateTopRatedChart(topRatedData) {
+    const ctx = document.getElementById('top-rated-chart')?.getContext('2d');
+    if (!ctx) return;
+
+    const labels = topRatedData.map(item => item.name);
+    const data = topRatedData.map(item => item.rating);
+
+    if (topRatedChart) {
+        topRatedChart.destroy();
+    }
+
+    const backgroundColors = ['#AEDC81', '#92C67F', '#4E944F', '#B7CEB1', '#D4E09B']; // Use first 5 theme colors
+
+    topRatedChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels,
+            datasets: [{
+                label: 'Average Rating',
+                data: data,
+                backgroundColor: backgroundColors.slice(0, labels.length),
+                borderColor: backgroundColors.map(c => c + 'B3'),
+                borderWidth: 1,
+                borderRadius: 4,
+            }]
+        },
+        options: {
+            indexAxis: 'y',
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                x: {
+                    max: 5,
+                    min: 0,
+                    ticks: { color: 'var(--grey)' },
+                    grid: { color: '#eee' }
+                },
+                y: {
+                    ticks: { color: 'var(--grey)' },
+                    grid: { display: false }
+                }
+            },
+            plugins: {
+                legend: { display: false },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return ` Rating: ${context.raw?.toFixed(1) || 0} ★`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+// --- Setup (runs once, when the module is first imported) ---
+document.querySelectorAll('[data-chart-toggle]').forEach(button => {
+    button.addEventListener('click', () => toggleChart(button.dataset.chartToggle, button));
+});
@@ -0,0 +1,84 @@
+// static/js/sync.js
+// Offline cache of the user's recipes, logs and received shares, kept current with /api/sync deltas.
+// Each sync only downloads what changed since the stored token; the server sends a full snapshot
+// when the token is too old. Falls back to null (callers fetch directly) where IndexedDB is missing.
+import { getPageData } from '@app/common';
+
+const STORES = ['recipes', 'logs', 'shares'];
+let dbPromise = null;
+let syncPromise = null;
+
+function request(req) {
+    return new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+function openDatabase() {
+    if (dbPromise === null) {
+        const userId = getPageData().user_id;
+        if (!window.indexedDB || userId === undefined) return Promise.resolve(null);
+        const req = indexedDB.open(`kitchenlog-${userId}`, 1);
+        req.onupgradeneeded = () => {
+            req.result.createObjectStore('meta');
+            STORES.forEach(name => req.result.createObjectStore(name, { keyPath: 'id' }));
+        };
+        dbPromise = request(req).catch(error => {
+            console.error("Offline cache unavailable:", error);
+            return null;
+        });
+    }
+    return dbPromise;
+}
+
+function applyChanges(db, changes) {
+    return new Promise((resolve, reject) => {
+        const tx = db.transaction(['meta', ...STORES], 'readwrite');
+        STORES.forEach(name => {
+            const store = tx.objectStore(name);
+            if (changes.full) store.clear();
+            changes[name].forEach(item => store.put(item));
+            changes.deleted[name].forEach(id => store.delete(id));
+        });
+        tx.objectStore('meta').put(changes.token, 'token');
+        tx.oncomplete = resolve;
+        tx.onerror = () => reject(tx.error);
+    });
+}
+
+// Brings the local cache up to date (or leaves it as is when offline). Concurrent callers share one request.
+export function syncNow() {
+    if (syncPromise === null) {
+        syncPromise = (async () => {
+            const db = await openDatabase();
+            if (!db) return null;
+            const token = await request(db.transaction('meta').objectStore('meta').get('token')) || 0;
+            let response;
+            try {
+                response = await fetch(`/api/sync?since=${token}`);
+            } catch (error) {
+                console.warn("Offline, using cached data:", error);
+                return token ? db : null; // Nothing cached yet
+            }
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            await applyChanges(db, await response.json());
+            return db;
+        })().finally(() => { syncPromise = null; });
+    }
+    return syncPromise;
+}
+
+// Returns every cached item of `store` ('recipes', 'logs' or 'shares'), newest first,
+// after syncing. Returns null when the cache can't be used, so callers can fetch directly.
+export async function getSynced(store) {
+    try {
+        const db = await syncNow();
+        if (!db) return null;
+        const items = await request(db.transaction(store).objectStore(store).getAll());
+        return items.sort((a, b) => b.id - a.id);
+    } catch (error) {
+        console.error(`Sync of ${store} failed:`, error);
+        return null;
+    }
+}
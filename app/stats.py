@@ -0,0 +1,153 @@
+# app/stats.py
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import String, select, type_coerce
+from . import sharding
+from .models import CookingLog, Recipe, db
+
+# Sections of the stats payload and the keys each one contributes
+STATS_SECTIONS = {
+    'summary': ('total_sessions', 'most_frequent_recipe', 'total_time_logged_seconds',
+                'total_time_logged_hours', 'average_rating'),
+    'top_recipes': ('top_recipes_data', 'top_recipes_this_month_data'),
+    'frequency': ('monthly_frequency_data', 'weekly_frequency_data'),
+    'top_rated': ('top_rated_data', 'top_rated_this_month_data'),
+}
+TOP_N = 5
+
+
+def _empty_stats():
+    return {
+        'total_sessions': 0,
+        'most_frequent_recipe': {'name': '-', 'count': 0},
+        'total_time_logged_seconds': 0,
+        'total_time_logged_hours': 0.0,
+        'average_rating': 0.0,
+        'top_recipes_data': [],
+        'monthly_frequency_data': [],
+        'top_recipes_this_month_data': [],
+        'weekly_frequency_data': [],
+        'top_rated_data': [],
+        'top_rated_this_month_data': []
+    }
+
+
+def fetch_log_facts(user_id):
+    """(recipe name, day, duration, rating) for each of the user's logs, in one round-trip.
+
+    Only the columns the stats need are selected, and the day stays an
+    ISO 'YYYY-MM-DD' string (SQLite's storage format) instead of being
+    parsed into a date per row; ISO strings compare in date order. The
+    filter is on plain columns, so ix_cooking_log_user_date serves the scan.
+
+    With sharding, a log of a recipe shared from another shard finds no
+    recipe in the join. Those names are then read by id from the recipes'
+    own shards (a query per shard), so the logs still count towards the
+    top-N lists.
+    """
+    rows = db.session.execute(
+        select(Recipe.name, type_coerce(CookingLog.date_cooked, String),
+               CookingLog.duration_seconds, CookingLog.rating, CookingLog.recipe_id)
+        .select_from(CookingLog)
+        .outerjoin(Recipe, Recipe.id == CookingLog.recipe_id)
+        .where(CookingLog.user_id == user_id)
+    ).all()
+    missing = {row[4] for row in rows if row[0] is None and row[4] is not None}
+    names = sharding.recipe_names(missing) if missing and sharding.enabled() else {}
+    return [(name if name is not None else names.get(recipe_id), day, duration, rating)
+            for name, day, duration, rating, recipe_id in rows]
+
+
+def _top_by_count(counts):
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:TOP_N]
+    return [{'name': name, 'count': count} for name, count in ranked]
+
+
+def _top_by_rating(rating_sums, rating_counts):
+    averages = {name: rating_sums[name] / rating_counts[name] for name in rating_counts}
+    ranked = sorted(averages.items(), key=lambda item: (-item[1], item[0]))[:TOP_N]
+    return [{'name': name, 'rating': float(average)} for name, average in ranked]
+
+
+def compute_stats(facts, today):
+    """Computes every stats section from `fetch_log_facts` rows in a single pass."""
+    stats = _empty_stats()
+
+    first_day_of_month = today.replace(day=1)
+    first_day_of_period = (first_day_of_month - timedelta(days=330)).replace(day=1)
+    start_of_week = today - timedelta(days=today.weekday())
+    today_key, month_start_key, period_start_key = today.isoformat(), first_day_of_month.isoformat(), first_day_of_period.isoformat()
+
+    month_counts = {}
+    for i in range(12):
+        month, year = today.month - i, today.year
+        if month <= 0:
+            month += 12
+            year -= 1
+        month_counts[f"{year:04d}-{month:02d}"] = 0
+    # ISO day -> 1 (Monday) ... 7 (Sunday) for the current week
+    week_days = {(start_of_week + timedelta(days=i)).isoformat(): i + 1 for i in range(7)}
+    weekly_counts = {day: 0 for day in range(1, 8)}
+
+    total_sessions = total_duration = rating_total = rating_count = 0
+    counts, month_recipe_counts = defaultdict(int), defaultdict(int)
+    rating_sums, rating_counts = defaultdict(int), defaultdict(int)
+    month_rating_sums, month_rating_counts = defaultdict(int), defaultdict(int)
+
+    for name, day, duration, rating in facts:
+        total_sessions += 1
+        if duration:
+            total_duration += duration
+        if rating is not None:
+            rating_total += rating
+            rating_count += 1
+
+        if period_start_key <= day <= today_key and day[:7] in month_counts:
+            month_counts[day[:7]] += 1
+        weekday = week_days.get(day)
+        if weekday:
+            weekly_counts[weekday] += 1
+
+        if name is None: # Log whose recipe row is gone; only counts towards the totals
+            continue
+        this_month = day >= month_start_key
+        counts[name] += 1
+        if this_month:
+            month_recipe_counts[name] += 1
+        if rating is not None:
+            rating_sums[name] += rating
+            rating_counts[name] += 1
+            if this_month:
+                month_rating_sums[name] += rating
+                month_rating_counts[name] += 1
+
+    stats['total_sessions'] = total_sessions
+    stats['total_time_logged_seconds'] = int(total_duration)
+    stats['total_time_logged_hours'] = round(total_duration / 3600, 2)
+    stats['average_rating'] = rating_total / rating_count if rating_count else 0.0
+
+    stats['top_recipes_data'] = _top_by_count(counts)
+    if stats['top_recipes_data']:
+        stats['most_frequent_recipe'] = dict(stats['top_recipes_data'][0])
+    stats['top_recipes_this_month_data'] = _top_by_count(month_recipe_counts)
+    stats['top_rated_data'] = _top_by_rating(rating_sums, rating_counts)
+    stats['top_rated_this_month_data'] = _top_by_rating(month_rating_sums, month_rating_counts)
+
+    stats['monthly_frequency_data'] = [{'month': m, 'count': month_counts[m]} for m in sorted(month_counts)]
+    stats['weekly_frequency_data'] = [{'day': d, 'count': weekly_counts[d]} for d in range(1, 8)]
+    return stats
+
+
+def calculate_user_stats(user_id, sections=None, today=None):
+    """Returns the user's cooking stats. `sections` limits the returned keys to
+    a subset of STATS_SECTIONS; the default is all of them."""
+    today = today or date.today()
+    try:
+        stats = compute_stats(fetch_log_facts(user_id), today)
+    except Exception as e:
+        print(f"Error calculating stats for user {user_id}: {e}")
+        stats = _empty_stats()
+    if sections is None:
+        return stats
+    return {key: stats[key] for section in STATS_SECTIONS if section in sections for key in STATS_SECTIONS[section]}
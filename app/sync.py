@@ -0,0 +1,231 @@
+# app/sync.py
+"""Delta sync for offline-capable clients.
+
+Every user has a sync_version counter. A flush that adds, edits or deletes
+any of a user's recipes, cooking logs or received shares bumps that counter
+once and stamps the changed rows with the new value; deletes leave a
+SyncTombstone carrying it. GET /api/sync?since=<token> then returns only the
+rows stamped after `token`, plus the ids deleted since, and a new token.
+
+The counter is bumped with an UPDATE on the user's row, which holds a write
+lock until the transaction commits, so a user's versions always commit in
+order and a client can never skip past a change still in flight. Bulk query
+updates/deletes skip the ORM events and are not tracked.
+"""
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import Blueprint, jsonify, request
+from flask.cli import AppGroup
+from flask_login import current_user, login_required
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.orm import attributes
+from . import db, sharding
+from .models import CookingLog, Recipe, SharedRecipe, SyncTombstone, User
+
+sync = Blueprint('sync', __name__)
+
+# Kind names used in responses and tombstones -> (model, owner column)
+SYNCED = {
+    'recipes': (Recipe, 'user_id'),
+    'logs': (CookingLog, 'user_id'),
+    'shares': (SharedRecipe, 'receiver_id'),
+}
+KIND_OF = {model: kind for kind, (model, _) in SYNCED.items()}
+
+
+# --- Stamping changes ---
+@event.listens_for(db.session, 'after_flush')
+def _stamp_changes(session, flush_context):
+    changed = {} # user_id -> {kind: {ids}}
+    removed = {}
+    log_recipe_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        kind = KIND_OF.get(type(obj))
+        if kind is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        owner_id = getattr(obj, SYNCED[kind][1])
+        target = removed if obj in session.deleted else changed
+        target.setdefault(owner_id, {}).setdefault(kind, set()).add(obj.id)
+        if kind == 'logs':
+            # Logs change their recipe's counters (see app/counters.py), so the
+            # recipe is resent too, including the one a moved log left.
+            log_recipe_ids.add(obj.recipe_id)
+            log_recipe_ids.update(attributes.get_history(obj, 'recipe_id').deleted)
+    log_recipe_ids.discard(None)
+    if not changed and not removed and not log_recipe_ids:
+        return
+
+    connection = session.connection()
+    if log_recipe_ids:
+        owners = connection.execute(select(Recipe.id, Recipe.user_id).where(Recipe.id.in_(log_recipe_ids)))
+        for recipe_id, owner_id in owners:
+            changed.setdefault(owner_id, {}).setdefault('recipes', set()).add(recipe_id)
+
+    # A fixed number of statements however many users are touched (e.g. a bulk share)
+    users = User.__table__
+    user_ids = set(changed) | set(removed)
+    connection.execute(update(users).where(users.c.id.in_(user_ids))
+                       .values(sync_version=users.c.sync_version + 1))
+    versions = dict(connection.execute(select(users.c.id, users.c.sync_version).where(users.c.id.in_(user_ids))).all())
+    stamped = session.info.setdefault('sync_stamped', set())
+    stamped.update((User, user_id) for user_id in versions)
+    for kind, (model, owner_column) in SYNCED.items():
+        ids = {object_id for user_id, kinds in changed.items() if user_id in versions
+               for object_id in kinds.get(kind, ())}
+        if not ids:
+            continue
+        table = model.__table__
+        owner_version = select(users.c.sync_version).where(users.c.id == table.c[owner_column]).scalar_subquery()
+        connection.execute(update(table).where(table.c.id.in_(ids)).values(sync_version=owner_version))
+        stamped.update((model, object_id) for object_id in ids)
+    # Users deleted in this flush have no version and need no tombstones
+    tombstones = [{'user_id': user_id, 'kind': kind, 'object_id': object_id, 'sync_version': versions[user_id],
+                   'deleted_at': datetime.now(timezone.utc)}
+                  for user_id, kinds in removed.items() if user_id in versions
+                  for kind, ids in kinds.items() for object_id in ids]
+    if tombstones:
+        connection.execute(insert(SyncTombstone.__table__), tombstones)
+
+
+@event.listens_for(db.session, 'after_flush_postexec')
+def _expire_stamped(session, flush_context):
+    # The UPDATEs bypassed the ORM, so reload sync_version of loaded objects on next access
+    for model, object_id in session.info.pop('sync_stamped', ()):
+        obj = session.identity_map.get(inspect(model).identity_key_from_primary_key((object_id,)))
+        if obj is not None:
+            session.expire(obj, ['sync_version'])
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _after_rollback(session):
+    session.info.pop('sync_stamped', None)
+
+
+# --- Reading changes ---
+def share_rows(query):
+    """Rows of a SharedRecipe query with the recipe's name and version and the sharer's picture, newest first."""
+    if sharding.enabled():
+        return sharding.share_rows_across_shards(query) # The recipes and sharers may be on other shards
+    return (query.with_entities(SharedRecipe.id, SharedRecipe.recipe_id, SharedRecipe.sharer_name,
+                                SharedRecipe.date_shared, Recipe.name.label('recipe_name'),
+                                Recipe.sync_version.label('recipe_version'),
+                                User.profile_picture_url, User.username)
+            .outerjoin(Recipe, SharedRecipe.recipe_id == Recipe.id)
+            .outerjoin(User, User.username == SharedRecipe.sharer_name)
+            .order_by(SharedRecipe.date_shared.desc())
+            .all())
+
+
+def share_dict(row):
+    """A share_rows() row shaped like an /api/shared_recipes/my item."""
+    return {
+        'id': row.id,
+        'recipe_id': row.recipe_id,
+        'sharer_name': row.sharer_name,
+        'date_shared': row.date_shared,
+        'recipe_name': row.recipe_name or 'Unknown',
+        'sharer_pfp_url': row.profile_picture_url,
+        'sharer_username_for_initial': row.username,
+    }
+
+
+def share_dicts(query):
+    """Shared-recipe rows shaped like /api/shared_recipes/my items."""
+    return [share_dict(row) for row in share_rows(query)]
+
+
+def share_list_version(receiver_id):
+    """Aggregates that change whenever the receiver's share_rows() list does, without loading the list.
+
+    The share count and newest share version follow shares coming and going.
+    Recipe versions only grow, so their sum follows any shared recipe's
+    rename. The sharers' pictures are compared as they are.
+    """
+    if sharding.enabled():
+        return sharding.share_list_version_across_shards(receiver_id)
+    return tuple(db.session.query(func.count(SharedRecipe.id), func.max(SharedRecipe.sync_version),
+                                  func.sum(Recipe.sync_version),
+                                  func.group_concat(User.profile_picture_url.distinct()))
+                 .select_from(SharedRecipe)
+                 .outerjoin(Recipe, SharedRecipe.recipe_id == Recipe.id)
+                 .outerjoin(User, User.username == SharedRecipe.sharer_name)
+                 .filter(SharedRecipe.receiver_id == receiver_id)
+                 .one())
+
+
+def changes_since(user, since):
+    """Everything a client holding token `since` needs to catch up with `user`'s data.
+
+    Returns a full snapshot instead of a delta when the token is 0, unknown
+    (ahead of the server) or older than the pruned tombstones.
+    """
+    token = user.sync_version
+    full = since <= 0 or since > token or since < user.sync_floor
+    recipes = Recipe.query.filter(Recipe.user_id == user.id)
+    logs = CookingLog.query.filter(CookingLog.user_id == user.id)
+    shares = SharedRecipe.query.filter(SharedRecipe.receiver_id == user.id)
+    deleted = {kind: [] for kind in SYNCED}
+    if not full:
+        recipes = recipes.filter(Recipe.sync_version > since, Recipe.sync_version <= token)
+        logs = logs.filter(CookingLog.sync_version > since, CookingLog.sync_version <= token)
+        shares = shares.filter(SharedRecipe.sync_version > since, SharedRecipe.sync_version <= token)
+        tombstones = (db.session.query(SyncTombstone.kind, SyncTombstone.object_id)
+                      .filter(SyncTombstone.user_id == user.id, SyncTombstone.sync_version > since,
+                              SyncTombstone.sync_version <= token)
+                      .order_by(SyncTombstone.id))
+        for kind, object_id in tombstones:
+            deleted[kind].append(object_id)
+    return {
+        'token': token,
+        'full': full,
+        'recipes': [recipe.to_dict() for recipe in recipes.order_by(Recipe.id.desc())],
+        'logs': [log.to_dict() for log in logs.order_by(CookingLog.id.desc())],
+        'shares': share_dicts(shares),
+        'deleted': deleted,
+    }
+
+
+@sync.route('', methods=['GET'])
+@login_required
+def get_changes():
+    since = request.args.get('since', '0')
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({"error": "Invalid sync token"}), 400
+    try:
+        return jsonify(changes_since(current_user, since)), 200
+    except Exception as e:
+        print(f"Error computing sync changes for user {current_user.id}: {e}")
+        return jsonify({"error": "Failed to fetch changes"}), 500
+
+
+def init_app(app):
+    app.cli.add_command(sync_cli)
+
+
+# --- CLI: flask sync ... ---
+sync_cli = AppGroup('sync', help='Maintain delta sync state.')
+
+
+@sync_cli.command('prune')
+@click.option('--days', default=90, show_default=True, help='Drop tombstones older than this many days.')
+def prune_command(days):
+    """Delete old tombstones. Clients that last synced before them get a full snapshot."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    pruned = users = 0
+    for _ in sharding.each_shard():
+        floors = db.session.execute(select(SyncTombstone.user_id, func.max(SyncTombstone.sync_version))
+                                    .where(SyncTombstone.deleted_at < cutoff)
+                                    .group_by(SyncTombstone.user_id)).all()
+        for user_id, floor in floors:
+            db.session.execute(update(User).where(User.id == user_id, User.sync_floor < floor)
+                               .values(sync_floor=floor))
+            pruned += db.session.execute(delete(SyncTombstone).where(SyncTombstone.user_id == user_id,
+                                                                     SyncTombstone.sync_version <= floor)).rowcount
+        db.session.commit()
+        users += len(floors)
+    click.echo(f"Pruned {pruned} tombstone(s) for {users} user(s).")
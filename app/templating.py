@@ -0,0 +1,36 @@
+# app/templating.py
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+BYTECODE_CACHE_PATTERN = 'kitchenlog_%s.cache'
+
+
+def preload_templates(app):
+    """Compiles every HTML template into the environment's in-memory cache.
+
+    Returns the number of templates loaded. With a bytecode cache configured,
+    only the first worker after a deploy actually compiles; the others load
+    the cached bytecode written by that worker.
+    """
+    env = app.jinja_env
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    # Must run after any init_app that adds Jinja extensions (fragment_cache),
+    # since templates are compiled against the environment as configured here.
+    if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+        cache_dir = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR') or \
+            os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        # Entries are keyed by template name and checked against a checksum of
+        # the source, so edited templates are recompiled rather than served stale.
+        # Writes are atomic, so every worker on the host can share the directory.
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir, BYTECODE_CACHE_PATTERN)
+
+    if app.config.get('TEMPLATE_PRELOAD'):
+        preload_templates(app)
@@ -0,0 +1,153 @@
+# app/transactions.py
+"""Per-request transactions that survive transient lock contention.
+
+A route wrapped in @transactional() is one unit of work. The route only
+flushes; the decorator commits once the route returns a success (or
+redirect) response, and rolls back on an error status. Sessions opened on
+other shards are committed just before db.session (sharding.user_session).
+Writes handed to write_queue.submit() are committed by it instead, so
+routes do that as their last write. If SQLite reports "database is locked"
+anywhere in the route or its commit, the whole request is rolled back and
+run again after a jittered, bounded backoff (DB_BUSY_RETRIES,
+DB_BUSY_RETRY_BASE_MS, DB_BUSY_RETRY_MAX_MS).
+
+Routes keep their own try/except blocks. Lock errors are noticed by an
+engine-level handle_error listener, so the retry happens even when the
+route has already caught the error and built its 500 response. Before a
+retry, the failed attempt's flash messages are dropped and uploaded files
+are rewound, so the route sees the request as it arrived. Only decorate
+routes whose side effects are all in the database.
+
+Contention counts are kept per process in app.extensions['db_contention'],
+and logged at most every DB_CONTENTION_LOG_SECONDS while there is contention.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import db, sharding
+
+
+def is_busy_error(error):
+    """True for SQLite's "database is locked" errors, which succeed when retried later."""
+    orig = getattr(error, 'orig', error)
+    return isinstance(orig, sqlite3.OperationalError) and 'locked' in str(orig)
+
+
+def backoff_delay(attempt, base, cap=None):
+    """Exponential backoff for retry `attempt` (from 0), with jitter so clients don't retry in lockstep."""
+    delay = base * (2 ** attempt)
+    if cap is not None:
+        delay = min(cap, delay)
+    return delay * random.uniform(0.5, 1.0)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _note_busy_error(context):
+    if has_request_context() and is_busy_error(context.original_exception):
+        g.db_busy = True
+
+
+class ContentionStats:
+    """Counts lock contention seen by @transactional routes in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {'busy_requests': 0, 'retries': 0, 'gave_up': 0, 'wait_seconds': 0.0}
+        self.last_logged = None
+
+    def add(self, **amounts):
+        with self.lock:
+            for name, amount in amounts.items():
+                self.counts[name] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def log(self, logger, interval):
+        """Logs the counts, unless they were logged less than `interval` seconds ago."""
+        with self.lock:
+            now = time.monotonic()
+            if self.last_logged is not None and now - self.last_logged < interval:
+                return
+            self.last_logged = now
+            counts = dict(self.counts)
+        logger.warning("Database lock contention in this process so far: %d busy requests, %d retries "
+                       "(%.1fs waiting), %d gave up", counts['busy_requests'], counts['retries'],
+                       counts['wait_seconds'], counts['gave_up'])
+
+
+def _reset_request_for_retry(flashes):
+    if flashes:
+        session['_flashes'] = flashes
+    else:
+        session.pop('_flashes', None)
+    for upload in request.files.values():
+        if upload.stream.seekable():
+            upload.stream.seek(0)
+
+
+def _finish(response):
+    """Commits the request's sessions for a success or redirect response, rolls them back otherwise."""
+    if response.status_code < 400:
+        sharding.commit_shard_sessions() # First, so a failed commit of db.session can simply be retried
+        db.session.commit()
+    else:
+        db.session.rollback()
+        sharding.rollback_shard_sessions()
+
+
+def transactional(retry=True):
+    """Runs the decorated view as one transaction and commits it, retrying while the database is locked."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            retries = config.get('DB_BUSY_RETRIES', 3) if retry else 0
+            base = config.get('DB_BUSY_RETRY_BASE_MS', 25) / 1000
+            cap = config.get('DB_BUSY_RETRY_MAX_MS', 500) / 1000
+            stats = current_app.extensions['db_contention']
+            flashes = list(session.get('_flashes', []))
+            for attempt in range(retries + 1):
+                g.db_busy = False
+                try:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if not g.db_busy:
+                        _finish(response)
+                except Exception as e:
+                    if not is_busy_error(e):
+                        db.session.rollback()
+                        sharding.rollback_shard_sessions()
+                        raise
+                    response, g.db_busy = e, True
+                if not g.db_busy:
+                    if attempt:
+                        stats.add(busy_requests=1)
+                        stats.log(current_app.logger, config.get('DB_CONTENTION_LOG_SECONDS', 300))
+                    return response
+                db.session.rollback() # The view may have caught the error without rolling back
+                sharding.rollback_shard_sessions()
+                if attempt == retries:
+                    break
+                delay = backoff_delay(attempt, base, cap)
+                stats.add(retries=1, wait_seconds=delay)
+                time.sleep(delay)
+                _reset_request_for_retry(flashes)
+            stats.add(busy_requests=1, gave_up=1)
+            stats.log(current_app.logger, config.get('DB_CONTENTION_LOG_SECONDS', 300))
+            print(f"Error: database still locked after {retries} retries for {request.endpoint}")
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    app.extensions['db_contention'] = ContentionStats()
@@ -0,0 +1,45 @@
+# app/versioning.py
+"""Per-user data version counters.
+
+Every flush that adds, changes or deletes a user's recipes or cooking logs
+increments the matching counter on that user, in the same transaction.
+Cache keys and ETags built from these counters change exactly when the data
+behind them does, so nothing ever has to be invalidated explicitly.
+"""
+from sqlalchemy import event
+from . import db
+from .models import CookingLog, Recipe, User
+
+# Model -> (relationship to the owning user, User counter column)
+VERSIONED_MODELS = {
+    CookingLog: ('cook', 'logs_version'),
+    Recipe: ('author', 'recipes_version'),
+}
+
+
+def _owner(session, obj, relationship):
+    owner = getattr(obj, relationship, None)
+    if owner is None and obj.user_id is not None:
+        owner = session.get(User, obj.user_id)
+    return owner
+
+
+@event.listens_for(db.session, 'before_flush')
+def _bump_data_versions(session, flush_context, instances):
+    changed = set()
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            versioned = VERSIONED_MODELS.get(type(obj))
+            if versioned is None:
+                continue
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            relationship, counter = versioned
+            owner = _owner(session, obj, relationship)
+            if owner is None or owner in session.new:
+                continue # A brand-new user starts at version 0 anyway
+            changed.add((owner, counter))
+
+    for owner, counter in changed:
+        # SQL-side increment so concurrent writers never lose a bump
+        setattr(owner, counter, getattr(User, counter) + 1)
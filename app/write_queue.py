@@ -0,0 +1,191 @@
+# app/write_queue.py
+"""Group commit for small, independent writes from concurrent requests.
+
+SQLite lets one connection write at a time, so under bursty traffic every
+request's own BEGIN/COMMIT queues on the lock, and the ones that wait longer
+than the busy timeout fail with "database is locked". With
+WRITE_COALESCE_ENABLED, routes hand their write to `submit()` instead of
+committing it themselves. One writer thread per process takes the writes
+that arrived within WRITE_COALESCE_WINDOW_MS (at most
+WRITE_COALESCE_MAX_BATCH) and applies them in a single transaction. Each
+write runs inside its own SAVEPOINT, so a failing write only fails its own
+request. A burst of requests then shares one lock acquisition and one
+fsync instead of queueing for one each.
+
+If another process holds the lock, the batch is rolled back and retried
+with jittered exponential backoff. Once the batch commits, every `submit()`
+call returns its own write's result or raises its own error. A request
+waits at most WRITE_COALESCE_TIMEOUT_SECONDS (by default the batch's whole
+retry budget) and then gets a 503. Its write is dropped if the writer
+hasn't started it yet, so a stalled or dead writer doesn't hang every
+request thread.
+
+Writes run on the writer thread with that thread's session. They take ids
+and plain values, not request objects like current_user, and return plain
+data. When coalescing is disabled (the default), `submit()` runs the write
+in the request's session and commits it, so routes behave the same either
+way.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from flask import current_app, g
+from sqlalchemy import text
+from werkzeug.exceptions import ServiceUnavailable
+from . import db
+from .transactions import backoff_delay, is_busy_error
+
+
+class WriteTimeout(ServiceUnavailable):
+    """The writer thread didn't get to a write in time. Answered with a 503 unless a route catches it."""
+
+
+class WriteQueue:
+    """Collects writes from request threads and commits them in batches on one writer thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pending = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+        self.stats = {'batches': 0, 'writes': 0, 'retries': 0}
+
+    def submit(self, func, *args, **kwargs):
+        """Queues `func(*args, **kwargs)` and blocks until its batch commits.
+
+        Returns (result, jobs_enqueued) and raises what the write raised.
+        """
+        future = Future()
+        self.pending.put((func, args, kwargs, future, g.get('shard'))) # Sharded: commit on the caller's shard
+        self._start_writer()
+        try:
+            return future.result(timeout=self.timeout())
+        except FutureTimeoutError:
+            started = not future.cancel() # A cancelled write is skipped by the writer
+            print(f"Error: write {getattr(func, '__name__', func)} timed out in the write queue"
+                  f"{' (it may still commit)' if started else ''}")
+            raise WriteTimeout("The database is busy; please try again.")
+
+    def timeout(self):
+        """Seconds submit() waits: WRITE_COALESCE_TIMEOUT_SECONDS, or a batch's whole retry budget."""
+        config = self.app.config
+        if config.get('WRITE_COALESCE_TIMEOUT_SECONDS'):
+            return config['WRITE_COALESCE_TIMEOUT_SECONDS']
+        retries = config.get('WRITE_COALESCE_RETRIES', 8)
+        base = config.get('WRITE_COALESCE_RETRY_BASE_MS', 10) / 1000
+        busy_timeout = config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).get('connect_args', {}).get('timeout', 5.0)
+        # Gathering the batch, then each attempt may wait out SQLite's busy timeout and back off
+        return config.get('WRITE_COALESCE_WINDOW_MS', 5) / 1000 + \
+            (retries + 1) * busy_timeout + sum(base * 2 ** attempt for attempt in range(retries))
+
+    def _start_writer(self):
+        if self.writer is not None:
+            return
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self.writer.start()
+
+    def _next_batch(self):
+        batch = [self.pending.get()]
+        window = self.app.config.get('WRITE_COALESCE_WINDOW_MS', 5) / 1000
+        max_batch = self.app.config.get('WRITE_COALESCE_MAX_BATCH', 50)
+        deadline = time.monotonic() + window
+        while len(batch) < max_batch:
+            try:
+                batch.append(self.pending.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            by_shard = {}
+            for write in self._next_batch():
+                if write[3].set_running_or_notify_cancel(): # False once its request timed out
+                    by_shard.setdefault(write[-1], []).append(write[:-1])
+            for shard, batch in by_shard.items(): # One transaction per database file
+                with self.app.app_context():
+                    g.shard = shard
+                    try:
+                        self.apply_batch(batch)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Error in write queue: {e}")
+                        for *_, future in batch:
+                            if not future.done():
+                                future.set_exception(e)
+                    finally:
+                        db.session.remove()
+
+    def apply_batch(self, batch):
+        """Commits the writes in one transaction, retrying it while the database is locked."""
+        retries = self.app.config.get('WRITE_COALESCE_RETRIES', 8)
+        base = self.app.config.get('WRITE_COALESCE_RETRY_BASE_MS', 10) / 1000
+        for attempt in range(retries + 1):
+            try:
+                outcomes = self._commit_batch(batch)
+                break
+            except Exception as e:
+                db.session.rollback()
+                if not is_busy_error(e) or attempt == retries:
+                    print(f"Error committing a batch of {len(batch)} writes: {e}")
+                    for *_, future in batch:
+                        future.set_exception(e)
+                    return
+                self.stats['retries'] += 1
+                time.sleep(backoff_delay(attempt, base))
+
+        jobs_enqueued = g.pop('jobs_enqueued', False) # Set by app.jobs when the commit added jobs
+        for (*_, future), (result, error) in zip(batch, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result((result, jobs_enqueued))
+        self.stats['batches'] += 1
+        self.stats['writes'] += len(batch)
+
+    def _commit_batch(self, batch):
+        if db.engine.dialect.name == 'sqlite':
+            # Take the write lock before running anything, so a busy database fails here and
+            # not halfway through the batch. pysqlite doesn't open a transaction for a
+            # leading SAVEPOINT, so without this each write would commit on its own.
+            db.session.execute(text('BEGIN IMMEDIATE'))
+        outcomes = []
+        for func, args, kwargs, _ in batch:
+            jobs_enqueued = db.session.info.get('jobs_enqueued', False)
+            try:
+                with db.session.begin_nested():
+                    outcomes.append((func(*args, **kwargs), None))
+            except Exception as e:
+                # The savepoint took any jobs this write enqueued with it
+                db.session.info['jobs_enqueued'] = jobs_enqueued
+                if is_busy_error(e):
+                    raise
+                print(f"Error in coalesced write {getattr(func, '__name__', func)}: {e}")
+                outcomes.append((None, e))
+        db.session.commit()
+        return outcomes
+
+
+def submit(func, *args, **kwargs):
+    """Runs the write `func(*args, **kwargs)`, commits it and returns what it returned.
+
+    With WRITE_COALESCE_ENABLED the write is batched with other requests' writes on
+    the writer thread (see the module docstring for what `func` may use).
+    """
+    if not current_app.config.get('WRITE_COALESCE_ENABLED'):
+        result = func(*args, **kwargs)
+        db.session.commit()
+        return result
+    result, jobs_enqueued = current_app.extensions['write_queue'].submit(func, *args, **kwargs)
+    if jobs_enqueued:
+        g.jobs_enqueued = True # So this request's after_request runs or wakes the job workers
+    db.session.expire_all() # Loaded rows may have been changed by the batch
+    return result
+
+
+def init_app(app):
+    app.extensions['write_queue'] = WriteQueue(app) # The writer thread starts on first use
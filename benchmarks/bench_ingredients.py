@@ -0,0 +1,73 @@
+# benchmarks/bench_ingredients.py
+"""Measures Recipe.ingredients parsing during bulk serialization, with and without the parse cache.
+
+    python benchmarks/bench_ingredients.py --recipes 2000 --reads 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import Recipe, User, parse_ingredients_json  # noqa: E402
+from config import TestConfig  # noqa: E402
+
+INGREDIENTS = ['2 cups flour', '3 eggs', '1 cup milk', 'Butter', 'Pinch of salt',
+               'Maple syrup', 'Fresh blueberries', '1 tsp baking powder']
+
+
+# The property as it was before the parse cache: parse on every read
+UNCACHED_PROPERTY = property(lambda recipe: parse_ingredients_json(recipe.ingredients_json),
+                             Recipe.ingredients.fset)
+
+
+def time_serialization(recipes, reads):
+    """Serializes every recipe, reading ingredients `reads` times in all as a template would."""
+    start = time.perf_counter()
+    for recipe in recipes:
+        recipe.__dict__.pop('_ingredients_cache', None) # Each pass starts cold
+        for _ in range(reads - 1):
+            recipe.ingredients
+        recipe.to_dict()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--reads', type=int, default=3,
+                        help='Ingredient reads per recipe (templates read it several times).')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Recipe(name=f'Recipe {i}', category='Dinner', time=30, ingredients=INGREDIENTS,
+                                  instructions='Cook.', date='2024-05-10', user_id=user.id)
+                           for i in range(args.recipes))
+        db.session.commit()
+        recipes = Recipe.query.all()
+        for recipe in recipes:
+            recipe.author # Load once so only ingredient handling differs between runs
+
+        cached = min(time_serialization(recipes, args.reads) for _ in range(args.rounds))
+        cached_property, Recipe.ingredients = Recipe.ingredients, UNCACHED_PROPERTY
+        try:
+            uncached = min(time_serialization(recipes, args.reads) for _ in range(args.rounds))
+        finally:
+            Recipe.ingredients = cached_property
+
+    print(f"{args.recipes} recipes, {args.reads} ingredient reads each (best of {args.rounds}):")
+    print(f"  parse on every read  {uncached:8.2f} ms")
+    print(f"  parse once           {cached:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_json.py
+"""Compares stdlib json and orjson on GET /api/recipes for a user with many recipes.
+
+    python benchmarks/bench_json.py --recipes 1000 --requests 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.json_provider import orjson  # noqa: E402
+from app.models import Recipe, User  # noqa: E402
+from config import TestConfig  # noqa: E402
+
+
+def build_client(recipe_count, **config):
+    class BenchConfig(TestConfig):
+        COMPRESS_ENABLED = False # Measure serialization, not gzip
+    for key, value in config.items():
+        setattr(BenchConfig, key, value)
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Recipe(name=f'Recipe {i}', category='Dinner', time=30,
+                                  ingredients_json='["Flour", "Eggs", "Milk", "Butter", "Salt"]',
+                                  instructions='Mix everything, then bake until golden. ' * 4,
+                                  date='2024-05-10', user_id=user.id)
+                           for i in range(recipe_count))
+        db.session.commit()
+    client = app.test_client()
+    client.post('/auth/login', data=dict(identifier='bench', password='password123'))
+    return app, client
+
+
+def time_requests(client, count):
+    client.get('/api/recipes') # Warm up
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get('/api/recipes')
+        response.get_data() # Consume streamed bodies too
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def time_encoding(app, count):
+    with app.app_context():
+        payload = [recipe.to_dict() for recipe in Recipe.query.all()]
+        start = time.perf_counter()
+        for _ in range(count):
+            app.json.dumps(payload, separators=(',', ':'))
+        return (time.perf_counter() - start) * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    variants = [('stdlib json', {'JSON_USE_ORJSON': False}),
+                ('stdlib json, streamed', {'JSON_USE_ORJSON': False, 'JSON_STREAM_MIN_ITEMS': 1})]
+    if orjson is not None:
+        variants += [('orjson', {'JSON_USE_ORJSON': True}),
+                     ('orjson, streamed', {'JSON_USE_ORJSON': True, 'JSON_STREAM_MIN_ITEMS': 1})]
+    else:
+        print("orjson is not installed; only the stdlib encoder is measured.")
+
+    print(f"GET /api/recipes with {args.recipes} recipes, median of {args.requests} requests:")
+    for label, config in variants:
+        config.setdefault('JSON_STREAM_MIN_ITEMS', args.recipes + 1) # Not streamed unless asked
+        app, client = build_client(args.recipes, **config)
+        request_ms = time_requests(client, args.requests)
+        encode_ms = time_encoding(app, args.requests)
+        print(f"  {label:<24} request {request_ms:7.2f} ms   encode only {encode_ms:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
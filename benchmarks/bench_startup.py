@@ -0,0 +1,58 @@
+# benchmarks/bench_startup.py
+"""Tracks how long a fresh worker takes to build (and warm) the app.
+
+Each run starts a new interpreter, so imports are measured cold:
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --json > startup.json   # for tracking over time
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from app.perf import measure_startup  # noqa: E402
+
+SCENARIOS = [
+    # (label, config class, run warm_up)
+    ('production', 'ProductionConfig', False),
+    ('production+warm_up', 'ProductionConfig', True),
+    ('development', 'DevelopmentConfig', False), # Includes Flask-Migrate/Alembic
+]
+
+
+def run(runs):
+    results = {}
+    for label, config_name, warm in SCENARIOS:
+        samples = [measure_startup(config_name, warm=warm, project_dir=PROJECT_DIR)['ready'] * 1000
+                   for _ in range(runs)]
+        results[label] = {
+            'runs': runs,
+            'median_ms': round(statistics.median(samples), 1),
+            'min_ms': round(min(samples), 1),
+            'max_ms': round(max(samples), 1),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for label, result in results.items():
+        print(f"{label:<20} median {result['median_ms']:7.1f} ms"
+              f"  (min {result['min_ms']:.1f}, max {result['max_ms']:.1f}, {result['runs']} runs)")
+
+
+if __name__ == '__main__':
+    main()
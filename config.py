@@ -4,11 +4,114 @@ import os
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 DATABASE_PATH = os.path.join(BASE_DIR, 'recipes.db') # For development
 
+
+def shard_database_uris():
+    """SQLite files for SHARD_COUNT user shards next to recipes.db (see app/sharding.py)."""
+    count = int(os.environ.get('SHARD_COUNT') or 0)
+    return [f"sqlite:///{os.path.join(BASE_DIR, f'recipes-shard{shard}.db')}" for shard in range(count)]
+
 class Config:
     """Base configuration class."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a-very-hard-to-guess-string-indeed'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER_PROFILE = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app/static/uploads/profile_pics')
+    EXPORT_BATCH_SIZE = 200 # Rows fetched per round-trip when streaming /api/export
+
+    # Background jobs (app/jobs.py). Run a dedicated worker with `flask jobs run`,
+    # or set JOBS_WORKER_THREADS to run them in-process.
+    JOBS_EAGER = False # Run jobs at the end of the request that enqueued them
+    JOBS_WORKER_THREADS = 0
+    JOBS_POLL_INTERVAL = 1.0
+    JOBS_RETRY_BASE_SECONDS = 5
+    JOBS_RETRY_MAX_SECONDS = 600
+    JOBS_LOCK_TIMEOUT_SECONDS = 300
+
+    # Response compression (app/compression.py). Static files are served from
+    # .br/.gz siblings generated by `flask assets compress`.
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500 # Bytes; smaller bodies aren't worth the CPU
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_LEVEL = 4
+    COMPRESS_MIMETYPES = ['text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+                          'application/javascript', 'application/json', 'application/x-ndjson',
+                          'image/svg+xml']
+    COMPRESS_STATIC_PRECOMPRESSED = True
+
+    # /api/stats browser caching. The page links it with a data-version query
+    # parameter, so a cached response is only reused while the data is unchanged.
+    STATS_MAX_AGE = 60
+    STATS_STALE_WHILE_REVALIDATE = 600
+
+    # Rendered-fragment cache for {% cache %} blocks (app/fragment_cache.py), per process
+    FRAGMENT_CACHE_ENABLED = True
+    FRAGMENT_CACHE_MAX_ENTRIES = 2000
+    FRAGMENT_CACHE_MAX_BYTES = 16 * 1024 * 1024 # Total size of cached HTML
+
+    # Compiled templates (app/templating.py). The bytecode cache is shared by every
+    # worker on the host; TEMPLATE_PRELOAD compiles all templates in create_app so
+    # the first requests after a restart don't pay for it.
+    TEMPLATE_BYTECODE_CACHE = True
+    TEMPLATE_BYTECODE_CACHE_DIR = os.environ.get('TEMPLATE_BYTECODE_CACHE_DIR') # Default: instance/jinja_cache
+    TEMPLATE_PRELOAD = os.environ.get('TEMPLATE_PRELOAD', '').lower() in ('1', 'true', 'yes')
+
+    # API JSON (app/json_provider.py). orjson is used when installed; API routes
+    # stream arrays longer than JSON_STREAM_MIN_ITEMS instead of building one string.
+    JSON_USE_ORJSON = True
+    JSON_STREAM_MIN_ITEMS = 500
+
+    # Recipe history stores a full snapshot every this many revisions, deltas in between
+    REVISION_SNAPSHOT_INTERVAL = 20
+
+    # Share notification stream (app/notifications.py)
+    SSE_ENABLED = None # Stream share events? None: only under gevent workers (see app/notifications.py)
+    SHARE_POLL_SECONDS = 30 # How often pages poll for shares when streams aren't offered
+    SSE_STREAM_SECONDS = 30 # Streams end after this and the browser resumes with Last-Event-ID
+    SSE_KEEPALIVE_SECONDS = 15
+    SSE_POLL_INTERVAL = 2.0 # How often one thread per process checks for shares made by other processes
+    SSE_RETRY_MS = 1000
+
+    # Routes decorated with @transactional (app/transactions.py) are rerun when
+    # SQLite reports "database is locked", after a jittered backoff
+    DB_BUSY_RETRIES = 3
+    DB_BUSY_RETRY_BASE_MS = 25
+    DB_BUSY_RETRY_MAX_MS = 500
+    DB_CONTENTION_LOG_SECONDS = 300 # Log each process's lock contention counts at most this often
+
+    # Group commit (app/write_queue.py). When enabled, small writes from concurrent
+    # requests are committed together by one writer thread per process. How long
+    # SQLite itself waits for a lock is the driver's timeout, e.g.
+    # SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 0.1}}; past that the
+    # batch is retried with backoff.
+    WRITE_COALESCE_ENABLED = os.environ.get('WRITE_COALESCE_ENABLED', '').lower() in ('1', 'true', 'yes')
+    WRITE_COALESCE_WINDOW_MS = 5 # How long the writer waits for more writes after the first one
+    WRITE_COALESCE_MAX_BATCH = 50
+    WRITE_COALESCE_RETRIES = 8
+    WRITE_COALESCE_RETRY_BASE_MS = 10
+    WRITE_COALESCE_TIMEOUT_SECONDS = None # A request's longest wait for its write; None: the retry budget
+
+    # User sharding (app/sharding.py). With shard URIs, users and their data are spread
+    # over these files and SQLALCHEMY_DATABASE_URI holds only the user directory.
+    SHARD_DATABASE_URIS = []
+
+    # Chunked data backfills (app/backfill.py, `flask backfill run`). The duty cycle is the
+    # share of wall time spent writing; the rest is left to live traffic.
+    BACKFILL_CHUNK_SIZE = 500
+    BACKFILL_DUTY_CYCLE = 0.5
+    BACKFILL_RETRIES = 5
+    BACKFILL_RETRY_BASE_MS = 50
+    UPLOAD_FOLDER_LOG_IMAGES = os.path.join(BASE_DIR, 'instance/log_images') # Not /static: served to the owner only
+
+    # SQLite maintenance (app/maintenance.py, `flask db-maintain`). Each step reclaims free
+    # pages for at most DB_MAINTENANCE_MAX_SECONDS; `flask db-maintain --schedule` repeats
+    # it as a background job.
+    DB_MAINTENANCE_INTERVAL_SECONDS = 3600
+    DB_MAINTENANCE_MAX_SECONDS = 2.0
+    DB_MAINTENANCE_VACUUM_PAGES = 256 # Pages freed per write transaction
+    DB_MAINTENANCE_ANALYSIS_LIMIT = 1000 # Rows ANALYZE samples per index
+    DB_MAINTENANCE_INTEGRITY_CHECK_HOURS = 24
+
+    # Flask-Migrate is only needed by `flask db`; see ProductionConfig
+    MIGRATE_ENABLED = True
 
     # Add other common configurations here
 
@@ -17,6 +120,16 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         f'sqlite:///{DATABASE_PATH}'
+    SHARD_DATABASE_URIS = shard_database_uris()
+    JOBS_WORKER_THREADS = 1
+    SSE_ENABLED = True # The threaded development server has a thread per open page to spare
+
+class ProductionConfig(Config):
+    """Production configuration, used by wsgi.py."""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+        f'sqlite:///{DATABASE_PATH}'
+    SHARD_DATABASE_URIS = shard_database_uris()
+    MIGRATE_ENABLED = False # Run `flask db upgrade` through run.py (.flaskenv) instead
 
 class TestConfig(Config):
     """Testing configuration."""
@@ -24,5 +137,9 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:' # Use in-memory SQLite database
     WTF_CSRF_ENABLED = False # Disable CSRF forms for testing (often simpler for unit tests)
     LOGIN_DISABLED = False # Keep login enabled unless specifically testing unauth access easily
+    JOBS_EAGER = True # Tests expect a request's side effects to be visible once it returns
+    TEMPLATE_BYTECODE_CACHE = False # Don't write compiled templates into the instance folder
+    SSE_ENABLED = True
+    SSE_POLL_INTERVAL = 0 # No poller thread on the shared in-memory connection; tests call poll_once()
     # You might also want to set a specific SECRET_KEY for tests if needed,
     # but the base one is usually fine.
\ No newline at end of file
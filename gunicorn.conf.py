@@ -0,0 +1,15 @@
+# gunicorn.conf.py
+# Read by gunicorn from the working directory, e.g. `gunicorn --preload wsgi:app`.
+# Gevent workers: an open page's share stream (app/notifications.py) then waits
+# as a greenlet instead of holding a whole worker. Patching here runs before
+# --preload imports the app, so its locks and sockets are gevent's from the start.
+try:
+    from gevent import monkey
+except ImportError: # Sync workers; pages poll for new shares instead of streaming them
+    worker_class = 'sync'
+else:
+    monkey.patch_all()
+    worker_class = 'gevent'
+    worker_connections = 1000
+
+workers = 4
@@ -0,0 +1,35 @@
+"""Incremental auto_vacuum
+
+Revision ID: 8f3b6d21c4a7
+Revises: 5a1c0e7d9b42
+Create Date: 2026-10-19 10:03:17.448210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3b6d21c4a7'
+down_revision = '5a1c0e7d9b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Lets `flask db-maintain` hand free pages back with PRAGMA incremental_vacuum.
+    # An existing database only switches modes on VACUUM, which rewrites the whole
+    # file once and can't run inside a transaction.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        op.execute('VACUUM')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.get_context().autocommit_block():
+        op.execute('PRAGMA auto_vacuum = NONE')
+        op.execute('VACUUM')
@@ -0,0 +1,29 @@
+"""Unique key for queued jobs
+
+Revision ID: e2d7a9f4c610
+Revises: b4e91c7a2d15
+Create Date: 2026-10-19 12:25:09.640177
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2d7a9f4c610'
+down_revision = 'b4e91c7a2d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest of any queued jobs that share a key; their handlers are idempotent
+    op.execute("DELETE FROM job WHERE status = 'queued' AND key IS NOT NULL AND id NOT IN "
+               "(SELECT MIN(id) FROM job WHERE status = 'queued' AND key IS NOT NULL GROUP BY key)")
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.create_index('ix_job_queued_key', ['key'], unique=True, sqlite_where=sa.text("status = 'queued'"))
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_queued_key')
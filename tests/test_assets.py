@@ -0,0 +1,82 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app
+from app.assets import build_manifest, IMMUTABLE_CACHE_CONTROL
+from config import TestConfig
+
+
+class AssetFingerprintTestCase(unittest.TestCase):
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static_dir, 'uploads'))
+        with open(os.path.join(self.static_dir, 'style.css'), 'w') as f:
+            f.write('body { color: tomato; }\n')
+        with open(os.path.join(self.static_dir, 'uploads', 'user.css'), 'w') as f:
+            f.write('/* user content */\n')
+        self.app = create_app(TestConfig)
+        self.app.static_folder = self.static_dir
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir)
+
+    def asset_url(self, filename):
+        with self.app.test_request_context():
+            return self.app.jinja_env.globals['asset_url'](filename)
+
+    def test_manifest_maps_sources_to_hashed_copies(self):
+        manifest = build_manifest(self.static_dir)
+        self.assertEqual(list(manifest), ['style.css']) # uploads/ is not fingerprinted
+        self.assertRegex(manifest['style.css'], r'^dist/style\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_dir, manifest['style.css'])))
+
+        with open(os.path.join(self.static_dir, 'style.css'), 'a') as f:
+            f.write('h1 { color: basil; }\n')
+        self.assertNotEqual(build_manifest(self.static_dir)['style.css'], manifest['style.css'])
+
+    def test_fingerprinted_file_is_served_immutable(self):
+        hashed_name = build_manifest(self.static_dir)['style.css']
+        url = self.asset_url('style.css')
+        self.assertEqual(url, f'/static/{hashed_name}')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+        response = self.client.get('/static/style.css') # Unversioned URL keeps the default caching
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+    def test_importmap_points_module_specifiers_at_hashed_files(self):
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+        for name in ('bootstrap', 'stats'):
+            with open(os.path.join(self.static_dir, 'js', f'{name}.js'), 'w') as f:
+                f.write(f'// {name}\n')
+        manifest = build_manifest(self.static_dir)
+
+        with self.app.test_request_context():
+            importmap = json.loads(self.app.jinja_env.globals['asset_importmap']())
+        self.assertEqual(importmap['imports'], {
+            '@app/bootstrap': f"/static/{manifest['js/bootstrap.js']}",
+            '@app/stats': f"/static/{manifest['js/stats.js']}",
+        })
+
+    def test_without_manifest_falls_back_to_version_query(self):
+        url = self.asset_url('style.css')
+        self.assertRegex(url, r'^/static/style\.css\?v=[0-9a-f]{12}$')
+
+        response = self.client.get(url)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+        response = self.client.get('/static/style.css?v=stale0000000') # Old hash must not be pinned
+        self.assertNotIn('immutable', response.headers.get('Cache-Control', ''))
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
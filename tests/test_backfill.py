@@ -0,0 +1,102 @@
+import base64
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from app import create_app, db
+from app.backfill import get_checkpoint, run_backfill
+from app.counters import drifted_recipe_ids
+from app.models import User, Recipe, CookingLog
+from config import TestConfig
+
+
+class BackfillTestCase(unittest.TestCase):
+    def setUp(self):
+        self.image_folder = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            BACKFILL_CHUNK_SIZE = 2
+            BACKFILL_DUTY_CYCLE = 1 # No pauses between chunks
+            UPLOAD_FOLDER_LOG_IMAGES = self.image_folder
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='filler', email='filler@example.com', password_hash='-')
+        db.session.add(self.user)
+        db.session.commit()
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe(name=f'Dish {i}', category='Dinner', time=10, ingredients_json='[]',
+                            instructions='Cook.', date='2024-05-10', author=self.user)
+            db.session.add(recipe)
+            db.session.commit()
+            db.session.add(CookingLog(user_id=self.user.id, recipe_id=recipe.id, date_cooked=date(2024, 5, i + 1)))
+            db.session.commit()
+            self.recipes.append(recipe)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.image_folder)
+
+    def test_resumes_from_its_checkpoint(self):
+        Recipe.query.update({'cook_count': 0}) # Bypasses the counter listeners
+        db.session.commit()
+        self.assertEqual(len(drifted_recipe_ids()), 5)
+
+        progress = []
+        checkpoint = run_backfill('recipe-counters', max_seconds=0,
+                                  progress=lambda checkpoint, rate, eta: progress.append(checkpoint.rows_done))
+        self.assertEqual((checkpoint.status, checkpoint.rows_done, checkpoint.total), ('paused', 2, 5))
+        self.assertEqual(checkpoint.last_id, self.recipes[1].id)
+        self.assertEqual(drifted_recipe_ids(), [recipe.id for recipe in self.recipes[2:]])
+
+        checkpoint = run_backfill('recipe-counters', progress=lambda checkpoint, rate, eta: progress.append(checkpoint.rows_done))
+        self.assertEqual((checkpoint.status, checkpoint.rows_done), ('done', 5))
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(drifted_recipe_ids(), [])
+
+        result = self.app.test_cli_runner().invoke(args=['backfill', 'status'])
+        self.assertIn('recipe-counters: done, 5/5 rows', result.output)
+        self.assertIn('log-images: not started', result.output)
+
+    def test_moves_log_images_to_files(self):
+        png = b'\x89PNG\r\n\x1a\nnot really'
+        logs = CookingLog.query.order_by(CookingLog.id).all()
+        logs[0].image_url = 'data:image/png;base64,' + base64.b64encode(png).decode()
+        logs[3].image_url = '/logs/images/already-moved.png'
+        logs[4].image_url = 'data:image/png;base64,' + base64.b64encode(png).decode()
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['backfill', 'run', 'log-images'])
+        self.assertIn('log-images: done, 2 rows.', result.output) # Only rows still holding data: URIs
+
+        db.session.expire_all()
+        filenames = [logs[i].image_url.rsplit('/', 1)[1] for i in (0, 4)]
+        self.assertEqual(logs[0].image_url, f'/logs/images/{filenames[0]}')
+        self.assertTrue(filenames[0].startswith(f'{self.user.id}-{logs[0].id}-'))
+        self.assertEqual(sorted(os.listdir(self.image_folder)), sorted(filenames)) # One file per log
+        with open(os.path.join(self.image_folder, filenames[0]), 'rb') as f:
+            self.assertEqual(f.read(), png)
+        self.assertEqual(logs[3].image_url, '/logs/images/already-moved.png')
+
+    def test_normalizes_whitelists_and_rejects_unknown_names(self):
+        self.recipes[0].whitelist = ['3', 3, 'x', 4]
+        self.recipes[1].whitelist = None
+        db.session.commit()
+        run_backfill('recipe-whitelists')
+        db.session.expire_all()
+        self.assertEqual([recipe.whitelist for recipe in self.recipes[:3]], [[3, 4], [], []])
+
+        result = self.app.test_cli_runner().invoke(args=['backfill', 'run', 'nope'])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("Unknown backfill 'nope'", result.output)
+        self.assertIsNone(get_checkpoint('nope'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
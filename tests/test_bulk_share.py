@@ -0,0 +1,88 @@
+import unittest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe, SharedRecipe
+from config import TestConfig
+
+
+class BulkShareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.teacher = User(username='teacher', email='teacher@example.com')
+        self.teacher.set_password('password123')
+        # Students never log in, so skip hashing 30 passwords
+        self.students = [User(username=f'student{i}', email=f'student{i}@example.com', password_hash='-')
+                         for i in range(30)]
+        db.session.add_all([self.teacher] + self.students)
+        db.session.commit()
+        self.recipes = [Recipe(name=name, category='Dinner', time=30, ingredients_json='[]', instructions='Cook.',
+                               date='2024-05-10', author=self.teacher) for name in ('Soup', 'Stew', 'Curry')]
+        db.session.add_all(self.recipes)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def bulk_share(self, usernames, recipe_ids):
+        return self.client.post('/api/shared_recipes/bulk', json={'usernames': usernames, 'recipe_ids': recipe_ids})
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='teacher', password='password123'))
+
+    def test_shares_every_recipe_with_every_user(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        with self.client:
+            self.login()
+            response = self.bulk_share([user.username for user in self.students[:2]] + ['nobody', 'teacher'],
+                                       recipe_ids)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.get_json()['shared'], response.get_json()['not_found']), (6, ['nobody']))
+
+            response = self.bulk_share([user.username for user in self.students[:3]], recipe_ids)
+            self.assertEqual((response.get_json()['shared'], response.get_json()['already_shared']), (3, 6))
+
+        self.assertEqual(SharedRecipe.query.count(), 9)
+        for recipe in self.recipes:
+            db.session.refresh(recipe)
+            self.assertEqual(recipe.whitelist, [user.id for user in self.students[:3]])
+
+    def test_lookups_do_not_grow_with_the_class_size(self):
+        usernames = [user.username for user in self.students]
+        statements = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0])
+        with self.client:
+            self.login()
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                response = self.bulk_share(usernames, [self.recipes[0].id])
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(response.get_json()['shared'], 30)
+        # One INSERT per share row on SQLite (batched on servers with insertmanyvalues), the rest is fixed
+        self.assertEqual(statements.count('INSERT'), 30)
+        self.assertLess(len(statements) - 30, 15)
+
+    def test_rejects_recipes_the_user_does_not_own(self):
+        other = Recipe(name='Theirs', category='Dinner', time=5, ingredients_json='[]', instructions='.',
+                       date='2024-05-10', author=self.students[0])
+        db.session.add(other)
+        db.session.commit()
+        with self.client:
+            self.login()
+            self.assertEqual(self.bulk_share(['student1'], [self.recipes[0].id, other.id]).status_code, 403)
+            self.assertEqual(self.bulk_share(['student1'], [9999]).status_code, 404)
+            self.assertEqual(self.bulk_share(['student1'], ['abc']).status_code, 400)
+            self.assertEqual(self.bulk_share([], [self.recipes[0].id]).status_code, 400)
+        self.assertEqual(SharedRecipe.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
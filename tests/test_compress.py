@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zlib
+from app import create_app, db
+from app.assets import precompress_static
+from app.models import User, Recipe
+from config import TestConfig
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='zipper', email='zipper@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        for i in range(20):
+            db.session.add(Recipe(name=f'Recipe {i}', category='Dinner', time=10,
+                                  ingredients_json='["Salt", "Pepper", "Garlic"]',
+                                  instructions='Cook it slowly and taste often. ' * 5,
+                                  date='2024-05-10', author=self.user))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='zipper', password='password123'))
+
+    def test_json_is_gzipped_when_accepted(self):
+        with self.client:
+            self.login()
+            plain = self.client.get('/api/recipes')
+            self.assertNotIn('Content-Encoding', plain.headers)
+            self.assertIn('Accept-Encoding', plain.headers['Vary'])
+
+            response = self.client.get('/api/recipes', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+            self.assertLess(len(response.data), len(plain.data))
+            self.assertEqual(json.loads(gzip.decompress(response.data)), plain.get_json())
+
+    def test_small_responses_are_not_compressed(self):
+        with self.client:
+            self.login()
+            response = self.client.get('/users/search?q=z', headers={'Accept-Encoding': 'gzip'})
+            self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_disallowed_encoding_is_not_used(self):
+        with self.client:
+            self.login()
+            response = self.client.get('/api/recipes', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+            self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streamed_response_is_compressed_incrementally(self):
+        self.login()
+        plain = self.client.get('/api/export/recipes').data
+        response = self.client.get('/api/export/recipes', headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(zlib.decompress(response.data, 31), plain)
+
+
+class PrecompressedStaticTestCase(unittest.TestCase):
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.static_dir, 'app.js'), 'w') as f:
+            f.write('console.log("hello kitchen");\n' * 100)
+        self.app = create_app(TestConfig)
+        self.app.static_folder = self.static_dir
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir)
+
+    def test_precompressed_sibling_is_served(self):
+        written = precompress_static(self.static_dir)
+        self.assertIn(os.path.join(self.static_dir, 'app.js.gz'), written)
+        self.assertEqual(precompress_static(self.static_dir), []) # Up to date, nothing rewritten
+
+        response = self.client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.mimetype, 'text/javascript')
+        self.assertIn(b'hello kitchen', gzip.decompress(response.data))
+        response.close()
+
+        response = self.client.get('/static/app.js')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        response.close()
+
+    def test_static_without_sibling_is_served_as_is(self):
+        response = self.client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response.headers)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,109 @@
+import unittest
+from datetime import date
+from sqlalchemy import event
+from app import create_app, db
+from app.models import User, Recipe, CookingLog, SharedRecipe
+from config import TestConfig
+
+
+class ConditionalGetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='revisit', email='revisit@example.com')
+        self.user.set_password('password123')
+        self.friend = User(username='sharer', email='sharer@example.com')
+        self.friend.set_password('password123')
+        db.session.add_all([self.user, self.friend])
+        db.session.commit()
+        self.recipe = Recipe(name='Soup', category='Dinner', time=30, ingredients_json='["Water"]',
+                             instructions='Simmer.', date='2024-05-10', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='revisit', password='password123'))
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, headers={'If-None-Match': f'"{etag}"'})
+
+    def test_recipes_api_answers_304_until_data_changes(self):
+        with self.client:
+            self.login()
+            first = self.client.get('/api/recipes')
+            etag = first.get_etag()[0]
+            self.assertIn('no-cache', first.headers['Cache-Control'])
+            self.assertEqual(self.revalidate('/api/recipes', etag).status_code, 304)
+            self.assertEqual(self.revalidate('/api/recipes?sort=popular', etag).status_code, 200)
+
+            db.session.add(CookingLog(user_id=self.user.id, recipe_id=self.recipe.id, date_cooked=date(2024, 5, 1)))
+            db.session.commit() # Changes times_cooked
+            changed = self.revalidate('/api/recipes', etag)
+            self.assertEqual(changed.status_code, 200)
+            self.assertEqual(changed.get_json()[0]['times_cooked'], 1)
+
+    def test_shared_recipes_tag_follows_recipe_renames(self):
+        curry = Recipe(name='Curry', category='Dinner', time=30, ingredients_json='[]',
+                       instructions='Stir.', date='2024-05-10', author=self.friend)
+        db.session.add(curry)
+        db.session.commit()
+        db.session.add(SharedRecipe(receiver_id=self.user.id, sharer_name='sharer', recipe_id=curry.id))
+        db.session.commit()
+        with self.client:
+            self.login()
+            statements = []
+            def record(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            etag = self.client.get('/api/shared_recipes/my').get_etag()[0]
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                self.assertEqual(self.revalidate('/api/shared_recipes/my', etag).status_code, 304)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+            share_queries = [statement for statement in statements if 'FROM shared_recipe' in statement]
+            self.assertEqual(len(share_queries), 1)
+            self.assertIn('count(', share_queries[0]) # Only the aggregate, not the list
+            curry.name = 'Green Curry'
+            db.session.commit()
+            renamed = self.revalidate('/api/shared_recipes/my', etag)
+            self.assertEqual(renamed.get_json()[0]['recipe_name'], 'Green Curry')
+
+    def test_detail_pages_revalidate(self):
+        log = CookingLog(user_id=self.user.id, recipe_id=self.recipe.id, date_cooked=date(2024, 5, 1), rating=3)
+        db.session.add(log)
+        db.session.commit()
+        with self.client:
+            self.login()
+            for url in (f'/view_recipe/{self.recipe.id}', f'/log/{log.id}'):
+                etag = self.client.get(url).get_etag()[0]
+                self.assertEqual(self.revalidate(url, etag).status_code, 304)
+
+            etag = self.client.get(f'/log/{log.id}').get_etag()[0]
+            log.rating = 5
+            db.session.commit()
+            self.assertEqual(self.revalidate(f'/log/{log.id}', etag).status_code, 200)
+
+    def test_pages_with_pending_flashes_are_rendered(self):
+        with self.client:
+            self.login()
+            url = f'/view_recipe/{self.recipe.id}'
+            etag = self.client.get(url).get_etag()[0]
+            with self.client.session_transaction() as session:
+                session['_flashes'] = [('info', 'Recipe saved.')]
+            response = self.revalidate(url, etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'Recipe saved.', response.data)
+            self.assertIsNone(response.get_etag()[0]) # Not reusable once the flash is shown
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+import unittest
+from datetime import date
+from app import create_app, db
+from app.counters import drifted_recipe_ids
+from app.models import User, Recipe, CookingLog
+from config import TestConfig
+
+
+class RecipeCountersTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='counter', email='counter@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.soup = self.add_recipe('Soup')
+        self.stew = self.add_recipe('Stew')
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_recipe(self, name):
+        recipe = Recipe(name=name, category='Dinner', time=30, ingredients_json='["Water"]',
+                        instructions='Simmer.', date='2024-05-10', author=self.user)
+        db.session.add(recipe)
+        db.session.commit()
+        return recipe
+
+    def log(self, recipe, day, rating=None, duration=None):
+        entry = CookingLog(user_id=self.user.id, recipe_id=recipe.id, date_cooked=day,
+                           rating=rating, duration_seconds=duration)
+        db.session.add(entry)
+        db.session.commit()
+        return entry
+
+    def counters(self, recipe):
+        return (recipe.cook_count, recipe.rating_sum, recipe.rating_count,
+                recipe.duration_sum, recipe.last_cooked)
+
+    def test_counters_follow_log_changes(self):
+        self.assertEqual(self.counters(self.soup), (0, 0, 0, 0, None))
+        first = self.log(self.soup, date(2024, 5, 1), rating=4, duration=600)
+        latest = self.log(self.soup, date(2024, 5, 3), rating=2)
+        self.assertEqual(self.counters(self.soup), (2, 6, 2, 600, date(2024, 5, 3)))
+        self.assertEqual(self.soup.average_rating, 3.0)
+
+        first.rating = 5
+        db.session.commit()
+        self.assertEqual(self.counters(self.soup), (2, 7, 2, 600, date(2024, 5, 3)))
+
+        db.session.delete(latest) # The latest log goes, so last_cooked steps back
+        db.session.commit()
+        self.assertEqual(self.counters(self.soup), (1, 5, 1, 600, date(2024, 5, 1)))
+
+        first.recipe_id = self.stew.id # Moving a log recounts both recipes
+        db.session.commit()
+        self.assertEqual(self.counters(self.soup), (0, 0, 0, 0, None))
+        self.assertEqual(self.counters(self.stew), (1, 5, 1, 600, date(2024, 5, 1)))
+        self.assertEqual(drifted_recipe_ids(), [])
+
+    def test_reconcile_repairs_bulk_changes(self):
+        self.log(self.soup, date(2024, 5, 1), rating=4)
+        CookingLog.query.filter_by(recipe_id=self.soup.id).delete() # Bypasses the ORM events
+        db.session.commit()
+        self.assertEqual(drifted_recipe_ids(), [self.soup.id])
+
+        result = self.app.test_cli_runner().invoke(args=['counters', 'reconcile', '--dry-run'])
+        self.assertIn('1 recipe(s) with drifted counters', result.output)
+        self.assertEqual(drifted_recipe_ids(), [self.soup.id])
+
+        result = self.app.test_cli_runner().invoke(args=['counters', 'reconcile'])
+        self.assertIn('Recounted 1 recipe(s)', result.output)
+        self.assertEqual(drifted_recipe_ids(), [])
+        db.session.expire_all()
+        self.assertEqual(self.counters(db.session.get(Recipe, self.soup.id)), (0, 0, 0, 0, None))
+
+    def test_recipes_api_exposes_and_sorts_by_counters(self):
+        self.log(self.soup, date(2024, 5, 1), rating=3)
+        self.log(self.soup, date(2024, 5, 2), rating=5)
+        self.log(self.stew, date(2024, 5, 9), rating=5)
+        with self.client:
+            self.client.post('/auth/login', data=dict(identifier='counter', password='password123'))
+            recipes = self.client.get('/api/recipes?sort=popular').get_json()
+            self.assertEqual([r['name'] for r in recipes], ['Soup', 'Stew'])
+            self.assertEqual((recipes[0]['times_cooked'], recipes[0]['average_rating'], recipes[0]['last_cooked']),
+                             (2, 4.0, '2024-05-02'))
+
+            recipes = self.client.get('/api/recipes?sort=top_rated').get_json()
+            self.assertEqual([r['name'] for r in recipes], ['Stew', 'Soup'])
+            recipes = self.client.get('/api/recipes?sort=last_cooked').get_json()
+            self.assertEqual([r['name'] for r in recipes], ['Stew', 'Soup'])
+            self.assertEqual(self.client.get('/api/recipes?sort=bogus').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,128 @@
+import base64
+import csv
+import io
+import json
+import unittest
+import zipfile
+from datetime import date
+from unittest import mock
+from app import create_app, db, export
+from app.models import User, Recipe, CookingLog
+from config import TestConfig
+
+
+def login_user(client, identifier, password):
+    return client.post('/auth/login', data=dict(
+        identifier=identifier,
+        password=password,
+        remember=False
+    ), follow_redirects=True)
+
+
+class ExportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app.config['EXPORT_BATCH_SIZE'] = 2 # Force several batches
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='exporter', email='exporter@example.com')
+        self.user.set_password('password123')
+        other = User(username='other', email='other@example.com')
+        other.set_password('password123')
+        db.session.add_all([self.user, other])
+        db.session.commit()
+
+        self.png_bytes = b'\x89PNG\r\n\x1a\nfake-image'
+        image_url = 'data:image/png;base64,' + base64.b64encode(self.png_bytes).decode('utf-8')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe(name=f'Recipe {i}', category='Dinner', time=10 + i,
+                            ingredients_json='["Salt", "Pepper"]', instructions='Cook.',
+                            date='2024-05-10', author=self.user,
+                            image=image_url if i == 0 else None)
+            self.recipes.append(recipe)
+        db.session.add_all(self.recipes)
+        db.session.add(Recipe(name='Not Mine', category='Dinner', time=5, ingredients_json='[]',
+                              instructions='Nope.', date='2024-05-10', author=other))
+        db.session.commit()
+        db.session.add(CookingLog(user_id=self.user.id, recipe_id=self.recipes[0].id,
+                                  date_cooked=date(2024, 5, 11), rating=5, notes='Great',
+                                  image_url=image_url))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_export_requires_login(self):
+        response = self.client.get('/api/export/recipes')
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_recipes_ndjson(self):
+        with self.client:
+            login_user(self.client, 'exporter', 'password123')
+            response = self.client.get('/api/export/recipes?format=ndjson')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            self.assertEqual([row['name'] for row in rows], [f'Recipe {i}' for i in range(5)])
+            self.assertEqual(rows[0]['ingredients'], ['Salt', 'Pepper'])
+
+    def test_export_logs_csv(self):
+        with self.client:
+            login_user(self.client, 'exporter', 'password123')
+            response = self.client.get('/api/export/logs?format=csv')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('attachment', response.headers['Content-Disposition'])
+            rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(rows[0]['recipe_name'], 'Recipe 0')
+            self.assertEqual(rows[0]['date_cooked'], '2024-05-11')
+            self.assertNotIn('image', rows[0])
+
+    def test_export_unknown_format_and_kind(self):
+        with self.client:
+            login_user(self.client, 'exporter', 'password123')
+            self.assertEqual(self.client.get('/api/export/recipes?format=xml').status_code, 400)
+            self.assertEqual(self.client.get('/api/export/passwords').status_code, 404)
+
+    def test_export_archive_contains_rows_and_images(self):
+        with self.client:
+            login_user(self.client, 'exporter', 'password123')
+            response = self.client.get('/api/export/archive.zip')
+            self.assertEqual(response.status_code, 200)
+            archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+            self.assertIsNone(archive.testzip())
+
+            recipes = [json.loads(line) for line in archive.read('recipes.ndjson').decode('utf-8').splitlines()]
+            self.assertEqual(len(recipes), 5)
+            self.assertEqual(recipes[0]['image_file'], f'images/recipe_{self.recipes[0].id}.png')
+            self.assertNotIn('image', recipes[0])
+            self.assertEqual(archive.read(recipes[0]['image_file']), self.png_bytes)
+
+            logs = [json.loads(line) for line in archive.read('logs.ndjson').decode('utf-8').splitlines()]
+            self.assertEqual(len(logs), 1)
+            self.assertEqual(archive.read(logs[0]['image_file']), self.png_bytes)
+
+    def test_archive_rows_do_not_load_images(self):
+        big_png = self.png_bytes + b'\0' * 30000
+        big_url = 'data:image/png;base64,' + base64.b64encode(big_png).decode('utf-8')
+        self.recipes[0].image = big_url
+        CookingLog.query.one().image_url = big_url
+        db.session.commit()
+        with self.client, mock.patch.object(export, '_image_extension', wraps=export._image_extension) as spy:
+            login_user(self.client, 'exporter', 'password123')
+            archive = zipfile.ZipFile(io.BytesIO(self.client.get('/api/export/archive.zip').get_data()))
+        self.assertEqual(archive.read(f'images/recipe_{self.recipes[0].id}.png'), big_png)
+        # Rows get the data: URI's header, only the image pass reads the whole image
+        seen = [len(call.args[0]) for call in spy.call_args_list if call.args[0]]
+        self.assertEqual(seen, [100, len(big_url), 100, len(big_url)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
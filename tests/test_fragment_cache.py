@@ -0,0 +1,98 @@
+import unittest
+from datetime import date
+from sqlalchemy import event
+from app import create_app, db
+from app.fragment_cache import FragmentCache
+from app.models import User, Recipe, CookingLog
+from config import TestConfig
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    def test_lru_eviction_by_entries_and_size(self):
+        cache = FragmentCache(max_entries=2, max_bytes=10)
+        cache.set('a', 'aaa')
+        cache.set('b', 'bbb')
+        self.assertEqual(cache.get('a'), 'aaa') # 'a' is now most recently used
+        cache.set('c', 'ccc')
+        self.assertIsNone(cache.get('b'))
+        cache.set('d', 'dddddddd') # Pushes the total over 10 characters
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('d'), 'dddddddd')
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 2, 3))
+        self.assertLessEqual(stats['size'], 10)
+
+
+class HomeFragmentCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.cache = self.app.extensions['fragment_cache']
+
+        self.user = User(username='cachecook', email='cachecook@example.com')
+        self.user.set_password('password123')
+        self.other = User(username='othercook', email='othercook@example.com')
+        self.other.set_password('password123')
+        db.session.add_all([self.user, self.other])
+        db.session.commit()
+        self.recipe = Recipe(name='Risotto', category='Dinner', time=40, ingredients_json='["Rice"]',
+                             instructions='Stir.', date='2024-05-01', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def versions(self, user):
+        db.session.expire_all()
+        user = db.session.get(User, user.id)
+        return user.logs_version, user.recipes_version
+
+    def test_versions_bump_only_for_the_owner(self):
+        self.assertEqual(self.versions(self.user), (0, 1))
+
+        log = CookingLog(user_id=self.user.id, recipe_id=self.recipe.id, date_cooked=date(2024, 5, 2))
+        db.session.add(log)
+        db.session.commit()
+        self.assertEqual(self.versions(self.user), (1, 1))
+
+        log.rating = 4
+        db.session.commit()
+        self.recipe.name = 'Mushroom Risotto'
+        db.session.commit()
+        self.assertEqual(self.versions(self.user), (2, 2))
+
+        db.session.delete(db.session.get(CookingLog, log.id))
+        db.session.commit()
+        self.assertEqual(self.versions(self.user), (3, 2))
+        self.assertEqual(self.versions(self.other), (0, 0))
+
+    def count_log_queries(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', listener)
+        return lambda: sum('FROM cooking_log' in statement for statement in statements)
+
+    def test_repeat_visit_is_served_from_cache(self):
+        self.client.post('/auth/login', data=dict(identifier='cachecook', password='password123'))
+        log_queries = self.count_log_queries()
+        first = self.client.get('/home')
+        second = self.client.get('/home')
+        self.assertEqual(log_queries(), 1) # Only the first render loaded the recent logs
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+        self.client.post(f'/log_cooking/{self.recipe.id}', data={'date_cooked': date.today().isoformat()})
+        response = self.client.get('/home') # New log -> new version -> fragment re-rendered
+        self.assertIn(b'Cooked <strong>Risotto</strong>', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,100 @@
+import unittest
+from app import create_app, db
+from app.ingredients import cookable_recipes, normalize_ingredient, recipes_with_ingredients
+from app.models import User, Recipe, RecipeIngredient
+from config import TestConfig
+
+
+class IngredientIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='pantry', email='pantry@example.com')
+        self.user.set_password('password123')
+        self.other = User(username='neighbour', email='neighbour@example.com')
+        self.other.set_password('password123')
+        db.session.add_all([self.user, self.other])
+        db.session.commit()
+
+        self.pancakes = self.add_recipe('Pancakes', ['Flour', 'Eggs', 'Milk', 'Butter'])
+        self.omelette = self.add_recipe('Omelette', ['eggs', 'Butter', 'Salt'])
+        self.toast = self.add_recipe('Toast', ['Bread', 'Butter'])
+        self.add_recipe('Their Omelette', ['Eggs', 'Butter'], author=self.other)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_recipe(self, name, ingredients, author=None):
+        recipe = Recipe(name=name, category='Breakfast', time=10, ingredients=ingredients,
+                        instructions='Cook.', date='2024-05-10', author=author or self.user)
+        db.session.add(recipe)
+        db.session.commit()
+        return recipe
+
+    def indexed_names(self, recipe):
+        return [row.name for row in RecipeIngredient.query.filter_by(recipe_id=recipe.id)
+                                                   .order_by(RecipeIngredient.position)]
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='pantry', password='password123'))
+
+    def test_normalize_ingredient(self):
+        self.assertEqual(normalize_ingredient('  Brown   SUGAR '), 'brown sugar')
+
+    def test_index_follows_ingredient_changes(self):
+        self.assertEqual(self.indexed_names(self.pancakes), ['flour', 'eggs', 'milk', 'butter'])
+        self.assertEqual({row.user_id for row in self.pancakes.ingredient_index}, {self.user.id})
+
+        self.pancakes.ingredients = 'Flour, Water, flour'
+        db.session.commit()
+        self.assertEqual(self.indexed_names(self.pancakes), ['flour', 'water'])
+
+        self.toast.ingredients_json = '["Rye Bread"]' # Direct writes are indexed too
+        db.session.commit()
+        self.assertEqual(self.indexed_names(self.toast), ['rye bread'])
+
+        toast_id = self.toast.id
+        db.session.delete(self.toast)
+        db.session.commit()
+        self.assertEqual(RecipeIngredient.query.filter_by(recipe_id=toast_id).count(), 0)
+
+    def test_recipes_with_ingredients_ranks_by_matches(self):
+        results = recipes_with_ingredients(self.user.id, ['EGGS', 'butter'])
+        self.assertEqual([(recipe.name, matched) for recipe, matched in results],
+                         [('Omelette', 2), ('Pancakes', 2), ('Toast', 1)])
+
+        results = recipes_with_ingredients(self.user.id, ['eggs', 'milk'], match_all=True)
+        self.assertEqual([recipe.name for recipe, _ in results], ['Pancakes'])
+
+    def test_cookable_recipes_puts_fewest_missing_first(self):
+        results = cookable_recipes(self.user.id, ['eggs', 'butter', 'salt', 'bread'])
+        self.assertEqual([(recipe.name, matched, missing) for recipe, matched, missing in results],
+                         [('Omelette', 3, []), ('Toast', 2, []), ('Pancakes', 2, ['Flour', 'Milk'])])
+
+        results = cookable_recipes(self.user.id, ['eggs', 'butter'], max_missing=1)
+        self.assertEqual([recipe.name for recipe, _, _ in results], ['Omelette', 'Toast'])
+
+    def test_search_endpoints(self):
+        with self.client:
+            self.login()
+            response = self.client.get('/api/ingredients/recipes?ingredient=Milk&ingredient=salt')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([(r['name'], r['matched']) for r in response.get_json()],
+                             [('Omelette', 1), ('Pancakes', 1)]) # Ties: newest first
+
+            response = self.client.get('/api/ingredients/cookable?have=bread&have=butter&limit=1')
+            self.assertEqual(response.get_json()[0]['name'], 'Toast')
+            self.assertEqual(response.get_json()[0]['missing'], [])
+
+            self.assertEqual(self.client.get('/api/ingredients/recipes').status_code, 400)
+            self.assertEqual(self.client.get('/api/ingredients/cookable?have=eggs&limit=0').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,162 @@
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from app import create_app, db
+from app import jobs
+from app.models import User, Recipe, CookingLog, Job
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from config import TestConfig
+
+calls = []
+
+
+@jobs.job('test_record', max_attempts=2)
+def record_job(value):
+    calls.append(value)
+
+
+@jobs.job('test_explode', max_attempts=2)
+def explode_job():
+    raise RuntimeError('boom')
+
+
+class JobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app.config['JOBS_EAGER'] = False
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        calls.clear()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_enqueue_and_run(self):
+        jobs.enqueue('test_record', value=42)
+        db.session.commit()
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(calls, [42])
+        self.assertEqual(Job.query.one().status, 'done')
+
+    def test_enqueue_is_part_of_the_transaction(self):
+        jobs.enqueue('test_record', value=1)
+        db.session.rollback()
+        self.assertEqual(Job.query.count(), 0)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_enqueue_deduplicates_queued_jobs_by_key(self):
+        first = jobs.enqueue('test_record', key='same', value=1)
+        second = jobs.enqueue('test_record', key='same', value=2)
+        db.session.commit()
+        self.assertIs(first, second)
+        self.assertEqual(Job.query.count(), 1)
+
+        jobs.run_pending()
+        jobs.enqueue('test_record', key='same', value=3) # Earlier job is done, so this one is new
+        db.session.commit()
+        self.assertEqual(Job.query.count(), 2)
+
+    def test_queued_keys_are_unique_in_the_database(self):
+        jobs.enqueue('test_record', key='same', value=1)
+        db.session.commit()
+        db.session.add(Job(name='test_record', key='same', payload={'value': 2})) # As a concurrent request would
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+        # A job that fails after its key was queued again leaves the retry to the queued one
+        jobs.enqueue('test_explode', key='explode')
+        db.session.commit()
+        claimed = jobs.claim_job('worker-a')
+        self.assertEqual(claimed.name, 'test_record')
+        jobs.run_job(claimed)
+        claimed = jobs.claim_job('worker-a')
+        jobs.enqueue('test_explode', key='explode')
+        db.session.commit()
+        jobs.run_job(claimed)
+        self.assertEqual([job.status for job in Job.query.filter_by(key='explode').order_by(Job.id)],
+                         ['failed', 'queued'])
+
+    def test_stale_job_is_released_however_often_its_key_collides(self):
+        jobs.enqueue('test_record', key='stale', value=1)
+        db.session.commit()
+        stale = jobs.claim_job('worker-gone')
+        stale.locked_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        db.session.commit()
+
+        collisions = []
+        def queue_same_key(session): # A request queueing the key again just before each of the first commits
+            if len(collisions) < 4:
+                collisions.append(1)
+                session.execute(Job.__table__.insert().values(name='test_record', key='stale', status='queued',
+                                                              payload={}, run_after=datetime.now(timezone.utc)))
+        event.listen(db.session, 'before_commit', queue_same_key)
+        try:
+            self.assertEqual(jobs._requeue_stale_jobs(), 1)
+        finally:
+            event.remove(db.session, 'before_commit', queue_same_key)
+        self.assertEqual(len(collisions), 4) # Each rolled back with its failed release
+        self.assertEqual([job.status for job in Job.query.all()], ['queued'])
+
+    def test_unknown_job_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('does_not_exist')
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        jobs.enqueue('test_explode')
+        db.session.commit()
+        self.assertEqual(jobs.run_pending(), 1)
+
+        failed = Job.query.one()
+        self.assertEqual(failed.status, 'queued')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('boom', failed.last_error)
+        self.assertGreater(failed.run_after, datetime.now(timezone.utc).replace(tzinfo=None))
+        self.assertEqual(jobs.run_pending(), 0) # Not due yet
+
+        failed.run_after = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.session.commit()
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(Job.query.one().status, 'failed')
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        jobs.enqueue('test_record', value=1)
+        db.session.commit()
+        claimed = jobs.claim_job('worker-a')
+        self.assertIsNotNone(claimed)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNone(jobs.claim_job('worker-b'))
+
+    def test_log_cooking_session_defers_streak_recalculation(self):
+        user = User(username='jobcook', email='jobcook@example.com')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.commit()
+        recipe = Recipe(name='Soup', category='Dinner', time=10, ingredients_json='[]',
+                        instructions='Boil.', date='2024-05-01', author=user)
+        db.session.add(recipe)
+        db.session.commit()
+
+        client = self.app.test_client()
+        with client:
+            client.post('/auth/login', data=dict(identifier='jobcook', password='password123'))
+            today = date.today().isoformat()
+            client.post(f'/log_cooking/{recipe.id}', data={'date_cooked': today})
+            client.post(f'/log_cooking/{recipe.id}', data={'date_cooked': today})
+
+        self.assertEqual(CookingLog.query.count(), 2)
+        queued = Job.query.filter_by(name='recalculate_streak', status='queued').all()
+        self.assertEqual(len(queued), 1) # Coalesced by idempotency key
+        self.assertIsNone(db.session.get(User, user.id).last_cooked_date)
+
+        jobs.run_pending()
+        db.session.expire_all()
+        self.assertEqual(db.session.get(User, user.id).last_cooked_date, date.today())
+        self.assertEqual(db.session.get(User, user.id).current_streak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
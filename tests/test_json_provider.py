@@ -0,0 +1,89 @@
+import json
+import unittest
+from datetime import date, datetime
+from app import create_app, db
+from app.json_provider import FastJSONProvider, orjson
+from app.models import User, Recipe, SharedRecipe
+from config import TestConfig
+
+
+class JSONProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='jason', email='jason@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='jason', password='password123'))
+
+    def add_recipes(self, count):
+        for i in range(count):
+            db.session.add(Recipe(name=f'Recipe {i}', category='Dinner', time=10,
+                                  ingredients_json='["Salt", "Pepper"]', instructions='Cook.',
+                                  date='2024-05-10', author=self.user))
+        db.session.commit()
+
+    def test_dates_are_iso_formatted(self):
+        value = {'day': date(2024, 5, 10), 'at': datetime(2024, 5, 10, 12, 30, 0, 250)}
+        expected = {'day': '2024-05-10', 'at': '2024-05-10T12:30:00.000250'}
+        self.assertEqual(json.loads(self.app.json.dumps(value)), expected)
+        self.app.json.use_orjson = False
+        self.assertEqual(json.loads(self.app.json.dumps(value)), expected)
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_output_matches_stdlib(self):
+        value = {'b': [1, 2.5, None, True], 'a': 'café', 'c': {'z': 1, 'y': 2}}
+        fast = self.app.json.dumps(value, separators=(',', ':'))
+        self.app.json.use_orjson = False
+        self.assertEqual(json.loads(fast), json.loads(self.app.json.dumps(value)))
+        self.assertTrue(fast.startswith('{"a":')) # Keys still sorted
+
+    def test_values_orjson_rejects_fall_back_to_stdlib(self):
+        provider = FastJSONProvider(self.app)
+        self.assertEqual(provider.dumps({'big': 2 ** 70}), '{"big": 1180591620717411303424}')
+        with self.assertRaises(TypeError):
+            provider.dumps({'unknown': object()})
+
+    def test_shared_recipe_date_is_serialized_by_provider(self):
+        self.add_recipes(1)
+        db.session.add(SharedRecipe(receiver_id=self.user.id, sharer_name='jason', recipe_id=1,
+                                    date_shared=datetime(2024, 5, 10, 8, 0)))
+        db.session.commit()
+        with self.client:
+            self.login()
+            response = self.client.get('/api/shared_recipes/my')
+            self.assertEqual(response.get_json()[0]['date_shared'], '2024-05-10T08:00:00')
+
+    def test_long_recipe_lists_are_streamed(self):
+        self.app.config['JSON_STREAM_MIN_ITEMS'] = 5
+        self.add_recipes(4)
+        with self.client:
+            self.login()
+            short = self.client.get('/api/recipes')
+            self.assertIn('Content-Length', short.headers)
+            self.assertEqual(len(short.get_json()), 4)
+
+        self.add_recipes(250) # More than one chunk
+        with self.client:
+            streamed = self.client.get('/api/recipes')
+            self.assertNotIn('Content-Length', streamed.headers) # Sent in chunks
+            recipes = json.loads(streamed.get_data())
+        self.assertEqual(len(recipes), 254)
+        self.assertEqual([r['id'] for r in recipes], sorted((r['id'] for r in recipes), reverse=True))
+        self.assertEqual(recipes[0]['ingredients'], ['Salt', 'Pepper'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
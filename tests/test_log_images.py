@@ -0,0 +1,97 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from datetime import date
+from app import create_app, db
+from app.backfill import run_backfill
+from app.models import User, Recipe, CookingLog
+from config import TestConfig
+
+PNG = b'\x89PNG\r\n\x1a\nfake-image'
+
+
+class LogImageFilesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.image_folder = tempfile.mkdtemp()
+
+        class Config(TestConfig):
+            UPLOAD_FOLDER_LOG_IMAGES = self.image_folder
+            BACKFILL_DUTY_CYCLE = 1
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='cook', email='cook@example.com')
+        self.user.set_password('password123')
+        other = User(username='nosy', email='nosy@example.com')
+        other.set_password('password123')
+        db.session.add_all([self.user, other])
+        db.session.commit()
+        self.recipe = Recipe(name='Pancakes', category='Breakfast', time=20, ingredients_json='[]',
+                             instructions='Flip.', date='2024-05-10', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+        self.log = CookingLog(user_id=self.user.id, recipe_id=self.recipe.id, date_cooked=date(2024, 5, 11),
+                              image_url='data:image/png;base64,' + base64.b64encode(PNG).decode())
+        db.session.add(self.log)
+        db.session.commit()
+        run_backfill('log-images')
+        self.filename = self.log.image_url.rsplit('/', 1)[1]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.image_folder)
+
+    def login(self, name):
+        self.client.get('/auth/logout')
+        self.client.post('/auth/login', data=dict(identifier=name, password='password123'))
+
+    def test_only_the_owner_gets_the_file(self):
+        self.assertEqual(self.client.get(self.log.image_url).status_code, 302) # To the login page
+        with self.client:
+            self.login('nosy')
+            self.assertEqual(self.client.get(self.log.image_url).status_code, 404)
+            self.login('cook')
+            response = self.client.get(self.log.image_url)
+            self.assertEqual((response.status_code, response.data, response.mimetype), (200, PNG, 'image/png'))
+            self.assertIn('private', response.headers['Cache-Control'])
+            response.close()
+        self.assertFalse(os.path.exists(os.path.join(self.app.static_folder, 'uploads', 'log_images', self.filename)))
+
+    def test_export_archive_includes_files(self):
+        with self.client:
+            self.login('cook')
+            archive = zipfile.ZipFile(io.BytesIO(self.client.get('/api/export/archive.zip').data))
+        self.assertEqual(archive.read(f'images/log_{self.log.id}.png'), PNG)
+
+    def test_files_are_removed_with_their_log(self):
+        path = os.path.join(self.image_folder, self.filename)
+        self.log.image_url = None
+        db.session.rollback() # Nothing committed, the file stays
+        self.assertTrue(os.path.exists(path))
+
+        self.log.image_url = None
+        db.session.commit()
+        self.assertFalse(os.path.exists(path))
+
+        self.log.image_url = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+        db.session.commit()
+        run_backfill('log-images', restart=True)
+        path = os.path.join(self.image_folder, self.log.image_url.rsplit('/', 1)[1])
+        with self.client:
+            self.login('cook')
+            self.assertEqual(self.client.delete(f'/api/recipes/{self.recipe.id}').status_code, 200)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(os.listdir(self.image_folder), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from app import create_app, db
+from app.jobs import run_pending
+from app.maintenance import enable_incremental_vacuum, incremental_vacuum, run_maintenance
+from app.models import User, Recipe, CookingLog, Job
+from config import TestConfig
+
+
+class DatabaseMaintenanceTestCase(unittest.TestCase):
+    def setUp(self):
+        # A file database: free pages and file sizes only mean something on disk
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        os.remove(self.db_path) # auto_vacuum must be set before the first table exists
+
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+            DB_MAINTENANCE_VACUUM_PAGES = 16
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        enable_incremental_vacuum(db.engine)
+        db.create_all()
+
+        user = User(username='tidy', email='tidy@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        recipe = Recipe(name='Toast', category='Breakfast', time=5, ingredients_json='[]',
+                        instructions='Toast it.', date='2024-05-10', author=user)
+        db.session.add(recipe)
+        db.session.commit()
+        for day in range(1, 31): # Log images are the bulk of most databases
+            db.session.add(CookingLog(user_id=user.id, recipe_id=recipe.id, date_cooked=date(2024, 5, day),
+                                      image_url='data:image/png;base64,' + 'A' * 20000))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def free_pages(self):
+        return db.session.execute(db.text('PRAGMA freelist_count')).scalar()
+
+    def test_reclaims_free_pages_and_refreshes_statistics(self):
+        CookingLog.query.delete()
+        db.session.commit()
+        self.assertGreater(self.free_pages(), 100)
+        size_before = os.path.getsize(self.db_path)
+
+        result = self.app.test_cli_runner().invoke(args=['db-maintain', '--integrity-check'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('database: reclaimed ', result.output)
+        self.assertIn('integrity ok', result.output)
+        self.assertEqual(self.free_pages(), 0)
+        self.assertLess(os.path.getsize(self.db_path), size_before / 4)
+        tables = db.session.execute(db.text("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")).all()
+        self.assertEqual(len(tables), 1) # ANALYZE ran
+
+    def test_one_vacuum_step_frees_the_configured_pages(self):
+        CookingLog.query.delete()
+        db.session.commit()
+        free_pages = self.free_pages()
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            self.assertTrue(incremental_vacuum(conn, 16))
+        self.assertEqual(self.free_pages(), free_pages - 16)
+
+    def test_steps_are_time_boxed(self):
+        run_maintenance(db.engine) # Creates the statistics table, which takes a free page
+        CookingLog.query.delete()
+        db.session.commit()
+        free_pages = self.free_pages()
+        report = run_maintenance(db.engine, max_seconds=0) # Analyze only, no vacuuming
+        self.assertEqual((report['free_pages_before'], report['free_pages_after'], report['reclaimed_bytes']),
+                         (free_pages, free_pages, 0))
+        self.assertNotIn('integrity', report)
+
+    def test_scheduled_job_runs_and_queues_the_next_step(self):
+        result = self.app.test_cli_runner().invoke(args=['db-maintain', '--schedule'])
+        self.assertIn('Scheduled database maintenance', result.output)
+        self.app.test_cli_runner().invoke(args=['db-maintain', '--schedule']) # Still one queued job
+        self.assertEqual(Job.query.filter_by(name='db_maintenance').count(), 1)
+
+        self.assertEqual(run_pending(), 1)
+        jobs = Job.query.filter_by(name='db_maintenance').order_by(Job.id).all()
+        self.assertEqual([job.status for job in jobs], ['done', 'queued'])
+        self.assertIsNotNone(jobs[1].payload['last_integrity_check']) # Checked on the first run
+        self.assertGreater(jobs[1].run_after, jobs[0].finished_at)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,7 +1,8 @@
 # tests/test_models.py
 import unittest
+from unittest.mock import patch
 from app import create_app, db
-from app.models import User, Recipe, CookingLog
+from app.models import User, Recipe, CookingLog, parse_ingredients_json
 from config import TestConfig
 from datetime import date, datetime, timedelta, timezone # Ensure timezone is imported
 from sqlalchemy.exc import IntegrityError
@@ -132,6 +133,28 @@ class RecipeModelCase(BaseModelCase):
         self.assertEqual(r.ingredients, ["Pepper", "Salt"])
         self.assertEqual(r.ingredients_json, '["Pepper", "Salt"]')
 
+    def test_recipe_ingredients_parsed_once(self):
+        r = Recipe(name='Cached', category='Test', time=5, ingredients_json='["Rice", "Beans"]',
+                   instructions='Test', date='2024-05-10', author=self.test_user)
+        db.session.add(r)
+        db.session.commit()
+        with patch('app.models.parse_ingredients_json', wraps=parse_ingredients_json) as parse:
+            self.assertEqual(r.ingredients, ["Rice", "Beans"])
+            r.ingredients.append("Mutated")
+            r.to_dict()
+            self.assertEqual(r.ingredients, ["Rice", "Beans"])
+            self.assertEqual(parse.call_count, 1)
+
+            r.ingredients_json = '["Corn"]' # Direct writes invalidate the cache
+            self.assertEqual(r.ingredients, ["Corn"])
+            r.ingredients = ["Peas"]
+            self.assertEqual(r.ingredients, ["Peas"])
+            db.session.commit()
+            db.session.execute(db.text("UPDATE recipe SET ingredients_json = '[\"Lentils\"]'"))
+            db.session.expire(r) # So does reloading from the database
+            self.assertEqual(r.ingredients, ["Lentils"])
+            self.assertEqual(parse.call_count, 4)
+
     def test_recipe_ingredients_setter_edge_cases(self):
         r = Recipe(name='Edge Case Ingredients', category='Test', time=5,
                    instructions='Test', date='2024-05-10', user_id=self.test_user.id)
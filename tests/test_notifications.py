@@ -0,0 +1,120 @@
+import threading
+import unittest
+from app import create_app, db
+from app.models import User, Recipe, SharedRecipe
+from config import TestConfig
+
+
+class ShareEventsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app.config['SSE_STREAM_SECONDS'] = 0 # Send what's pending, then end the stream
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.hub = self.app.extensions['share_events']
+
+        self.receiver = User(username='inbox', email='inbox@example.com')
+        self.receiver.set_password('password123')
+        self.sharer = User(username='chef', email='chef@example.com')
+        self.sharer.set_password('password123')
+        db.session.add_all([self.receiver, self.sharer])
+        db.session.commit()
+        self.recipe = Recipe(name='Curry', category='Dinner', time=30, ingredients_json='[]',
+                             instructions='Stir.', date='2024-05-10', author=self.sharer)
+        db.session.add(self.recipe)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def share(self):
+        shared = SharedRecipe(receiver_id=self.receiver.id, sharer_name='chef', recipe_id=self.recipe.id)
+        db.session.add(shared)
+        db.session.commit()
+        return shared
+
+    def stream(self, headers=None):
+        with self.client:
+            self.client.post('/auth/login', data=dict(identifier='inbox', password='password123'))
+            response = self.client.get('/api/events/shares', headers=headers or {})
+            return response, response.get_data(as_text=True)
+
+    def test_stream_resumes_after_last_event_id(self):
+        first, second = self.share(), self.share()
+        response, body = self.stream({'Last-Event-ID': str(first.sync_version)})
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertTrue(body.startswith('retry: 1000\n\n'))
+        self.assertNotIn(f'id: {first.sync_version}\n', body)
+        self.assertIn(f'id: {second.sync_version}\nevent: share\ndata: ', body)
+        self.assertIn('"recipe_name":"Curry"', body.replace(' ', ''))
+
+    def test_events_are_keyed_on_versions_not_reused_ids(self):
+        first, second = self.share(), self.share()
+        seen = second.sync_version
+        second_id = second.id
+        db.session.delete(second)
+        db.session.commit()
+        again = self.share() # SQLite hands out the deleted share's id again
+        self.assertEqual(again.id, second_id)
+        _, body = self.stream({'Last-Event-ID': str(seen)})
+        self.assertIn(f'id: {again.sync_version}\nevent: share\n', body)
+
+        both = [SharedRecipe(receiver_id=self.receiver.id, sharer_name='chef', recipe_id=self.recipe.id)
+                for _ in range(2)]
+        db.session.add_all(both) # One flush, one version
+        db.session.commit()
+        _, body = self.stream({'Last-Event-ID': str(again.sync_version)})
+        self.assertEqual(body.count('event: share\n'), 2)
+        self.assertEqual(body.count(f'id: {both[0].sync_version}\n'), 1) # Only after the last of them
+
+    def test_polling_fallback(self):
+        self.share()
+        with self.client:
+            self.client.post('/auth/login', data=dict(identifier='inbox', password='password123'))
+            first = self.client.get('/api/events/shares/poll').get_json()
+            self.assertEqual(first['shares'], [])
+            shared = self.share()
+            data = self.client.get(f"/api/events/shares/poll?after={first['last_event_id']}").get_json()
+            self.assertEqual([share['id'] for share in data['shares']], [shared.id])
+            self.assertEqual(data['last_event_id'], shared.sync_version)
+            self.assertEqual(self.client.get('/api/events/shares/poll?after=x').status_code, 400)
+
+            self.app.config['SSE_ENABLED'] = None # Auto: no gevent in the test process, so polling
+            self.assertEqual(self.client.get('/api/events/shares').status_code, 503)
+            self.assertIn(b'"share_stream":false', self.client.get('/home').data.replace(b' ', b''))
+
+    def test_first_connection_only_sends_newer_shares(self):
+        self.share()
+        _, body = self.stream()
+        self.assertNotIn('event: share', body)
+        self.assertEqual(self.stream({'Last-Event-ID': 'abc'})[0].status_code, 400)
+
+    def test_hub_wakes_listeners(self):
+        self.hub.publish(self.receiver.id, 5) # Nobody listening, nothing kept
+        self.assertEqual(self.hub.latest, {})
+
+        self.hub.subscribe(self.receiver.id)
+        shared = self.share() # Committed in this process: published on commit
+        version = shared.sync_version
+        self.assertEqual(self.hub.latest[self.receiver.id], version)
+
+        db.session.execute(SharedRecipe.__table__.insert().values( # As another worker would
+            receiver_id=self.receiver.id, sharer_name='chef', recipe_id=self.recipe.id, sync_version=version + 10))
+        db.session.commit()
+        self.hub.poll_once()
+        self.assertEqual(self.hub.latest[self.receiver.id], version + 10)
+
+        waiter = threading.Timer(0.05, self.hub.publish, args=(self.receiver.id, version + 20))
+        waiter.start()
+        self.assertEqual(self.hub.wait(self.receiver.id, version + 10, timeout=2), version + 20)
+
+        self.hub.unsubscribe(self.receiver.id)
+        self.assertEqual((self.hub.latest, self.hub.listeners), ({}, {}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,41 @@
+import unittest
+from app import create_app
+from app.perf import measure_startup, parse_importtime, top_level_import_times, warm_up
+from config import TestConfig
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _io
+import time:       300 |        500 |   encodings
+import time:        40 |         40 |     jinja2.utils
+import time:       200 |        900 |   jinja2
+import time:        70 |         70 |   jinja2.ext
+"""
+
+
+class PerfTestCase(unittest.TestCase):
+    def test_parse_importtime(self):
+        imports = parse_importtime(IMPORTTIME_OUTPUT)
+        self.assertEqual(imports[0], ('_io', 100, 100, 2))
+        self.assertEqual(imports[3], ('jinja2', 200, 900, 1))
+        self.assertEqual(top_level_import_times(imports), [('jinja2', 970), ('encodings', 500)])
+
+    def test_migrate_can_be_skipped(self):
+        class NoMigrateConfig(TestConfig):
+            MIGRATE_ENABLED = False
+        self.assertNotIn('migrate', create_app(NoMigrateConfig).extensions)
+        self.assertIn('migrate', create_app(TestConfig).extensions)
+
+    def test_warm_up_compiles_templates(self):
+        app = create_app(TestConfig)
+        warm_up(app)
+        self.assertIn('home.html', [template.name for template in app.jinja_env.cache.values()])
+
+    def test_measure_startup_in_a_fresh_interpreter(self):
+        timings = measure_startup('TestConfig')
+        self.assertGreater(timings['create_app'], 0)
+        self.assertIn('app.models', [name for name, _, _, _ in timings['imports']])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,91 @@
+import unittest
+from app import create_app, db
+from app.models import User, Recipe, RecipeContent, RecipeIngredient
+from config import TestConfig
+
+IMAGE = 'data:image/png;base64,' + 'A' * 4000
+
+
+class CopyOnWriteCloneTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.chef = User(username='chef', email='chef@example.com')
+        self.chef.set_password('password123')
+        self.fans = [User(username=f'fan{i}', email=f'fan{i}@example.com', password_hash='-') for i in range(3)]
+        db.session.add_all([self.chef] + self.fans)
+        db.session.commit()
+        self.original = Recipe(name='Viral Noodles', category='Dinner', time=15, ingredients=['Noodles', 'Chilli'],
+                               instructions='Boil. Toss.', image=IMAGE, date='2024-05-10', author=self.chef,
+                               whitelist=[fan.id for fan in self.fans])
+        db.session.add(self.original)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def clone_as(self, user):
+        with self.client:
+            # The fans have no password; log them in through the session directly
+            with self.client.session_transaction() as session:
+                session['_user_id'] = str(user.id)
+                session['_fresh'] = True
+            response = self.client.post('/recipes/clonerecipe', json={'recipe_id': self.original.id})
+        self.assertEqual(response.status_code, 201)
+        return db.session.get(Recipe, response.get_json()['new_recipe_id'])
+
+    def test_clones_share_one_content_row(self):
+        clones = [self.clone_as(fan) for fan in self.fans]
+        self.assertEqual(RecipeContent.query.count(), 1)
+        for recipe in clones + [self.original]:
+            self.assertEqual(recipe.content_id, self.original.content_id)
+            self.assertIsNone(recipe._instructions) # Nothing copied
+            self.assertEqual(recipe.to_dict()['ingredients'], ['Noodles', 'Chilli'])
+            self.assertEqual(recipe.image, IMAGE)
+        self.assertEqual([row.name for row in clones[0].ingredient_index], ['noodles', 'chilli'])
+
+        # SQL reads resolve shared content too
+        self.assertEqual(db.session.query(Recipe.instructions).filter(Recipe.id == clones[1].id).scalar(),
+                         'Boil. Toss.')
+
+    def test_first_edit_copies_the_content(self):
+        clone = self.clone_as(self.fans[0])
+        other = self.clone_as(self.fans[1])
+        with self.client:
+            with self.client.session_transaction() as session:
+                session['_user_id'] = str(self.fans[0].id)
+            response = self.client.put(f'/api/recipes/{clone.id}', json={'ingredients': ['Noodles', 'Garlic']})
+        self.assertEqual(response.status_code, 200)
+
+        db.session.expire_all()
+        clone, other = db.session.get(Recipe, clone.id), db.session.get(Recipe, other.id)
+        self.assertIsNone(clone.content_id)
+        self.assertEqual((clone.ingredients, clone.instructions, clone.image),
+                         (['Noodles', 'Garlic'], 'Boil. Toss.', IMAGE))
+        self.assertEqual(other.ingredients, ['Noodles', 'Chilli'])
+        self.assertEqual([row.name for row in RecipeIngredient.query.filter_by(recipe_id=clone.id)
+                                                            .order_by(RecipeIngredient.position)],
+                         ['noodles', 'garlic'])
+
+    def test_content_is_deleted_with_its_last_recipe(self):
+        clone = self.clone_as(self.fans[0])
+        self.original.name = 'Renamed' # Not a content field, so no copy
+        db.session.commit()
+        self.assertIsNotNone(self.original.content_id)
+
+        db.session.delete(self.original)
+        db.session.commit()
+        self.assertEqual(RecipeContent.query.count(), 1) # The clone still uses it
+        db.session.delete(clone)
+        db.session.commit()
+        self.assertEqual(RecipeContent.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,110 @@
+import json
+import unittest
+from app import create_app, db
+from app.models import User, Recipe, RecipeRevision
+from app.revisions import apply_diff, diff_text
+from config import TestConfig
+
+INSTRUCTIONS = ''.join(f'Step {i}: stir the pot and taste for seasoning.\n' for i in range(1, 101))
+
+
+class RecipeRevisionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app.config['REVISION_SNAPSHOT_INTERVAL'] = 4
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='editor', email='editor@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.recipe = Recipe(name='Stock', category='Dinner', time=240, ingredients=['Bones', 'Water'],
+                             instructions=INSTRUCTIONS, date='2024-05-10', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self):
+        self.client.post('/auth/login', data=dict(identifier='editor', password='password123'))
+
+    def edit(self, **changes):
+        response = self.client.put(f'/api/recipes/{self.recipe.id}', json=changes)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_diff_round_trip(self):
+        old = 'a\nb\nc\n'
+        for new in ('a\nB\nc\n', 'a\nc\n', 'x\na\nb\nc\ny', ''):
+            self.assertEqual(apply_diff(old, diff_text(old, new)), new)
+
+    def test_edits_store_deltas_and_rebuild(self):
+        edited = INSTRUCTIONS.replace('Step 50: stir', 'Step 50: whisk')
+        with self.client:
+            self.login()
+            self.edit(instructions=edited)
+            self.edit(name='Bone Broth')
+            self.edit(time=180, ingredients=['Bones', 'Water', 'Salt'])
+            self.edit(instructions=INSTRUCTIONS) # Revision 5: a snapshot with an interval of 4
+
+            revisions = RecipeRevision.query.order_by(RecipeRevision.number).all()
+            self.assertEqual([r.kind for r in revisions], ['snapshot', 'delta', 'delta', 'delta', 'snapshot'])
+            # An edit to one line of a long text stores about one line
+            self.assertLess(len(json.dumps(revisions[1].data)), len(INSTRUCTIONS) // 20)
+            self.assertEqual(revisions[2].data, {'set': {'name': 'Bone Broth'}, 'patch': {}})
+
+            listing = self.client.get(f'/api/recipes/{self.recipe.id}/revisions').get_json()
+            self.assertEqual([(r['number'], r['changed']) for r in listing[:2]],
+                             [(5, ['instructions']), (4, ['time', 'ingredients'])])
+
+            revision = self.client.get(f'/api/recipes/{self.recipe.id}/revisions/4').get_json()
+            self.assertEqual((revision['name'], revision['time'], revision['instructions']),
+                             ('Bone Broth', 180, edited))
+            self.assertEqual(revision['ingredients'], ['Bones', 'Water', 'Salt'])
+            original = self.client.get(f'/api/recipes/{self.recipe.id}/revisions/1').get_json()
+            self.assertEqual((original['name'], original['instructions']), ('Stock', INSTRUCTIONS))
+            self.assertEqual(self.client.get(f'/api/recipes/{self.recipe.id}/revisions/9').status_code, 404)
+
+    def test_images_are_stored_once(self):
+        first, second = 'data:image/png;base64,' + 'A' * 5000, 'data:image/png;base64,' + 'B' * 5000
+        self.recipe.image = first
+        db.session.commit()
+        with self.client:
+            self.login()
+            self.edit(name='Bone Broth')
+            self.edit(image=second)
+            for minutes in (200, 180, 160): # Revision 5 is a snapshot
+                self.edit(time=minutes)
+
+            stored = json.dumps([r.data for r in RecipeRevision.query.all()])
+            self.assertEqual(stored.count('A' * 5000), 1) # Kept by the revision that replaced it
+            self.assertNotIn('B' * 5000, stored) # Still on the recipe
+            for number, image in ((1, first), (2, first), (3, second), (5, second)):
+                revision = self.client.get(f'/api/recipes/{self.recipe.id}/revisions/{number}').get_json()
+                self.assertEqual(revision['image'], image)
+
+            restored = self.client.post(f'/api/recipes/{self.recipe.id}/revisions/2/restore').get_json()
+            self.assertEqual((restored['name'], restored['image']), ('Bone Broth', first))
+            revision = self.client.get(f'/api/recipes/{self.recipe.id}/revisions/3').get_json()
+            self.assertEqual(revision['image'], second) # Now kept by the restore
+
+    def test_restore_undoes_an_edit(self):
+        with self.client:
+            self.login()
+            self.edit(name='Oops', instructions='Gone.')
+            restored = self.client.post(f'/api/recipes/{self.recipe.id}/revisions/1/restore').get_json()
+            self.assertEqual((restored['name'], restored['instructions']), ('Stock', INSTRUCTIONS))
+            self.assertEqual(RecipeRevision.query.count(), 3) # The undo is itself a revision
+
+            self.assertEqual(self.client.delete(f'/api/recipes/{self.recipe.id}').status_code, 200)
+        self.assertEqual(RecipeRevision.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,155 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from app import create_app, db
+from app.sharding import create_all
+from config import TestConfig
+
+
+class ShardingTestCase(unittest.TestCase):
+    def setUp(self):
+        # A directory database plus three shard files, as `SHARD_COUNT=3` would set up
+        self.folder = tempfile.mkdtemp()
+        self.shard_paths = [os.path.join(self.folder, f'shard{shard}.db') for shard in range(3)]
+
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(self.folder, 'directory.db')}"
+            SHARD_DATABASE_URIS = [f'sqlite:///{path}' for path in self.shard_paths]
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        create_all()
+        self.client = self.app.test_client()
+        self.users = {name: self.signup(name) for name in ('ana', 'ben', 'cai')}
+
+    def tearDown(self):
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        shutil.rmtree(self.folder)
+
+    def signup(self, name):
+        response = self.client.post('/auth/signup', data=dict(username=name, email=f'{name}@example.com',
+                                                              password='password123', confirm_password='password123'))
+        self.assertEqual(response.status_code, 302)
+        return self.rows(None, 'SELECT id FROM user_directory WHERE username = ?', name)[0][0]
+
+    def rows(self, shard, sql, *params):
+        path = os.path.join(self.folder, 'directory.db') if shard is None else self.shard_paths[shard]
+        with sqlite3.connect(path) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def login(self, name):
+        self.client.get('/auth/logout')
+        self.client.post('/auth/login', data=dict(identifier=f'{name}@example.com', password='password123'))
+
+    def add_recipe(self, name):
+        response = self.client.post('/api/recipes', json={'name': name, 'category': 'Dinner', 'time': 20,
+                                                          'ingredients': ['Rice'], 'instructions': 'Cook it.'})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['id']
+
+    def test_users_and_their_recipes_live_on_one_shard(self):
+        for name, user_id in self.users.items():
+            self.assertEqual(self.rows(user_id % 3, 'SELECT username FROM user WHERE id = ?', user_id), [(name,)])
+        self.assertEqual(sorted(user_id % 3 for user_id in self.users.values()), [0, 1, 2])
+
+        # Uniqueness is global, even though each shard has its own user table
+        response = self.client.post('/auth/signup', data=dict(username='ana', email='other@example.com',
+                                                              password='password123', confirm_password='password123'))
+        self.assertIn(b'Username is already taken', response.data)
+        self.assertEqual(len(self.rows(None, 'SELECT id FROM user_directory')), 3)
+
+        with self.client:
+            self.login('ben')
+            recipe_ids = [self.add_recipe('Fried Rice'), self.add_recipe('Congee')]
+            shard = self.users['ben'] % 3
+            self.assertEqual([recipe_id % 3 for recipe_id in recipe_ids], [shard, shard])
+            self.assertEqual(len(self.rows(shard, 'SELECT id FROM recipe')), 2)
+            self.assertEqual([r['name'] for r in self.client.get('/api/recipes').get_json()], ['Congee', 'Fried Rice'])
+
+            # Deleting the newest recipe doesn't free its id for the next one
+            self.assertEqual(self.client.delete(f'/api/recipes/{recipe_ids[1]}').status_code, 200)
+            self.assertGreater(self.add_recipe('Jook'), recipe_ids[1])
+
+    def test_search_and_sharing_cross_shards(self):
+        with self.client:
+            self.login('ana')
+            self.assertEqual(self.client.get('/users/search?q=ca').get_json(), ['cai'])
+            recipe_id = self.add_recipe('Paella')
+            response = self.client.post(f'/recipes/{recipe_id}/whitelist', json={'username': 'ben'})
+            self.assertIn('shared with ben', response.get_json()['message'])
+            response = self.client.post('/api/shared_recipes/bulk', json={'usernames': ['ben', 'cai'],
+                                                                          'recipe_ids': [recipe_id]})
+            self.assertEqual((response.get_json()['shared'], response.get_json()['already_shared']), (1, 1))
+
+            # Each share is stored with its receiver
+            for name in ('ben', 'cai'):
+                self.assertEqual(self.rows(self.users[name] % 3, 'SELECT recipe_id, sharer_name FROM shared_recipe'),
+                                 [(recipe_id, 'ana')])
+
+            self.login('ben')
+            response = self.client.get('/api/shared_recipes/my')
+            mailbox, etag = response.get_json(), response.get_etag()[0]
+            self.assertEqual([(share['recipe_name'], share['sharer_name']) for share in mailbox], [('Paella', 'ana')])
+            revalidate = lambda: self.client.get('/api/shared_recipes/my', headers={'If-None-Match': f'"{etag}"'})
+            self.assertEqual(revalidate().status_code, 304)
+            self.login('ana')
+            self.client.put(f'/api/recipes/{recipe_id}', json={'name': 'Seafood Paella'}) # On ana's shard
+            self.login('ben')
+            self.assertEqual(revalidate().get_json()[0]['recipe_name'], 'Seafood Paella')
+            self.assertEqual(self.client.get(f'/view_recipe/{recipe_id}').status_code, 200)
+
+            response = self.client.post('/recipes/clonerecipe', json={'recipe_id': recipe_id})
+            self.assertEqual(response.status_code, 201)
+            clone_id = response.get_json()['new_recipe_id']
+            self.assertEqual(clone_id % 3, self.users['ben'] % 3)
+            self.assertEqual(self.rows(self.users['ben'] % 3, 'SELECT instructions FROM recipe WHERE id = ?', clone_id),
+                             [('Cook it.',)]) # Copied: content can't be shared across files
+
+    def test_deleting_a_recipe_cleans_up_other_shards(self):
+        with self.client:
+            self.login('ana')
+            recipe_id = self.add_recipe('Paella')
+            self.client.post(f'/recipes/{recipe_id}/whitelist', json={'username': 'ben'})
+            self.login('ben')
+            self.client.post(f'/log_cooking/{recipe_id}', data={'date_cooked': '2024-05-11', 'rating': '5'})
+            ben_shard = self.users['ben'] % 3
+            self.assertEqual(len(self.rows(ben_shard, 'SELECT id FROM cooking_log WHERE recipe_id = ?', recipe_id)), 1)
+
+            self.login('ana')
+            self.assertEqual(self.client.delete(f'/api/recipes/{recipe_id}').status_code, 200)
+            self.assertEqual(self.rows(ben_shard, 'SELECT id FROM shared_recipe WHERE recipe_id = ?', recipe_id), [])
+            self.assertEqual(self.rows(ben_shard, 'SELECT id FROM cooking_log WHERE recipe_id = ?', recipe_id), [])
+
+    def test_stats_count_logs_of_recipes_on_other_shards(self):
+        with self.client:
+            self.login('ana')
+            recipe_id = self.add_recipe('Paella')
+            self.client.post(f'/recipes/{recipe_id}/whitelist', json={'username': 'ben'})
+            self.login('ben')
+            own_id = self.add_recipe('Risotto')
+            self.assertNotEqual(recipe_id % 3, own_id % 3)
+            for day in ('2024-05-11', '2024-05-12'):
+                self.client.post(f'/log_cooking/{recipe_id}', data={'date_cooked': day, 'rating': '4'})
+            self.client.post(f'/log_cooking/{own_id}', data={'date_cooked': '2024-05-13', 'rating': '5'})
+
+            stats = self.client.get('/api/stats?sections=summary,top_recipes,top_rated').get_json()
+            self.assertEqual(stats['top_recipes_data'], [{'name': 'Paella', 'count': 2}, {'name': 'Risotto', 'count': 1}])
+            self.assertEqual(stats['most_frequent_recipe'], {'name': 'Paella', 'count': 2})
+            self.assertEqual(stats['top_rated_data'], [{'name': 'Risotto', 'rating': 5.0}, {'name': 'Paella', 'rating': 4.0}])
+
+    def test_scheduled_maintenance_covers_the_directory(self):
+        result = self.app.test_cli_runner().invoke(args=['db-maintain', '--schedule'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self.rows(0, "SELECT key FROM job WHERE status = 'queued' ORDER BY id"),
+                         [('db_maintenance',), ('db_maintenance:directory',)])
+        for shard in (1, 2):
+            self.assertEqual(self.rows(shard, "SELECT key FROM job WHERE status = 'queued'"), [('db_maintenance',)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
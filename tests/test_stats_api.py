@@ -0,0 +1,72 @@
+import unittest
+from datetime import date
+from app import create_app, db
+from app.models import User, Recipe, CookingLog
+from app.routes import STATS_SECTIONS
+from config import TestConfig
+
+
+class StatsApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='statcook', email='statcook@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.recipe = Recipe(name='Pancakes', category='Breakfast', time=20, ingredients_json='["Flour"]',
+                             instructions='Flip.', date='2024-05-01', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+        db.session.add(CookingLog(user_id=self.user.id, recipe_id=self.recipe.id,
+                                  date_cooked=date.today(), rating=4, duration_seconds=600))
+        db.session.commit()
+        self.client.post('/auth/login', data=dict(identifier='statcook', password='password123'))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_sections_limit_the_payload(self):
+        response = self.client.get('/api/stats?sections=summary')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.get_json()), set(STATS_SECTIONS['summary']))
+        self.assertEqual(response.get_json()['total_sessions'], 1)
+
+        full = self.client.get('/api/stats').get_json()
+        self.assertEqual(set(full), {key for keys in STATS_SECTIONS.values() for key in keys})
+        self.assertEqual(full['top_recipes_data'], [{'name': 'Pancakes', 'count': 1}])
+
+    def test_unknown_section_is_rejected(self):
+        response = self.client.get('/api/stats?sections=summary,bogus')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag_revalidation_and_cache_headers(self):
+        response = self.client.get('/api/stats?sections=summary,frequency')
+        etag = response.headers['ETag']
+        self.assertIn('private', response.headers['Cache-Control'])
+        self.assertIn('stale-while-revalidate', response.headers['Cache-Control'])
+
+        not_modified = self.client.get('/api/stats?sections=summary,frequency', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+
+        self.client.post(f'/log_cooking/{self.recipe.id}', data={'date_cooked': date.today().isoformat()})
+        changed = self.client.get('/api/stats?sections=summary,frequency', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(changed.get_json()['total_sessions'], 2)
+
+    def test_home_links_versioned_stats_url(self):
+        response = self.client.get('/home')
+        self.assertIn(b'/api/stats?v=', response.data)
+        self.assertNotIn(b'total_sessions', response.data) # Stats are no longer rendered into the page
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,229 @@
+import random
+import unittest
+from datetime import date, timedelta
+from sqlalchemy import event, func, desc
+from app import create_app, db
+from app.models import User, Recipe, CookingLog
+from app.stats import STATS_SECTIONS, TOP_N, calculate_user_stats
+from config import TestConfig
+
+RANKED_KEYS = {'top_recipes_data': 'count', 'top_recipes_this_month_data': 'count',
+               'top_rated_data': 'rating', 'top_rated_this_month_data': 'rating'}
+
+
+def legacy_calculate_user_stats(user_id, today):
+    """The original implementation (one query per aggregate), kept as the oracle."""
+    stats = {
+        'total_sessions': 0,
+        'most_frequent_recipe': {'name': '-', 'count': 0},
+        'total_time_logged_seconds': 0, 
+        'total_time_logged_hours': 0.0,
+        'average_rating': 0.0, 
+        'top_recipes_data': [], 
+        'monthly_frequency_data': [],
+        'top_recipes_this_month_data': [],
+        'weekly_frequency_data': [],
+        'top_rated_data': [],
+        'top_rated_this_month_data': []
+    }
+    try:
+        stats['total_sessions'] = CookingLog.query.filter_by(user_id=user_id).count()
+        total_duration = db.session.query(func.sum(CookingLog.duration_seconds))\
+                                  .filter(CookingLog.user_id == user_id, CookingLog.duration_seconds.isnot(None)).scalar()
+        stats['total_time_logged_seconds'] = int(total_duration) if total_duration else 0
+        stats['total_time_logged_hours'] = round(stats['total_time_logged_seconds'] / 3600, 2)
+        avg_rating_query = db.session.query(func.avg(CookingLog.rating))\
+                              .filter(CookingLog.user_id == user_id, CookingLog.rating.isnot(None)).scalar()
+        stats['average_rating'] = float(avg_rating_query) if avg_rating_query is not None else 0.0
+
+        top_recipes = (db.session.query(Recipe.name, func.count(CookingLog.id).label('log_count'))
+                       .join(CookingLog, Recipe.id == CookingLog.recipe_id).filter(CookingLog.user_id == user_id)
+                       .group_by(Recipe.name).order_by(desc('log_count')).limit(5).all())
+        if top_recipes:
+            stats['most_frequent_recipe'] = {'name': top_recipes[0][0], 'count': int(top_recipes[0][1])}
+            stats['top_recipes_data'] = [{'name': name, 'count': int(count)} for name, count in top_recipes]
+        
+        month_counts = {}
+        for i in range(12):
+            month_to_calc = today.month - i
+            year_to_calc = today.year
+            if month_to_calc <= 0:
+                month_to_calc += 12
+                year_to_calc -= 1
+            month_counts[f"{year_to_calc:04d}-{month_to_calc:02d}"] = 0
+        
+        first_day_of_period = (today.replace(day=1) - timedelta(days=330)).replace(day=1)
+
+        monthly_logs = (db.session.query(func.strftime('%Y-%m', CookingLog.date_cooked).label('month'),
+                                        func.count(CookingLog.id).label('count'))
+                        .filter(CookingLog.user_id == user_id, 
+                                CookingLog.date_cooked >= first_day_of_period, 
+                                CookingLog.date_cooked <= today) 
+                        .group_by('month').order_by('month').all())
+        
+        for month_db, count in monthly_logs:
+            if month_db in month_counts: 
+                month_counts[month_db] = int(count)
+        
+        first_day_of_month = today.replace(day=1)
+        top_recipes_month = (db.session.query(Recipe.name, func.count(CookingLog.id).label('log_count'))
+                       .join(CookingLog, Recipe.id == CookingLog.recipe_id)
+                       .filter(CookingLog.user_id == user_id,
+                               CookingLog.date_cooked >= first_day_of_month)
+                       .group_by(Recipe.name)
+                       .order_by(desc('log_count'))
+                       .limit(5).all())
+        stats['top_recipes_this_month_data'] = [{'name': name, 'count': int(count)} for name, count in top_recipes_month]
+
+        start_of_week = today - timedelta(days=today.weekday()) 
+        end_of_week = start_of_week + timedelta(days=6)
+        weekly_counts = {day: 0 for day in range(1, 8)}  
+        weekly_logs = (db.session.query(func.strftime('%w', CookingLog.date_cooked).label('day_of_week'),
+                                       func.count(CookingLog.id).label('count'))
+                       .filter(CookingLog.user_id == user_id,
+                               CookingLog.date_cooked >= start_of_week,
+                               CookingLog.date_cooked <= end_of_week)
+                       .group_by('day_of_week')
+                       .all())
+        
+        day_mapping = {0: 7, 1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6}
+        for day_of_week, count in weekly_logs:
+            adjusted_day = day_mapping.get(int(day_of_week), 7)
+            weekly_counts[adjusted_day] = int(count)
+        stats['weekly_frequency_data'] = [{'day': d, 'count': weekly_counts[d]} for d in range(1, 8)]
+
+        top_rated = (db.session.query(Recipe.name, func.avg(CookingLog.rating).label('avg_rating'))
+                    .join(CookingLog, Recipe.id == CookingLog.recipe_id)
+                    .filter(CookingLog.user_id == user_id,
+                            CookingLog.rating.isnot(None))
+                    .group_by(Recipe.name)
+                    .order_by(desc('avg_rating'))
+                    .limit(5).all())
+        stats['top_rated_data'] = [{'name': name, 'rating': float(avg)} for name, avg in top_rated]
+
+        top_rated_month = (db.session.query(Recipe.name, func.avg(CookingLog.rating).label('avg_rating'))
+                         .join(CookingLog, Recipe.id == CookingLog.recipe_id)
+                         .filter(CookingLog.user_id == user_id,
+                                 CookingLog.rating.isnot(None),
+                                 CookingLog.date_cooked >= first_day_of_month)
+                         .group_by(Recipe.name)
+                         .order_by(desc('avg_rating'))
+                         .limit(5).all())
+        stats['top_rated_this_month_data'] = [{'name': name, 'rating': float(avg)} for name, avg in top_rated_month]
+        
+        sorted_months = sorted(month_counts.keys()) 
+        stats['monthly_frequency_data'] = [{'month': m, 'count': month_counts[m]} for m in sorted_months]
+
+    except Exception as e: 
+        print(f"Error calculating stats for user {user_id}: {e}")
+    return stats
+
+
+class StatsEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='enginecook', email='enginecook@example.com')
+        self.user.set_password('password123')
+        self.other = User(username='othercook', email='othercook@example.com')
+        self.other.set_password('password123')
+        db.session.add_all([self.user, self.other])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_recipes(self, user, count):
+        recipes = [Recipe(name=f'Recipe {i:02d}', category='Dinner', time=10, ingredients_json='[]',
+                          instructions='Cook.', date='2024-01-01', author=user) for i in range(count)]
+        db.session.add_all(recipes)
+        db.session.commit()
+        return recipes
+
+    def add_random_logs(self, rng, user, recipes, today, count):
+        for _ in range(count):
+            db.session.add(CookingLog(
+                user_id=user.id, recipe_id=rng.choice(recipes).id,
+                date_cooked=today - timedelta(days=rng.randint(-5, 420)), # A few future-dated logs too
+                duration_seconds=rng.choice([None, rng.randint(60, 7200)]),
+                rating=rng.choice([None, 1, 2, 3, 4, 5])))
+        db.session.commit()
+
+    def assert_same_ranking(self, engine, legacy, value_key):
+        # SQL leaves the order of tied entries undefined, so compare the
+        # values exactly and the names as sets within each tie group. The
+        # last group may have been cut off at TOP_N differently.
+        self.assertEqual([item[value_key] for item in engine], [item[value_key] for item in legacy])
+        values = [item[value_key] for item in engine]
+        for value in set(values):
+            if value == values[-1] and len(values) == TOP_N:
+                continue
+            self.assertEqual({item['name'] for item in engine if item[value_key] == value},
+                             {item['name'] for item in legacy if item[value_key] == value})
+
+    def assert_equivalent(self, today):
+        engine = calculate_user_stats(self.user.id, today=today)
+        legacy = legacy_calculate_user_stats(self.user.id, today)
+        for key, value_key in RANKED_KEYS.items():
+            self.assert_same_ranking(engine.pop(key), legacy.pop(key), value_key)
+        self.assertEqual(engine.pop('most_frequent_recipe')['count'], legacy.pop('most_frequent_recipe')['count'])
+        self.assertEqual(engine, legacy)
+
+    def test_matches_legacy_output_on_random_histories(self):
+        # Dates cover month and year boundaries, the start/end of the week and leap days.
+        for seed, today in [(1, date(2024, 3, 15)), (2, date(2024, 1, 1)), (3, date(2024, 2, 29)),
+                            (4, date(2023, 12, 31)), (5, date(2024, 7, 8))]:
+            with self.subTest(seed=seed, today=today):
+                rng = random.Random(seed)
+                recipes = self.add_recipes(self.user, 12)
+                other_recipes = self.add_recipes(self.other, 3)
+                # Skewed per-recipe weights give a realistic spread of counts
+                weighted = [recipe for i, recipe in enumerate(recipes) for _ in range(i * i + 1)]
+                self.add_random_logs(rng, self.user, weighted, today, 300)
+                self.add_random_logs(rng, self.other, other_recipes, today, 50)
+                self.assert_equivalent(today)
+
+                CookingLog.query.delete()
+                Recipe.query.delete()
+                db.session.commit()
+                db.session.expunge_all() # Bulk deletes leave the old rows in the identity map
+
+    def test_matches_legacy_output_for_user_without_logs(self):
+        self.add_recipes(self.user, 2)
+        self.assert_equivalent(date(2024, 5, 20))
+
+    def test_ties_are_broken_by_name(self):
+        recipes = self.add_recipes(self.user, 6)
+        today = date(2024, 5, 20)
+        for recipe in reversed(recipes):
+            db.session.add(CookingLog(user_id=self.user.id, recipe_id=recipe.id, date_cooked=today, rating=3))
+        db.session.commit()
+        stats = calculate_user_stats(self.user.id, today=today)
+        expected = [f'Recipe {i:02d}' for i in range(5)]
+        self.assertEqual([item['name'] for item in stats['top_recipes_data']], expected)
+        self.assertEqual([item['name'] for item in stats['top_rated_data']], expected)
+
+    def test_single_query_and_section_filtering(self):
+        recipes = self.add_recipes(self.user, 3)
+        self.add_random_logs(random.Random(7), self.user, recipes, date(2024, 5, 20), 30)
+        user_id = self.user.id
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            stats = calculate_user_stats(user_id, sections=['summary', 'top_rated'], today=date(2024, 5, 20))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(set(stats), set(STATS_SECTIONS['summary'] + STATS_SECTIONS['top_rated']))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,110 @@
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from app import create_app, db
+from app.models import User, Recipe, CookingLog, SharedRecipe, SyncTombstone
+from config import TestConfig
+
+
+class DeltaSyncTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='offline', email='offline@example.com')
+        self.user.set_password('password123')
+        self.friend = User(username='friend', email='friend@example.com')
+        self.friend.set_password('password123')
+        db.session.add_all([self.user, self.friend])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_recipe(self, name, author=None):
+        recipe = Recipe(name=name, category='Dinner', time=30, ingredients_json='["Water"]',
+                        instructions='Simmer.', date='2024-05-10', author=author or self.user)
+        db.session.add(recipe)
+        db.session.commit()
+        return recipe
+
+    def sync(self, since):
+        response = self.client.get(f'/api/sync?since={since}')
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_changes_bump_the_owners_version(self):
+        soup = self.add_recipe('Soup')
+        self.assertEqual((self.user.sync_version, soup.sync_version), (1, 1))
+
+        log = CookingLog(user_id=self.user.id, recipe_id=soup.id, date_cooked=date(2024, 5, 1))
+        db.session.add(log)
+        db.session.commit()
+        self.assertEqual((self.user.sync_version, log.sync_version, soup.sync_version), (2, 2, 2))
+
+        db.session.add(SharedRecipe(receiver_id=self.friend.id, sharer_name='offline', recipe_id=soup.id))
+        db.session.commit()
+        self.assertEqual((self.user.sync_version, self.friend.sync_version), (2, 1))
+
+        log_id = log.id
+        db.session.delete(log)
+        db.session.commit()
+        tombstone = SyncTombstone.query.one()
+        self.assertEqual((tombstone.user_id, tombstone.kind, tombstone.object_id, tombstone.sync_version),
+                         (self.user.id, 'logs', log_id, 3))
+
+    def test_sync_returns_full_snapshot_then_deltas(self):
+        soup = self.add_recipe('Soup')
+        stew = self.add_recipe('Stew')
+        toast = self.add_recipe('Toast')
+        with self.client:
+            self.client.post('/auth/login', data=dict(identifier='offline', password='password123'))
+            snapshot = self.sync(0)
+            self.assertTrue(snapshot['full'])
+            self.assertEqual([r['name'] for r in snapshot['recipes']], ['Toast', 'Stew', 'Soup'])
+
+            self.assertEqual(self.sync(snapshot['token'])['recipes'], []) # Nothing new
+
+            stew.name = 'Beef Stew'
+            db.session.add(CookingLog(user_id=self.user.id, recipe_id=soup.id, date_cooked=date(2024, 5, 1)))
+            db.session.add(SharedRecipe(receiver_id=self.user.id, sharer_name='friend',
+                                        recipe_id=self.add_recipe('Curry', author=self.friend).id))
+            db.session.commit()
+            toast_id = toast.id
+            db.session.delete(toast)
+            db.session.commit()
+
+            delta = self.sync(snapshot['token'])
+            self.assertFalse(delta['full'])
+            self.assertEqual([r['name'] for r in delta['recipes']], ['Beef Stew', 'Soup']) # Soup was cooked
+            self.assertEqual(len(delta['logs']), 1)
+            self.assertEqual(delta['shares'][0]['recipe_name'], 'Curry')
+            self.assertEqual(delta['deleted']['recipes'], [toast_id])
+
+            self.assertTrue(self.sync(delta['token'] + 5)['full']) # Token from another server
+            self.assertEqual(self.client.get('/api/sync?since=abc').status_code, 400)
+
+    def test_prune_raises_the_floor(self):
+        soup = self.add_recipe('Soup')
+        db.session.delete(soup)
+        db.session.commit()
+        SyncTombstone.query.update({'deleted_at': datetime.now(timezone.utc) - timedelta(days=100)})
+        db.session.commit()
+
+        result = self.app.test_cli_runner().invoke(args=['sync', 'prune', '--days', '90'])
+        self.assertIn('Pruned 1 tombstone(s) for 1 user(s)', result.output)
+        db.session.expire_all()
+        self.assertEqual(self.user.sync_floor, 2)
+        self.assertEqual(SyncTombstone.query.count(), 0)
+        with self.client:
+            self.client.post('/auth/login', data=dict(identifier='offline', password='password123'))
+            self.assertTrue(self.sync(1)['full']) # Older than the pruned tombstones
+            self.assertFalse(self.sync(2)['full'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+from app import create_app
+from app.templating import preload_templates
+from config import TestConfig
+
+
+class TemplatingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def make_app(self, **config):
+        class Config(TestConfig):
+            TEMPLATE_BYTECODE_CACHE = True
+            TEMPLATE_BYTECODE_CACHE_DIR = self.cache_dir
+        for key, value in config.items():
+            setattr(Config, key, value)
+        return create_app(Config)
+
+    def test_preload_compiles_every_template(self):
+        app = self.make_app(TEMPLATE_PRELOAD=True)
+        names = app.jinja_env.list_templates(extensions=['html'])
+        self.assertIn('home.html', names)
+        self.assertIn('auth/login.html', names)
+        self.assertEqual(len(app.jinja_env.cache), len(names))
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(names)) # Bytecode written for each one
+
+    def test_new_worker_loads_bytecode_instead_of_compiling(self):
+        preload_templates(self.make_app())
+
+        app = self.make_app()
+        compiled = []
+        original_compile = app.jinja_env.compile
+        app.jinja_env.compile = lambda *args, **kwargs: compiled.append(args) or original_compile(*args, **kwargs)
+        self.assertGreater(preload_templates(app), 0)
+        self.assertEqual(compiled, [])
+
+    def test_bytecode_cache_can_be_disabled(self):
+        app = self.make_app(TEMPLATE_BYTECODE_CACHE=False)
+        self.assertIsNone(app.jinja_env.bytecode_cache)
+        self.assertEqual(len(app.jinja_env.cache), 0) # Preload is off by default
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
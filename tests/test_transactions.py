@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from app import create_app, db
+from app.models import User, Recipe, CookingLog
+from app.transactions import transactional
+from config import TestConfig
+
+
+class TransactionalRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        # A file database, so another connection can hold the write lock like another worker would
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+            SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 0.02}}
+            DB_BUSY_RETRIES = 2
+            DB_BUSY_RETRY_BASE_MS = 100
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.stats = self.app.extensions['db_contention']
+
+        self.user = User(username='cook', email='cook@example.com', password_hash='-')
+        db.session.add(self.user)
+        db.session.commit()
+        self.recipe = Recipe(name='Risotto', category='Dinner', time=40, ingredients_json='[]',
+                             instructions='Stir.', date='2024-05-10', author=self.user)
+        db.session.add(self.recipe)
+        db.session.commit()
+        self.other = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+
+    def tearDown(self):
+        self.other.close()
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def hold_write_lock(self, seconds=None):
+        self.other.execute('BEGIN IMMEDIATE')
+        if seconds is not None:
+            releaser = threading.Timer(seconds, self.other.execute, args=('COMMIT',))
+            releaser.start()
+            self.addCleanup(releaser.join)
+
+    def login(self):
+        with self.client.session_transaction() as session:
+            session['_user_id'] = str(self.user.id)
+
+    def test_request_is_rerun_once_the_lock_is_free(self):
+        self.hold_write_lock(seconds=0.1)
+        with self.client:
+            self.login()
+            with self.assertLogs(self.app.logger, 'WARNING') as logs:
+                response = self.client.post(f'/log_cooking/{self.recipe.id}',
+                                            data={'date_cooked': '2024-05-11', 'rating': '4'})
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('1 busy requests', logs.output[0])
+            with self.client.session_transaction() as session:
+                # Only the successful attempt's message, not the failed one's
+                self.assertEqual([category for category, _ in session['_flashes']], ['success'])
+
+        self.assertEqual(CookingLog.query.count(), 1)
+        counts = self.stats.snapshot()
+        self.assertEqual((counts['busy_requests'], counts['gave_up']), (1, 0))
+        self.assertGreaterEqual(counts['retries'], 1)
+
+    def test_gives_up_after_the_configured_retries(self):
+        self.hold_write_lock()
+        with self.client:
+            self.login()
+            response = self.client.post('/api/recipes', json={'name': 'Ragu', 'category': 'Dinner', 'time': 90,
+                                                              'ingredients': ['Beef'], 'instructions': 'Simmer.'})
+        self.other.execute('ROLLBACK')
+        self.assertEqual(response.status_code, 500) # The route's own error response
+        counts = self.stats.snapshot()
+        self.assertEqual((counts['retries'], counts['gave_up']), (2, 1))
+        self.assertEqual(Recipe.query.count(), 1)
+
+    def test_commits_only_successful_responses(self):
+        @self.app.route('/test/add/<int:status>', methods=['POST'])
+        @transactional()
+        def add(status):
+            db.session.add(Recipe(name=f'Status {status}', category='Dinner', time=5, ingredients_json='[]',
+                                  instructions='-', date='2024-05-10', author=self.user))
+            db.session.flush()
+            return '', status
+
+        self.assertEqual(self.client.post('/test/add/400').status_code, 400)
+        self.assertEqual(self.client.post('/test/add/201').status_code, 201)
+        db.session.expire_all()
+        self.assertEqual([recipe.name for recipe in Recipe.query.order_by(Recipe.id)], ['Risotto', 'Status 201'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
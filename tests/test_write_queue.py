@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+from app import create_app, db
+from app.jobs import enqueue
+from app.models import Job, User, Recipe, SharedRecipe
+from app.write_queue import WriteTimeout
+from config import TestConfig
+
+
+class WriteQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        # A file database: the writer thread and the requests use separate connections, as in production
+        fd, self.db_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+
+        class Config(TestConfig):
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{self.db_path}'
+            SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 0.05}}
+            WRITE_COALESCE_ENABLED = True
+            WRITE_COALESCE_WINDOW_MS = 200 # Wide enough that the test's threads land in one batch
+            WRITE_COALESCE_RETRY_BASE_MS = 20
+        self.app = create_app(Config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.queue = self.app.extensions['write_queue']
+
+        self.chef = User(username='chef', email='chef@example.com', password_hash='-')
+        self.friend = User(username='friend', email='friend@example.com', password_hash='-')
+        db.session.add_all([self.chef, self.friend])
+        db.session.commit()
+        self.chef_id = self.chef.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+        self.app_context.pop()
+        os.remove(self.db_path)
+
+    def add_recipe(self, name):
+        recipe = Recipe(name=name, category='Dinner', time=10, ingredients_json='[]', instructions='Cook.',
+                        date='2024-05-10', user_id=self.chef_id)
+        db.session.add(recipe)
+        db.session.flush()
+        return recipe.id
+
+    def test_concurrent_writes_share_a_commit(self):
+        results, start = [], threading.Barrier(12)
+        def request(i):
+            with self.app.app_context():
+                start.wait()
+                results.append(self.queue.submit(self.add_recipe, f'Recipe {i}')[0])
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), [recipe.id for recipe in Recipe.query.order_by(Recipe.id)])
+        self.assertEqual(len(results), 12)
+        self.assertLess(self.queue.stats['batches'], 4)
+        self.assertEqual(self.queue.stats['writes'], 12)
+
+    def test_failing_write_only_fails_itself(self):
+        def broken():
+            self.add_recipe('Half done')
+            raise ValueError('bad input')
+        batch = [(func, args, {}, Future()) for func, args in
+                 ((self.add_recipe, ('Soup',)), (broken, ()), (self.add_recipe, ('Stew',)))]
+        self.queue.apply_batch(batch)
+
+        self.assertIsInstance(batch[1][3].exception(), ValueError)
+        self.assertEqual(sorted(Recipe.query.with_entities(Recipe.name).all()), [('Soup',), ('Stew',)])
+        self.assertEqual(self.queue.stats['batches'], 1)
+
+    def test_failing_write_takes_its_jobs_with_it(self):
+        def broken():
+            enqueue('recalculate_streak', key=f'streak:{self.chef_id}', user_id=self.chef_id)
+            raise ValueError('bad input')
+        batch = [(func, args, {}, Future()) for func, args in ((self.add_recipe, ('Soup',)), (broken, ()))]
+        self.queue.apply_batch(batch)
+
+        self.assertEqual(batch[0][3].result()[1], False) # No job committed, so no worker is woken
+        self.assertEqual(Job.query.count(), 0)
+
+    def test_submit_gives_up_on_a_stalled_writer(self):
+        self.app.config['WRITE_COALESCE_TIMEOUT_SECONDS'] = 0.2
+        with mock.patch.object(self.queue, '_start_writer'): # No writer ever picks the write up
+            with self.assertRaises(WriteTimeout) as raised:
+                self.queue.submit(self.add_recipe, 'Lost Lasagne')
+        self.assertEqual(raised.exception.code, 503)
+        func, args, kwargs, future, shard = self.queue.pending.get_nowait()
+        self.assertTrue(future.cancelled()) # So a writer that starts later skips it
+
+        client = self.app.test_client()
+        with client, mock.patch.object(self.queue, '_start_writer'):
+            with client.session_transaction() as session:
+                session['_user_id'] = str(self.chef_id)
+            response = client.post('/api/recipes', json={'name': 'Laksa', 'category': 'Dinner', 'time': 40,
+                                                         'ingredients': ['Noodles'], 'instructions': 'Simmer.'})
+        self.assertEqual(response.status_code, 503)
+
+    def test_timeout_defaults_to_the_retry_budget(self):
+        # 10 attempts that may each wait out the 0.05s busy timeout, the backoff and the window
+        self.assertAlmostEqual(self.queue.timeout(), 0.2 + 9 * 0.05 + 0.02 * (2 ** 8 - 1))
+
+    def test_retries_while_another_process_holds_the_lock(self):
+        other = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        other.execute('BEGIN IMMEDIATE')
+        releaser = threading.Timer(0.3, other.execute, args=('COMMIT',))
+        releaser.start()
+        try:
+            recipe_id, _ = self.queue.submit(self.add_recipe, 'Patient Pie')
+        finally:
+            releaser.join()
+            other.close()
+        self.assertGreater(self.queue.stats['retries'], 0)
+        self.assertEqual(db.session.get(Recipe, recipe_id).name, 'Patient Pie')
+
+    def test_routes_write_through_the_queue(self):
+        client = self.app.test_client()
+        with client:
+            with client.session_transaction() as session:
+                session['_user_id'] = str(self.chef_id)
+            response = client.post('/api/recipes', json={'name': 'Laksa', 'category': 'Dinner', 'time': 40,
+                                                         'ingredients': ['Noodles'], 'instructions': 'Simmer.'})
+            self.assertEqual(response.status_code, 201)
+            recipe_id = response.get_json()['id']
+            response = client.post(f'/recipes/{recipe_id}/whitelist', json={'username': 'friend'})
+            self.assertIn('shared with friend', response.get_json()['message'])
+            response = client.post(f'/recipes/{recipe_id}/whitelist', json={'username': 'friend'})
+            self.assertIn('already in the whitelist', response.get_json()['message'])
+
+        self.assertEqual(self.queue.stats['writes'], 3)
+        # The share job enqueued on the writer thread still ran at the end of the request (JOBS_EAGER)
+        self.assertEqual(SharedRecipe.query.filter_by(receiver_id=self.friend.id, recipe_id=recipe_id).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
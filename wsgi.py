@@ -0,0 +1,12 @@
+# wsgi.py
+# Entry point for production servers, e.g.:
+#   gunicorn --preload wsgi:app
+# gunicorn.conf.py sets 4 workers, gevent ones when gevent is installed.
+# With --preload the app is built and warmed once in the master process, and
+# each worker forks with the imports, mappers and compiled templates ready.
+from app import create_app
+from app.perf import warm_up
+from config import ProductionConfig
+
+app = create_app(ProductionConfig)
+warm_up(app)